@@ -1,53 +1,138 @@
-from _weakref import ref
-from typing import Iterable
+from typing import Iterable, Optional
 
 import glm
 import uuid
 
+from core import intersections
+from core.point_store import PointStore
+
 
 class BaseGeometryObject:
-    def __init__(self, object_type, name=None, id=None):
-        if id is None:
-            self.__id = str(uuid.uuid4())
-        else:
-            self.__id = id
-        self.__type = object_type
-        self.name = name
+    """
+        Общий интерфейс примитивов. Своих полей, кроме слабой ссылки,
+         не хранит: имя и id лежат в NamedGeometryObject, у Point -
+         в PointStore.
+    """
+    __slots__ = ('__weakref__',)
+
+    TYPE = None
+    # атрибуты со ссылками на образующие объекты
+    FORMING = ()
 
     @property
     def id(self):
-        return self.__id
+        raise NotImplementedError
 
     @property
     def type(self):
-        return self.__type
+        return self.TYPE
 
     def get_serializing_dict(self):
         pass
 
+    def get_forming_objects(self) -> tuple['BaseGeometryObject', ...]:
+        return tuple(map(self.__getattribute__, self.FORMING))
+
+    def replace_forming_object(self, old: 'BaseGeometryObject',
+                               new: 'BaseGeometryObject') -> bool:
+        """Ставит new вместо образующего old. Возвращает False, если old
+         не был образующим"""
+        replaced = False
+        for name in self.FORMING:
+            if getattr(self, name) is old:
+                setattr(self, name, new)
+                replaced = True
+        return replaced
+
+    def get_bounding_box(self) -> Optional[tuple[glm.vec3, glm.vec3]]:
+        """Возвращает ограничивающий параллелепипед или None для
+         неограниченных объектов"""
+        return None
+
+
+class NamedGeometryObject(BaseGeometryObject):
+    """Примитив, который сам хранит имя и id"""
+    __slots__ = ('__id', 'name')
+
+    def __init__(self, name=None, id=None):
+        self.__id = id
+        self.name = name
+
+    @property
+    def id(self):
+        """id создаётся при первом обращении: у массово построенной
+         геометрии он нужен только при сохранении"""
+        if self.__id is None:
+            self.__id = str(uuid.uuid4())
+        return self.__id
+
 
 class Point(BaseGeometryObject):
-    __counter = 1
+    """
+        Лёгкое представление строки PointStore: сам объект хранит только
+         дескриптор, координаты, имя и id лежат в хранилище.
+    """
+    __slots__ = ('__handle',)
+
+    TYPE = "point"
+    STORE = PointStore()
 
     def __init__(self, pos, name=None, id=None):
-        if name is None:
-            name = f'Point{Point.__counter}'
-            Point.__counter += 1
+        self.__handle = Point.STORE.allocate(pos, name, id)
+
+    @classmethod
+    def from_handle(cls, handle: int) -> 'Point':
+        """Создаёт представление для выделенной в хранилище точки.
+         Представление становится её владельцем и освобождает строку."""
+        point = cls.__new__(cls)
+        point.__handle = handle
+        return point
+
+    def __del__(self):
+        try:
+            Point.STORE.release(self.__handle)
+        except AttributeError:
+            pass
+
+    @property
+    def handle(self) -> int:
+        return self.__handle
+
+    @property
+    def id(self):
+        return Point.STORE.get_id(self.__handle)
+
+    @property
+    def name(self):
+        return Point.STORE.get_name(self.__handle)
+
+    @name.setter
+    def name(self, value):
+        Point.STORE.set_name(self.__handle, value)
+
+    @property
+    def pos(self) -> glm.vec3:
+        return Point.STORE.get_position(self.__handle)
 
-        super(Point, self).__init__("point", name, id)
-        self.pos = pos
+    @pos.setter
+    def pos(self, value: glm.vec3):
+        Point.STORE.set_position(self.__handle, value)
+
+    @property
+    def version(self) -> int:
+        return Point.STORE.get_version(self.__handle)
 
     @property
     def x(self):
-        return self.pos.x
+        return Point.STORE.get_coordinate(self.__handle, 0)
 
     @property
     def y(self):
-        return self.pos.y
+        return Point.STORE.get_coordinate(self.__handle, 1)
 
     @property
     def z(self):
-        return self.pos.z
+        return Point.STORE.get_coordinate(self.__handle, 2)
 
     def get_serializing_dict(self):
         return {
@@ -59,48 +144,95 @@ class Point(BaseGeometryObject):
                 }
         }
 
+    def get_bounding_box(self):
+        pos = self.pos
+        return pos, glm.vec3(pos)
+
+
+class DerivedGeometryObject(NamedGeometryObject):
+    """
+        Объект, построенный по точкам. Производные величины (опорные точки,
+         направления, нормаль) запоминаются вместе с суммой версий
+         образующих точек и пересчитываются, только когда одна из точек
+         сдвинулась: версии точек только растут, поэтому сумма меняется
+         при любом перемещении.
+    """
+    __slots__ = ('__cache', '__cache_version', '__handles')
+
+    def __init__(self, name=None, id=None):
+        super(DerivedGeometryObject, self).__init__(name, id)
+        self.__cache = None
+        self.__cache_version = -1
+        self.__handles = None
+
+    def get_forming_points(self) -> tuple[Point, ...]:
+        """Возвращает все точки, от которых зависит объект"""
+        raise NotImplementedError
 
-class BaseLine(BaseGeometryObject):
+    def replace_forming_object(self, old: BaseGeometryObject,
+                               new: BaseGeometryObject) -> bool:
+        if not super(DerivedGeometryObject, self).replace_forming_object(
+                old, new):
+            return False
+        self.__cache = None
+        self.__handles = None
+        return True
+
+    def get_points_version(self) -> int:
+        if self.__handles is None:
+            self.__handles = tuple(
+                {point.handle: None for point in self.get_forming_points()})
+        return Point.STORE.get_versions_sum(self.__handles)
+
+    def _cached(self, key: str, calculate):
+        version = self.get_points_version()
+        if version != self.__cache_version or self.__cache is None:
+            self.__cache = {}
+            self.__cache_version = version
+        value = self.__cache.get(key, None)
+        if value is None:
+            value = self.__cache[key] = calculate()
+        return value
+
+
+class BaseLine(DerivedGeometryObject):
+    __slots__ = ()
     __counter = 0
 
+    TYPE = "line"
+
     def __init__(self, name=None, id=None):
         if name is None:
             name = f'Line{BaseLine.__counter}'
             BaseLine.__counter += 1
-        self.__type = "line"
-        super(BaseLine, self).__init__(self.__type, name, id)
+        super(BaseLine, self).__init__(name, id)
 
     def get_pivot_points(self):
         """Возвращает две различные точки, принадлежащие прямой"""
-        pass
+        return self._cached("pivots", self._get_pivot_points)
 
     def get_directional_vector(self):
         """Возвращает направляющий вектор прямой"""
-        pass
+        return self._cached("direction", self._get_directional_vector)
+
+    def _get_pivot_points(self):
+        raise NotImplementedError
 
-    def get_intersection_with_line(self, line):
-        dir_vec1 = self.get_directional_vector()
-        dir_vec2 = line.get_directional_vector()
-        if len(glm.cross(dir_vec1, dir_vec2)) == 0:
-            return None
-        # TODO: отлетаешь
-        a1 = self.get_pivot_points()[0].xyz
-        a2 = line.get_pivot_points()[0].xyz
-        if abs((dir_vec1.x * dir_vec2.y - dir_vec2.x)) > 1e-9:
-            coef = (a2.x - a1.x + a1.y * dir_vec1.x - a2.x * dir_vec1.x) / (
-                        dir_vec1.x * dir_vec2.y - dir_vec2.x)
-            return a2 + coef * dir_vec2
-        elif abs((dir_vec1.x * dir_vec2.z - dir_vec2.x)) > 1e-9:
-            coef = (a2.x - a1.x + a1.z * dir_vec1.x - a2.x * dir_vec1.x) / (
-                        dir_vec1.x * dir_vec2.z - dir_vec2.x)
-            return a2 + coef * dir_vec2
-        else:
-            coef = (a2.y - a1.y + a1.z * dir_vec1.y - a2.y * dir_vec1.y) / (
-                        dir_vec1.y * dir_vec2.z - dir_vec2.y)
-            return a2 + coef * dir_vec2
+    def _get_directional_vector(self):
+        raise NotImplementedError
+
+    def get_intersection_with_line(self, line) -> Optional[glm.vec3]:
+        """Точка пересечения с прямой или None, если прямые
+         скрещиваются или параллельны"""
+        return intersections.line_line(
+            self.get_pivot_points()[0], self.get_directional_vector(),
+            line.get_pivot_points()[0], line.get_directional_vector())
 
 
 class LineBy2Points(BaseLine):
+    __slots__ = ('point1', 'point2')
+    FORMING = ('point1', 'point2')
+
     def __init__(self, point1, point2, name=None, id=None):
         super(LineBy2Points, self).__init__(name, id)
         self.point1 = point1
@@ -116,14 +248,20 @@ class LineBy2Points(BaseLine):
                 }
         }
 
-    def get_pivot_points(self):
+    def get_forming_points(self):
+        return self.point1, self.point2
+
+    def _get_pivot_points(self):
         return self.point1.pos, self.point2.pos
 
-    def get_directional_vector(self):
+    def _get_directional_vector(self):
         return self.point2.pos - self.point1.pos
 
 
 class LineByPointAndLine(BaseLine):
+    __slots__ = ('point', 'line')
+    FORMING = ('point', 'line')
+
     def __init__(self, point, line, name=None, id=None):
         super(LineByPointAndLine, self).__init__(name, id)
         self.point = point
@@ -139,22 +277,28 @@ class LineByPointAndLine(BaseLine):
                 }
         }
 
-    def get_pivot_points(self):
+    def get_forming_points(self):
+        return self.point, *self.line.get_forming_points()
+
+    def _get_pivot_points(self):
         return self.point.pos, self.point.pos + self.line.get_directional_vector()
 
-    def get_directional_vector(self):
+    def _get_directional_vector(self):
         return self.line.get_directional_vector()
 
 
-class BasePlane(BaseGeometryObject):
+class BasePlane(DerivedGeometryObject):
+    __slots__ = ('__cuts',)
     __counter = 1
 
+    TYPE = "plane"
+
     def __init__(self, name=None, id=None):
         if name is None:
             name = f'Plane{BasePlane.__counter}'
             BasePlane.__counter += 1
 
-        super(BasePlane, self).__init__("plane", name, id)
+        super(BasePlane, self).__init__(name, id)
         self.__cuts = []
 
     @staticmethod
@@ -165,40 +309,58 @@ class BasePlane(BaseGeometryObject):
         return abs(mixed) < 1e-9
 
     def is_collinear_to(self, plane: 'BasePlane') -> bool:
-        pivots1 = self.get_pivot_points()
-        pivots2 = plane.get_pivot_points()
-        norm1 = glm.normalize(
-            glm.cross(pivots1[0] - pivots1[1], pivots1[0] - pivots1[2]))
-        norm2 = glm.normalize(
-            glm.cross(pivots2[0] - pivots2[1], pivots2[0] - pivots2[2]))
-        dot = glm.dot(norm1, norm2)
+        dot = glm.dot(self.get_normal(), plane.get_normal())
         return abs(abs(dot) - 1) < 1e-9
 
     def get_pivot_points(self):
         """Возвращает три различные точки на плоскости"""
-        raise NotImplementedError
+        return self._cached("pivots", self._get_pivot_points)
 
     def get_direction_vectors(self) -> (glm.vec3, glm.vec3):
         """Возвращает направляющие векторы плоскости"""
-        raise NotImplementedError
+        return self._cached("directions", self._get_direction_vectors)
 
     def get_normal(self) -> glm.vec3:
+        return self._cached("normal", self.__get_normal)
+
+    def get_offset(self) -> float:
+        """Возвращает d из уравнения плоскости (n, x) = d"""
+        return self._cached(
+            "offset", lambda: glm.dot(self.get_normal(),
+                                      self.get_pivot_points()[0]))
+
+    def __get_normal(self):
         dir1, dir2 = self.get_direction_vectors()
         return glm.normalize(glm.cross(dir1, dir2))
 
-    def add_cut(self, cut_line: BaseLine):
-        self.__cuts.append(ref(cut_line))
+    def _get_pivot_points(self):
+        raise NotImplementedError
+
+    def _get_direction_vectors(self):
+        raise NotImplementedError
+
+    def add_cut(self, cut):
+        self.__cuts.append(cut)
+
+    def remove_cut(self, cut):
+        self.__cuts.remove(cut)
 
-    def remove_cut(self, cut_line: BaseLine):
-        self.__cuts.remove(ref(cut_line))
+    def set_cuts(self, cuts: Iterable):
+        self.__cuts = list(cuts)
 
     @property
-    def cuts(self) -> Iterable[BaseLine]:
-        for cut in self.__cuts:
-            yield cut()
+    def cuts(self) -> Iterable:
+        """Сечения объектов сцены этой плоскостью (PlaneCut)"""
+        yield from self.__cuts
+
+    def get_serializing_cuts(self) -> list[dict]:
+        return [cut.get_serializing_dict() for cut in self.__cuts]
 
 
 class PlaneBy3Points(BasePlane):
+    __slots__ = ('point1', 'point2', 'point3')
+    FORMING = ('point1', 'point2', 'point3')
+
     def __init__(self, point1, point2, point3, name=None, id=None):
         super(PlaneBy3Points, self).__init__(name, id)
         self.point1 = point1
@@ -213,19 +375,25 @@ class PlaneBy3Points(BasePlane):
                     "name": self.name,
                     "forming objects": [self.point1.id, self.point2.id,
                                         self.point3.id],
-                    "cuts": list(self.cuts)
+                    "cuts": self.get_serializing_cuts()
                 }
         }
 
-    def get_pivot_points(self):
+    def get_forming_points(self):
+        return self.point1, self.point2, self.point3
+
+    def _get_pivot_points(self):
         return self.point1.pos, self.point2.pos, self.point3.pos
 
-    def get_direction_vectors(self):
+    def _get_direction_vectors(self):
         return self.point2.pos - self.point1.pos, \
                self.point3.pos - self.point2.pos
 
 
 class PlaneByPointAndPlane(BasePlane):
+    __slots__ = ('point', 'plane')
+    FORMING = ('point', 'plane')
+
     def __init__(self, point, plane, name=None, id=None):
         super(PlaneByPointAndPlane, self).__init__(name, id)
         self.point = point
@@ -238,20 +406,26 @@ class PlaneByPointAndPlane(BasePlane):
                     "type": self.type,
                     "name": self.name,
                     "forming objects": [self.point.id, self.plane.id],
-                    "cuts": list(self.cuts)
+                    "cuts": self.get_serializing_cuts()
                 }
         }
 
-    def get_pivot_points(self):
+    def get_forming_points(self):
+        return self.point, *self.plane.get_forming_points()
+
+    def _get_pivot_points(self):
         dir_vectors = self.get_direction_vectors()
         return self.point.pos, self.point.pos + dir_vectors[0], \
                self.point.pos + dir_vectors[1]
 
-    def get_direction_vectors(self):
+    def _get_direction_vectors(self):
         return self.plane.get_direction_vectors()
 
 
 class PlaneByPointAndLine(BasePlane):
+    __slots__ = ('point', 'line')
+    FORMING = ('point', 'line')
+
     def __init__(self, point, line, name=None, id=None):
         super(PlaneByPointAndLine, self).__init__(name, id)
         self.point = point
@@ -264,19 +438,25 @@ class PlaneByPointAndLine(BasePlane):
                     "type": self.type,
                     "name": self.name,
                     "forming objects": [self.point.id, self.line.id],
-                    "cuts": list(self.cuts)
+                    "cuts": self.get_serializing_cuts()
                 }
         }
 
-    def get_pivot_points(self):
+    def get_forming_points(self):
+        return self.point, *self.line.get_forming_points()
+
+    def _get_pivot_points(self):
         return self.point.pos, *self.line.get_pivot_points()
 
-    def get_direction_vectors(self):
+    def _get_direction_vectors(self):
         pivots = self.get_pivot_points()
         return pivots[1] - pivots[0], pivots[2] - pivots[0]
 
 
 class PlaneByPointAndSegment(BasePlane):
+    __slots__ = ('point', 'segment')
+    FORMING = ('point', 'segment')
+
     def __init__(self, point, segment, name=None, id=None):
         super(PlaneByPointAndSegment, self).__init__(name, id)
         self.point = point
@@ -289,27 +469,34 @@ class PlaneByPointAndSegment(BasePlane):
                     "type": self.type,
                     "name": self.name,
                     "forming objects": [self.point.id, self.segment.id],
-                    "cuts": list(self.cuts)
+                    "cuts": self.get_serializing_cuts()
                 }
         }
 
-    def get_pivot_points(self):
+    def get_forming_points(self):
+        return self.point, self.segment.point1, self.segment.point2
+
+    def _get_pivot_points(self):
         return self.point.pos, self.segment.point1.pos, self.segment.point2.pos
 
-    def get_direction_vectors(self):
+    def _get_direction_vectors(self):
         pivots = self.get_pivot_points()
         return pivots[1] - pivots[0], pivots[2] - pivots[0]
 
 
-class Segment(BaseGeometryObject):
+class Segment(NamedGeometryObject):
+    __slots__ = ('point1', 'point2')
+    FORMING = ('point1', 'point2')
     __counter = 1
 
+    TYPE = 'segment'
+
     def __init__(self, point1: Point, point2: Point, name=None, id=None):
         if name is None:
             name = f"Edge{Segment.__counter}"
             Segment.__counter += 1
 
-        super(Segment, self).__init__('segment', name, id)
+        super(Segment, self).__init__(name, id)
         self.point1 = point1
         self.point2 = point2
 
@@ -329,33 +516,37 @@ class Segment(BaseGeometryObject):
     def get_line(self):
         return LineBy2Points(self.point1, self.point2)
 
-    def get_intersection_with_line(self, line):
-        segment_line = self.get_line()
-        intersection = segment_line.get_intersection_with_line(line)
-        vec_with_intersection = intersection - self.point1
-        if glm.dot(vec_with_intersection, self.get_vec()) < -1e-9 or len(
-                vec_with_intersection) > len(self.get_vec()) + 1e-9:
-            return None
-        return intersection
+    def get_intersection_with_line(self, line) -> Optional[glm.vec3]:
+        return intersections.segment_line(
+            self.point1.pos, self.point2.pos, line.get_pivot_points()[0],
+            line.get_directional_vector())
 
-    def get_intersection_with_segment(self, segment):
-        intersect1 = segment.get_intersection_with_line(self.get_line())
-        intersect2 = self.get_intersection_with_line(segment.get_line())
-        return intersect1
+    def get_intersection_with_segment(self, segment) -> Optional[glm.vec3]:
+        return intersections.segment_segment(
+            self.point1.pos, self.point2.pos,
+            segment.point1.pos, segment.point2.pos)
 
     def get_points(self) -> (glm.vec3, glm.vec3):
         return self.point1.pos, self.point2.pos
 
+    def get_bounding_box(self):
+        p1, p2 = self.get_points()
+        return glm.min(p1, p2), glm.max(p1, p2)
 
-class Triangle(BaseGeometryObject):
+
+class Triangle(NamedGeometryObject):
+    __slots__ = ('point1', 'point2', 'point3')
+    FORMING = ('point1', 'point2', 'point3')
     __counter = 1
 
+    TYPE = 'triangle'
+
     def __init__(self, point1, point2, point3, name=None, id=None):
         if name is None:
             name = f"Triangle{Triangle.__counter}"
             Triangle.__counter += 1
 
-        super(Triangle, self).__init__('triangle', name, id)
+        super(Triangle, self).__init__(name, id)
         self.point1 = point1
         self.point2 = point2
         self.point3 = point3
@@ -374,10 +565,18 @@ class Triangle(BaseGeometryObject):
     def get_points(self) -> (glm.vec3, glm.vec3, glm.vec3):
         return self.point1.pos, self.point2.pos, self.point3.pos
 
+    def get_bounding_box(self):
+        p1, p2, p3 = self.get_points()
+        return glm.min(p1, glm.min(p2, p3)), glm.max(p1, glm.max(p2, p3))
+
+
+class BaseVolumetricBody(NamedGeometryObject):
+    __slots__ = ('points',)
+
+    TYPE = 'base_3d_body'
 
-class BaseVolumetricBody(BaseGeometryObject):
     def __init__(self, points, name=None, id=None):
-        super(BaseVolumetricBody, self).__init__('base_3d_body', name, id)
+        super(BaseVolumetricBody, self).__init__(name, id)
         self.points = points
 
     def get_serializing_dict(self):
@@ -0,0 +1,126 @@
+"""
+    Векторные версии функций из core.helpers. Принимают массивы NumPy
+     и считают все пары сразу: результат функции для N лучей (точек)
+     и M треугольников (отрезков, плоскостей) имеет форму N x M.
+    Там, где скалярная версия возвращает NaN или None, здесь NaN.
+"""
+
+import numpy as np
+import numpy.typing as npt
+
+EPS = 1e-5
+PARALLEL_EPS = 1e-8
+
+
+def _as_array(values, columns: int) -> npt.NDArray[np.float64]:
+    return np.asarray(values, dtype=np.float64).reshape(-1, columns)
+
+
+def ray_plane_intersection_distances(origins, directions, points,
+                                     norms) -> npt.NDArray[np.float64]:
+    """Расстояния вдоль N лучей до M плоскостей, заданных точкой и нормалью"""
+    origins, directions = _as_array(origins, 3), _as_array(directions, 3)
+    points, norms = _as_array(points, 3), _as_array(norms, 3)
+
+    den = directions @ norms.T
+    num = np.einsum('mk,mk->m', points, norms)[None, :] - origins @ norms.T
+    with np.errstate(divide='ignore', invalid='ignore'):
+        distances = num / den
+    distances[np.abs(den) < PARALLEL_EPS] = np.nan
+    return distances
+
+
+def point_to_line_distances(points, line1, line2) -> npt.NDArray[np.float64]:
+    """Расстояния на плоскости от N точек до M прямых"""
+    points = _as_array(points, 2)
+    line1, line2 = _as_array(line1, 2), _as_array(line2, 2)
+
+    dir_vec = line2 - line1
+    with np.errstate(divide='ignore', invalid='ignore'):
+        dir_vec = dir_vec / np.linalg.norm(dir_vec, axis=1)[:, None]
+    p = line1[None, :, :] - points[:, None, :]
+    return np.abs(p[..., 0] * dir_vec[:, 1] - dir_vec[:, 0] * p[..., 1])
+
+
+def point_to_segment_distances(points, segment1,
+                               segment2) -> npt.NDArray[np.float64]:
+    """Расстояния от N точек до M отрезков. Работает для любой размерности"""
+    points = np.asarray(points, dtype=np.float64)
+    dim = points.shape[-1]
+    points = points.reshape(-1, dim)
+    segment1 = _as_array(segment1, dim)
+    segment2 = _as_array(segment2, dim)
+
+    s1s2 = segment2 - segment1
+    length2 = np.einsum('mk,mk->m', s1s2, s1s2)
+    s1p = points[:, None, :] - segment1[None, :, :]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = np.einsum('nmk,mk->nm', s1p, s1s2) / length2
+    t = np.nan_to_num(np.clip(t, 0, 1))
+    closest = segment1[None, :, :] + t[..., None] * s1s2[None, :, :]
+    return np.linalg.norm(points[:, None, :] - closest, axis=2)
+
+
+def is_inside_polygon(points, polygon) -> npt.NDArray[np.bool_]:
+    """Для каждой из N точек - лежит ли она внутри многоугольника"""
+    points, polygon = _as_array(points, 2), _as_array(polygon, 2)
+    pi = polygon
+    pj = np.roll(polygon, 1, axis=0)
+
+    px = points[:, 0:1]
+    py = points[:, 1:2]
+    crosses = (pi[:, 1] > py) != (pj[:, 1] > py)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x = (pj[:, 0] - pi[:, 0]) * (py - pi[:, 1]) / (pj[:, 1] - pi[:, 1]) \
+            + pi[:, 0]
+    hits = crosses & (px < x)
+    return np.count_nonzero(hits, axis=1) % 2 == 1
+
+
+def ray_triangle_intersection_distances(origins, directions,
+                                        triangles) -> npt.NDArray[np.float64]:
+    """Расстояния вдоль N лучей до M треугольников (M x 3 x 3),
+     алгоритм Мёллера-Трумбора"""
+    origins, directions = _as_array(origins, 3), _as_array(directions, 3)
+    triangles = np.asarray(triangles, dtype=np.float64).reshape(-1, 3, 3)
+
+    point1 = triangles[:, 0]
+    edge1 = triangles[:, 1] - point1
+    edge2 = triangles[:, 2] - point1
+
+    h = np.cross(directions[:, None, :], edge2[None, :, :])
+    a = np.einsum('mk,nmk->nm', edge1, h)
+    parallel = np.abs(a) < EPS
+    with np.errstate(divide='ignore', invalid='ignore'):
+        f = 1.0 / a
+    s = origins[:, None, :] - point1[None, :, :]
+    u = f * np.einsum('nmk,nmk->nm', s, h)
+    q = np.cross(s, edge1[None, :, :])
+    v = f * np.einsum('nk,nmk->nm', directions, q)
+    t = f * np.einsum('mk,nmk->nm', edge2, q)
+
+    miss = parallel | (u < 0) | (u > 1) | (v < 0) | (u + v > 1) | (t <= EPS)
+    t[miss] = np.nan
+    return t
+
+
+def line_line_intersections(a1, a2, b1, b2) -> npt.NDArray[np.float64]:
+    """
+        Пересечения N пар отрезков a1a2 и прямых b1b2 построчно.
+        Строка из NaN, если прямые скрещиваются, параллельны или точка
+         не попадает на a1a2.
+    """
+    a1, a2 = _as_array(a1, 3), _as_array(a2, 3)
+    b1, b2 = _as_array(b1, 3), _as_array(b2, 3)
+    da = a2 - a1
+    db = b2 - b1
+    dc = b1 - a1
+
+    cross_ab = np.cross(da, db)
+    skew = np.abs(np.einsum('nk,nk->n', dc, cross_ab)) > 1e-4
+    with np.errstate(divide='ignore', invalid='ignore'):
+        s = np.einsum('nk,nk->n', np.cross(dc, db), cross_ab) / \
+            np.einsum('nk,nk->n', cross_ab, cross_ab)
+    result = a1 + da * s[:, None]
+    result[skew | ~((s >= 0) & (s <= 1))] = np.nan
+    return result
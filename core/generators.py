@@ -0,0 +1,139 @@
+"""
+    Генераторы параметрических примитивов. Каждый сразу считает массивы
+     вершин (N x 3) и треугольников (M x 3, индексы вершин) без циклов
+     по вершинам, результат передаётся в сцену через MeshBatch.
+    Ось Y направлена вверх, нормали граней смотрят наружу.
+"""
+
+import glm
+import numpy as np
+import numpy.typing as npt
+
+Mesh = tuple[npt.NDArray[np.float32], npt.NDArray[np.int64]]
+
+
+def _as_vector(value) -> npt.NDArray[np.float64]:
+    return np.array(list(value), dtype=np.float64)
+
+
+def grid_triangles(rows: int, columns: int, wrap_rows: bool = False,
+                   wrap_columns: bool = False) -> npt.NDArray[np.int64]:
+    """
+        Треугольники сетки вершин rows x columns, пронумерованных по
+         строкам. wrap замыкает сетку по соответствующему направлению.
+    """
+    row_cells = rows if wrap_rows else rows - 1
+    column_cells = columns if wrap_columns else columns - 1
+    r, c = np.meshgrid(np.arange(row_cells), np.arange(column_cells),
+                       indexing='ij')
+    r, c = r.ravel(), c.ravel()
+    r_next, c_next = (r + 1) % rows, (c + 1) % columns
+    a = r * columns + c
+    b = r * columns + c_next
+    d = r_next * columns + c
+    e = r_next * columns + c_next
+    return np.concatenate([np.stack([a, d, e], axis=1),
+                           np.stack([a, e, b], axis=1)]).astype(np.int64)
+
+
+def grid(width: float, depth: float, columns: int, rows: int,
+         center: glm.vec3 = glm.vec3()) -> Mesh:
+    """Прямоугольная сетка в плоскости XZ из columns x rows клеток"""
+    x = np.linspace(-width / 2, width / 2, columns + 1)
+    z = np.linspace(-depth / 2, depth / 2, rows + 1)
+    zz, xx = np.meshgrid(z, x, indexing='ij')
+    positions = np.stack([xx.ravel(), np.zeros(xx.size), zz.ravel()], axis=1)
+    return (positions + _as_vector(center)).astype(np.float32), \
+        grid_triangles(rows + 1, columns + 1)
+
+
+def sphere(radius: float, segments: int, rings: int,
+           center: glm.vec3 = glm.vec3()) -> Mesh:
+    """Сфера: segments делений по долготе, rings по широте, полюса -
+     по одной вершине"""
+    theta = np.linspace(0, np.pi, rings + 1)[1:-1]
+    phi = np.linspace(0, 2 * np.pi, segments, endpoint=False)
+    tt, pp = np.meshgrid(theta, phi, indexing='ij')
+    ring_positions = np.stack([np.sin(tt) * np.cos(pp), np.cos(tt),
+                               np.sin(tt) * np.sin(pp)], axis=-1)
+    positions = np.concatenate([[(0, 1, 0)], ring_positions.reshape(-1, 3),
+                                [(0, -1, 0)]]) * radius
+
+    ring_count = rings - 1
+    body = grid_triangles(ring_count, segments,
+                          wrap_columns=True)[:, [0, 2, 1]] + 1
+    column = np.arange(segments)
+    top = np.stack([np.zeros(segments, dtype=np.int64),
+                    (column + 1) % segments + 1, column + 1], axis=1)
+    last_ring = 1 + (ring_count - 1) * segments
+    bottom = np.stack([np.full(segments, len(positions) - 1),
+                       last_ring + column,
+                       last_ring + (column + 1) % segments], axis=1)
+    return (positions + _as_vector(center)).astype(np.float32), \
+        np.concatenate([top, body, bottom])
+
+
+def cylinder(radius: float, height: float, segments: int, rows: int = 1,
+             caps: bool = True, center: glm.vec3 = glm.vec3()) -> Mesh:
+    """Цилиндр вдоль оси Y, боковая поверхность из rows поясов"""
+    y = np.linspace(height / 2, -height / 2, rows + 1)
+    phi = np.linspace(0, 2 * np.pi, segments, endpoint=False)
+    yy, pp = np.meshgrid(y, phi, indexing='ij')
+    positions = np.stack([radius * np.cos(pp), yy, radius * np.sin(pp)],
+                         axis=-1).reshape(-1, 3)
+    triangles = [grid_triangles(rows + 1, segments,
+                                wrap_columns=True)[:, [0, 2, 1]]]
+
+    if caps:
+        column = np.arange(segments)
+        top_center, bottom_center = len(positions), len(positions) + 1
+        bottom_ring = rows * segments
+        triangles.append(np.stack([np.full(segments, top_center),
+                                   (column + 1) % segments, column], axis=1))
+        triangles.append(np.stack([np.full(segments, bottom_center),
+                                   bottom_ring + column,
+                                   bottom_ring + (column + 1) % segments],
+                                  axis=1))
+        positions = np.concatenate([positions, [(0, height / 2, 0),
+                                                (0, -height / 2, 0)]])
+    return (positions + _as_vector(center)).astype(np.float32), \
+        np.concatenate(triangles).astype(np.int64)
+
+
+def torus(major_radius: float, minor_radius: float, segments: int,
+          sides: int, center: glm.vec3 = glm.vec3()) -> Mesh:
+    """Тор вокруг оси Y: segments делений вдоль кольца, sides - по
+     сечению"""
+    phi = np.linspace(0, 2 * np.pi, segments, endpoint=False)
+    theta = np.linspace(0, 2 * np.pi, sides, endpoint=False)
+    pp, tt = np.meshgrid(phi, theta, indexing='ij')
+    distance = major_radius + minor_radius * np.cos(tt)
+    positions = np.stack([distance * np.cos(pp), minor_radius * np.sin(tt),
+                          distance * np.sin(pp)], axis=-1).reshape(-1, 3)
+    triangles = grid_triangles(segments, sides, wrap_rows=True,
+                               wrap_columns=True)
+    return (positions + _as_vector(center)).astype(np.float32), \
+        triangles[:, [0, 2, 1]]
+
+
+# Вершины коробки - биты (x, y, z) номера: 0 - первый угол, 7 - второй
+BOX_TRIANGLES = np.array([
+    (0, 2, 3), (0, 3, 1),
+    (4, 5, 7), (4, 7, 6),
+    (0, 1, 5), (0, 5, 4),
+    (2, 6, 7), (2, 7, 3),
+    (0, 4, 6), (0, 6, 2),
+    (1, 3, 7), (1, 7, 5),
+], dtype=np.int64)
+
+
+def box(corner1: glm.vec3, corner2: glm.vec3) -> Mesh:
+    """
+        Параллелепипед по двум противоположным углам. Вершина 0 совпадает
+         с corner1, вершина 7 - с corner2.
+        Для углов с corner1 < corner2 по всем осям нормали смотрят наружу.
+    """
+    corners = np.array([_as_vector(corner1), _as_vector(corner2)])
+    bits = (np.arange(8)[:, None] >> np.arange(3)) & 1
+    positions = corners[bits, np.arange(3)]
+    return positions.astype(np.float32), BOX_TRIANGLES.copy()
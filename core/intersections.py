@@ -0,0 +1,300 @@
+"""
+    Пересечения прямых, отрезков, плоскостей и треугольников.
+    Все проверки строятся на ближайших точках двух объектов с общими
+     допусками: объекты пересекаются, если расстояние между ближайшими
+     точками не больше EPS с поправкой на масштаб.
+    Прямая задаётся точкой и направлением, отрезок - концами,
+     плоскость - нормалью и смещением d из уравнения (n, x) = d.
+"""
+
+import itertools
+from typing import Optional
+
+import glm
+import numpy as np
+import numpy.typing as npt
+
+EPS = 1e-5
+PARALLEL_EPS = 1e-10
+
+
+def _tolerance(*lengths2: float) -> float:
+    return EPS * (1 + max(lengths2) ** 0.5)
+
+
+def _closest_parameters(p1: glm.vec3, d1: glm.vec3, p2: glm.vec3,
+                        d2: glm.vec3, clamp1: bool,
+                        clamp2: bool) -> Optional[tuple[float, float]]:
+    """
+        Параметры s, t ближайших точек p1 + s * d1 и p2 + t * d2.
+        clamp ограничивает параметр отрезком [0, 1].
+        None для параллельных прямых.
+    """
+    r = p1 - p2
+    a = glm.dot(d1, d1)
+    e = glm.dot(d2, d2)
+    b = glm.dot(d1, d2)
+    c = glm.dot(d1, r)
+    f = glm.dot(d2, r)
+    denom = a * e - b * b
+    if a < PARALLEL_EPS or e < PARALLEL_EPS:
+        return None
+
+    if denom <= PARALLEL_EPS * a * e:
+        if not (clamp1 and clamp2):
+            return None
+        s = 0.0
+    else:
+        s = (b * f - c * e) / denom
+        if clamp1:
+            s = min(max(s, 0.0), 1.0)
+    t = (b * s + f) / e
+    if clamp2 and not 0 <= t <= 1:
+        t = min(max(t, 0.0), 1.0)
+        if clamp1:
+            s = min(max((b * t - c) / a, 0.0), 1.0)
+        else:
+            s = (b * t - c) / a
+    return s, t
+
+
+def _meeting_point(p1: glm.vec3, d1: glm.vec3, p2: glm.vec3, d2: glm.vec3,
+                   clamp1: bool, clamp2: bool) -> Optional[glm.vec3]:
+    parameters = _closest_parameters(p1, d1, p2, d2, clamp1, clamp2)
+    if parameters is None:
+        return None
+    closest1 = p1 + parameters[0] * d1
+    closest2 = p2 + parameters[1] * d2
+    tolerance = _tolerance(glm.length2(d1) if clamp1 else 0,
+                           glm.length2(d2) if clamp2 else 0,
+                           glm.length2(closest1))
+    if glm.distance(closest1, closest2) > tolerance:
+        return None
+    return (closest1 + closest2) / 2
+
+
+def line_line(point1: glm.vec3, direction1: glm.vec3, point2: glm.vec3,
+              direction2: glm.vec3) -> Optional[glm.vec3]:
+    """Точка пересечения двух прямых. None для скрещивающихся и
+     параллельных прямых"""
+    return _meeting_point(point1, direction1, point2, direction2, False, False)
+
+
+def segment_line(segment1: glm.vec3, segment2: glm.vec3, point: glm.vec3,
+                 direction: glm.vec3) -> Optional[glm.vec3]:
+    return _meeting_point(segment1, segment2 - segment1, point, direction,
+                          True, False)
+
+
+def segment_segment(a1: glm.vec3, a2: glm.vec3, b1: glm.vec3,
+                    b2: glm.vec3) -> Optional[glm.vec3]:
+    """Точка пересечения двух отрезков. Для перекрывающихся отрезков на
+     одной прямой возвращает одну из общих точек"""
+    return _meeting_point(a1, a2 - a1, b1, b2 - b1, True, True)
+
+
+def line_plane(point: glm.vec3, direction: glm.vec3, normal: glm.vec3,
+               offset: float) -> Optional[glm.vec3]:
+    """Точка пересечения прямой с плоскостью. None, если прямая
+     параллельна плоскости"""
+    den = glm.dot(normal, direction)
+    if den * den <= PARALLEL_EPS * glm.length2(normal) * \
+            glm.length2(direction):
+        return None
+    return point + (offset - glm.dot(normal, point)) / den * direction
+
+
+def segment_plane(segment1: glm.vec3, segment2: glm.vec3, normal: glm.vec3,
+                  offset: float) -> Optional[glm.vec3]:
+    direction = segment2 - segment1
+    den = glm.dot(normal, direction)
+    if den * den <= PARALLEL_EPS * glm.length2(normal) * \
+            glm.length2(direction):
+        return None
+    t = (offset - glm.dot(normal, segment1)) / den
+    tolerance = _tolerance(glm.length2(direction)) / glm.length(direction)
+    if not -tolerance <= t <= 1 + tolerance:
+        return None
+    return segment1 + min(max(t, 0.0), 1.0) * direction
+
+
+def plane_plane(normal1: glm.vec3, offset1: float, normal2: glm.vec3,
+                offset2: float) -> Optional[tuple[glm.vec3, glm.vec3]]:
+    """Прямая пересечения двух плоскостей как точка и направление.
+     None для параллельных плоскостей"""
+    direction = glm.cross(normal1, normal2)
+    length2 = glm.length2(direction)
+    if length2 <= PARALLEL_EPS * glm.length2(normal1) * \
+            glm.length2(normal2):
+        return None
+    point = (glm.cross(normal2, direction) * offset1 +
+             glm.cross(direction, normal1) * offset2) / length2
+    return point, direction
+
+
+def segment_triangle(segment1: glm.vec3, segment2: glm.vec3,
+                     point1: glm.vec3, point2: glm.vec3,
+                     point3: glm.vec3) -> Optional[glm.vec3]:
+    """Точка пересечения отрезка с треугольником (Мёллер-Трумбор)"""
+    direction = segment2 - segment1
+    edge1 = point2 - point1
+    edge2 = point3 - point1
+    h = glm.cross(direction, edge2)
+    a = glm.dot(edge1, h)
+    if a * a <= PARALLEL_EPS * glm.length2(direction) * \
+            glm.length2(edge1) * glm.length2(edge2):
+        return None
+    f = 1.0 / a
+    s = segment1 - point1
+    u = f * glm.dot(s, h)
+    q = glm.cross(s, edge1)
+    v = f * glm.dot(direction, q)
+    t = f * glm.dot(edge2, q)
+    if u < -EPS or v < -EPS or u + v > 1 + EPS or not -EPS <= t <= 1 + EPS:
+        return None
+    return segment1 + t * direction
+
+
+def segment_segment_batch(a1, a2, b1, b2) -> npt.NDArray[np.float64]:
+    """
+        segment_segment для N пар отрезков построчно.
+        Возвращает N x 3, строка из NaN - отрезки не пересекаются.
+    """
+    a1 = np.asarray(a1, dtype=np.float64).reshape(-1, 3)
+    b1 = np.asarray(b1, dtype=np.float64).reshape(-1, 3)
+    d1 = np.asarray(a2, dtype=np.float64).reshape(-1, 3) - a1
+    d2 = np.asarray(b2, dtype=np.float64).reshape(-1, 3) - b1
+    r = a1 - b1
+    a = np.einsum('nk,nk->n', d1, d1)
+    e = np.einsum('nk,nk->n', d2, d2)
+    b = np.einsum('nk,nk->n', d1, d2)
+    c = np.einsum('nk,nk->n', d1, r)
+    f = np.einsum('nk,nk->n', d2, r)
+    denom = a * e - b * b
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        s = np.where(denom > PARALLEL_EPS * a * e,
+                     np.clip((b * f - c * e) / denom, 0, 1), 0)
+        t = (b * s + f) / e
+        outside = (t < 0) | (t > 1)
+        t = np.clip(t, 0, 1)
+        s = np.where(outside, np.clip((b * t - c) / a, 0, 1), s)
+
+    closest1 = a1 + s[:, None] * d1
+    closest2 = b1 + t[:, None] * d2
+    scale = np.sqrt(np.maximum.reduce(
+        [a, e, np.einsum('nk,nk->n', closest1, closest1)]))
+    distance = np.linalg.norm(closest1 - closest2, axis=1)
+    result = (closest1 + closest2) / 2
+    degenerate = (a < PARALLEL_EPS) | (e < PARALLEL_EPS)
+    result[degenerate | ~(distance <= EPS * (1 + scale))] = np.nan
+    return result
+
+
+def segment_plane_batch(starts, ends, normal, offset: float) \
+        -> npt.NDArray[np.float64]:
+    """segment_plane для N отрезков и одной плоскости, N x 3 с NaN"""
+    starts = np.asarray(starts, dtype=np.float64).reshape(-1, 3)
+    directions = np.asarray(ends, dtype=np.float64).reshape(-1, 3) - starts
+    normal = np.asarray(normal, dtype=np.float64)
+    den = directions @ normal
+    length2 = np.einsum('nk,nk->n', directions, directions)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = (offset - starts @ normal) / den
+        tolerance = EPS * (1 + np.sqrt(length2)) / np.sqrt(length2)
+    parallel = den * den <= PARALLEL_EPS * (normal @ normal) * length2
+    result = starts + np.clip(t, 0, 1)[:, None] * directions
+    result[parallel | ~((t >= -tolerance) & (t <= 1 + tolerance))] = np.nan
+    return result
+
+
+# Коробки, занимающие больше ячеек, сравниваются со всеми остальными
+# напрямую: длинный отрезок иначе попал бы в число ячеек, растущее
+# как куб его длины
+BROADPHASE_MAX_CELLS = 64
+# Размер ячейки по умолчанию - этот процентиль наибольших размеров коробок
+BROADPHASE_CELL_PERCENTILE = 90
+
+
+def _overlaps(lows, highs, first, second) -> npt.NDArray[np.bool_]:
+    tolerance = EPS * (1 + np.abs(lows[first]).max(axis=1))[:, None]
+    return np.all((lows[first] <= highs[second] + tolerance) &
+                  (lows[second] <= highs[first] + tolerance), axis=1)
+
+
+def broadphase_pairs(lows, highs, cell_size: float = None) \
+        -> npt.NDArray[np.int64]:
+    """
+        Пары (i, j), i < j, чьи ограничивающие параллелепипеды пересекаются.
+        Коробки раскладываются по ячейкам пространственного хеша,
+         сравниваются только коробки из общих ячеек. Коробки больше
+         BROADPHASE_MAX_CELLS ячеек проверяются со всеми остальными.
+        По умолчанию размер ячейки - BROADPHASE_CELL_PERCENTILE-й
+         процентиль наибольших размеров коробок, так что несколько
+         больших коробок не укрупняют сетку для остальных.
+    """
+    lows = np.asarray(lows, dtype=np.float64).reshape(-1, 3)
+    highs = np.asarray(highs, dtype=np.float64).reshape(-1, 3)
+    count = len(lows)
+    if count < 2:
+        return np.empty((0, 2), dtype=np.int64)
+    if cell_size is None:
+        cell_size = float(np.percentile(np.max(highs - lows, axis=1),
+                                        BROADPHASE_CELL_PERCENTILE))
+    if cell_size <= 0:
+        cell_size = 1.0
+
+    low_cells = np.floor(lows / cell_size).astype(np.int64)
+    high_cells = np.floor(highs / cell_size).astype(np.int64)
+    cell_counts = np.prod((high_cells - low_cells + 1).astype(np.float64),
+                          axis=1)
+    large = cell_counts > BROADPHASE_MAX_CELLS
+
+    cells = {}
+    for index in np.flatnonzero(~large).tolist():
+        for cell in itertools.product(*map(range, low_cells[index].tolist(),
+                                           (high_cells[index] + 1).tolist())):
+            cells.setdefault(cell, []).append(index)
+
+    candidates = set()
+    for indices in cells.values():
+        if len(indices) > 1:
+            candidates.update(itertools.combinations(indices, 2))
+    result = []
+    if candidates:
+        pairs = np.array(sorted(candidates), dtype=np.int64)
+        result.append(pairs[_overlaps(lows, highs, pairs[:, 0], pairs[:, 1])])
+
+    others = np.arange(count)
+    for index in np.flatnonzero(large).tolist():
+        # пары двух больших коробок берутся один раз, у меньшего индекса
+        partners = others[(others > index) | ~large]
+        partners = partners[partners != index]
+        hit = partners[_overlaps(lows, highs,
+                                 np.full(len(partners), index), partners)]
+        result.append(np.sort(np.stack(
+            [np.full(len(hit), index), hit], axis=1), axis=1))
+
+    if not result:
+        return np.empty((0, 2), dtype=np.int64)
+    pairs = np.concatenate(result)
+    if len(pairs) == 0:
+        return np.empty((0, 2), dtype=np.int64)
+    return np.unique(pairs, axis=0)
+
+
+def find_segment_intersections(starts, ends, cell_size: float = None) \
+        -> tuple[npt.NDArray[np.int64], npt.NDArray[np.float64]]:
+    """
+        Все попарные пересечения N отрезков.
+        Возвращает пары индексов K x 2 и точки пересечения K x 3.
+    """
+    starts = np.asarray(starts, dtype=np.float64).reshape(-1, 3)
+    ends = np.asarray(ends, dtype=np.float64).reshape(-1, 3)
+    pairs = broadphase_pairs(np.minimum(starts, ends),
+                             np.maximum(starts, ends), cell_size)
+    points = segment_segment_batch(starts[pairs[:, 0]], ends[pairs[:, 0]],
+                                   starts[pairs[:, 1]], ends[pairs[:, 1]])
+    hit = ~np.isnan(points[:, 0])
+    return pairs[hit], points[hit]
@@ -0,0 +1,123 @@
+"""
+    Измерения над массивами вершин: длины отрезков, площади и объёмы
+     треугольников и поиск ближайшей точки по равномерной сетке.
+    Объём считается как в core.helpers.pyramid_volume_sign - через
+     смешанное произведение, но для всех треугольников сразу.
+"""
+
+import itertools
+from typing import Optional
+
+import numpy as np
+import numpy.typing as npt
+
+
+def edge_lengths(starts, ends) -> npt.NDArray[np.float64]:
+    starts = np.asarray(starts, dtype=np.float64).reshape(-1, 3)
+    ends = np.asarray(ends, dtype=np.float64).reshape(-1, 3)
+    return np.linalg.norm(ends - starts, axis=1)
+
+
+def triangle_areas(points1, points2, points3) -> npt.NDArray[np.float64]:
+    points1 = np.asarray(points1, dtype=np.float64).reshape(-1, 3)
+    normals = np.cross(np.asarray(points2, dtype=np.float64) - points1,
+                       np.asarray(points3, dtype=np.float64) - points1)
+    return np.linalg.norm(normals.reshape(-1, 3), axis=1) / 2
+
+
+def signed_volumes(points1, points2, points3) -> npt.NDArray[np.float64]:
+    """
+        Объёмы со знаком пирамид с вершиной в начале координат.
+        Сумма по замкнутой сетке с нормалями наружу - её объём.
+    """
+    points1 = np.asarray(points1, dtype=np.float64).reshape(-1, 3)
+    points2 = np.asarray(points2, dtype=np.float64).reshape(-1, 3)
+    points3 = np.asarray(points3, dtype=np.float64).reshape(-1, 3)
+    return np.einsum('nk,nk->n', points1, np.cross(points2, points3)) / 6
+
+
+class PointGrid:
+    """
+        Точки, разложенные по ячейкам равномерной сетки внутри их
+         ограничивающего параллелепипеда. Ячейки отсортированы по ключу,
+         точки ячейки ищутся двоичным поиском.
+        Ближайшая точка ищется по слоям ячеек вокруг запроса, пока
+         найденное расстояние не станет меньше расстояния до
+         непросмотренных слоёв.
+    """
+
+    POINTS_PER_CELL = 4
+
+    def __init__(self, positions):
+        self.__positions = np.asarray(positions,
+                                      dtype=np.float64).reshape(-1, 3)
+        count = len(self.__positions)
+        if count == 0:
+            return
+        self.__low = self.__positions.min(axis=0)
+        extent = self.__positions.max(axis=0) - self.__low
+        cells_per_axis = max(1.0, (count / PointGrid.POINTS_PER_CELL) **
+                             (1 / 3))
+        self.__cell_size = max(float(extent.max()) / cells_per_axis, 1e-9)
+        self.__dims = np.floor(extent / self.__cell_size).astype(
+            np.int64) + 1
+
+        keys = self.__keys(self.__cells(self.__positions))
+        self.__order = np.argsort(keys, kind='stable')
+        self.__sorted_keys = keys[self.__order]
+
+    def __len__(self) -> int:
+        return len(self.__positions)
+
+    def __cells(self, positions) -> npt.NDArray[np.int64]:
+        cells = np.floor((positions - self.__low) /
+                         self.__cell_size).astype(np.int64)
+        return np.clip(cells, 0, self.__dims - 1)
+
+    def __keys(self, cells) -> npt.NDArray[np.int64]:
+        return (cells[..., 0] * self.__dims[1] + cells[..., 1]) * \
+            self.__dims[2] + cells[..., 2]
+
+    def __ring(self, center: npt.NDArray[np.int64],
+               radius: int) -> npt.NDArray[np.int64]:
+        """Индексы точек из ячеек на расстоянии radius по Чебышёву"""
+        offsets = np.array([offset for offset in itertools.product(
+            range(-radius, radius + 1), repeat=3)
+                            if max(map(abs, offset)) == radius],
+                           dtype=np.int64).reshape(-1, 3)
+        cells = center + offsets
+        inside = np.all((cells >= 0) & (cells < self.__dims), axis=1)
+        keys = self.__keys(cells[inside])
+        starts = np.searchsorted(self.__sorted_keys, keys, side='left')
+        ends = np.searchsorted(self.__sorted_keys, keys, side='right')
+        if not np.any(ends > starts):
+            return np.empty(0, dtype=np.int64)
+        return self.__order[np.concatenate(
+            [np.arange(start, end) for start, end in
+             zip(starts.tolist(), ends.tolist()) if end > start])]
+
+    def nearest(self, position) -> Optional[tuple[int, float]]:
+        """Индекс ближайшей точки и расстояние до неё, None для пустой
+         сетки"""
+        if len(self.__positions) == 0:
+            return None
+        position = np.asarray(position, dtype=np.float64).reshape(3)
+        high = self.__low + self.__dims * self.__cell_size
+        clamped = np.clip(position, self.__low, high)
+        outside = float(np.linalg.norm(position - clamped))
+        center = self.__cells(clamped)
+
+        best_index, best_distance = -1, np.inf
+        for radius in range(int(self.__dims.max()) + 1):
+            candidates = self.__ring(center, radius)
+            if len(candidates):
+                distances = np.linalg.norm(
+                    self.__positions[candidates] - position, axis=1)
+                index = int(np.argmin(distances))
+                if distances[index] < best_distance:
+                    best_index = int(candidates[index])
+                    best_distance = float(distances[index])
+            # точки дальних слоёв не ближе radius ячеек от clamped
+            if best_distance <= radius * self.__cell_size - outside:
+                break
+        return best_index, best_distance
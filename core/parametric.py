@@ -0,0 +1,110 @@
+"""
+    Параметрические поверхности. Функция поверхности вычисляется сразу
+     для всей сетки параметров (u, v) массивами NumPy. Сетка может
+     сгущаться там, где поверхность сильно изгибается: интервал делится
+     пополам, пока середина поверхности отходит от хорды дальше допуска.
+"""
+
+from typing import Callable, Optional
+
+import numpy as np
+import numpy.typing as npt
+
+from core.generators import Mesh, grid_triangles
+
+SurfaceFunction = Callable[[np.ndarray, np.ndarray], tuple]
+
+EXPRESSION_NAMES = {name: getattr(np, name) for name in (
+    'sin', 'cos', 'tan', 'arcsin', 'arccos', 'arctan', 'arctan2', 'sinh',
+    'cosh', 'tanh', 'exp', 'log', 'sqrt', 'abs', 'minimum', 'maximum',
+    'pi', 'e')}
+
+
+def compile_expression(x: str, y: str, z: str) -> SurfaceFunction:
+    """
+        Функция поверхности из трёх выражений от u и v, например
+         "u", "v", "sin(u * v)". В выражениях доступны только u, v
+         и имена из EXPRESSION_NAMES.
+    """
+    codes = [compile(text.strip(), '<surface>', 'eval')
+             for text in (x, y, z)]
+
+    def function(u, v):
+        names = dict(EXPRESSION_NAMES, u=u, v=v)
+        return tuple(eval(code, {'__builtins__': {}}, names)
+                     for code in codes)
+
+    return function
+
+
+def evaluate(function: SurfaceFunction, u: np.ndarray,
+             v: np.ndarray) -> npt.NDArray[np.float64]:
+    """Точки поверхности для массивов параметров одной формы, результат
+     формы u.shape + (3,). Вне области определения получается NaN"""
+    with np.errstate(all='ignore'):
+        components = function(u, v)
+    return np.stack([np.broadcast_to(
+        np.asarray(np.real(component), dtype=np.float64), u.shape)
+        for component in components], axis=-1)
+
+
+def _midpoint_errors(function: SurfaceFunction, us, vs) \
+        -> npt.NDArray[np.float64]:
+    """Отклонение середин интервалов us от хорд, наибольшее по всем vs"""
+    middles = (us[:-1] + us[1:]) / 2
+    nodes = evaluate(function, *np.meshgrid(us, vs, indexing='ij'))
+    centers = evaluate(function, *np.meshgrid(middles, vs, indexing='ij'))
+    errors = np.linalg.norm(centers - (nodes[:-1] + nodes[1:]) / 2, axis=-1)
+    return np.where(np.isfinite(errors), errors, 0).max(axis=1)
+
+
+def _refine(function: SurfaceFunction, us, vs, tolerance: float):
+    errors = _midpoint_errors(function, us, vs)
+    coarse = errors > tolerance
+    if not coarse.any():
+        return us
+    middles = (us[:-1] + us[1:]) / 2
+    return np.sort(np.concatenate([us, middles[coarse]]))
+
+
+def refine_parameters(function: SurfaceFunction, us: np.ndarray,
+                      vs: np.ndarray, tolerance: float,
+                      levels: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+        Сгущает значения параметров там, где середина интервала отходит
+         от хорды дальше tolerance. За один уровень каждый интервал
+         делится не больше одного раза.
+    """
+    for _ in range(levels):
+        new_us = _refine(function, us, vs, tolerance)
+        new_vs = _refine(lambda v, u: function(u, v), vs, new_us, tolerance)
+        if len(new_us) == len(us) and len(new_vs) == len(vs):
+            break
+        us, vs = new_us, new_vs
+    return us, vs
+
+
+def sample_surface(function: SurfaceFunction, u_range: tuple[float, float],
+                   v_range: tuple[float, float], u_count: int, v_count: int,
+                   tolerance: Optional[float] = None,
+                   levels: int = 3) -> Mesh:
+    """
+        Вершины и треугольники поверхности на сетке u_count x v_count
+         значений параметров. Если задан tolerance, сетка сгущается
+         не больше чем на levels уровней.
+        Треугольники с вершинами вне области определения отбрасываются.
+    """
+    us = np.linspace(*u_range, u_count)
+    vs = np.linspace(*v_range, v_count)
+    if tolerance is not None:
+        us, vs = refine_parameters(function, us, vs, tolerance, levels)
+
+    positions = evaluate(function,
+                         *np.meshgrid(us, vs, indexing='ij')).reshape(-1, 3)
+    triangles = grid_triangles(len(us), len(vs))
+    valid = np.all(np.isfinite(positions), axis=1)
+    if not valid.all():
+        triangles = triangles[np.all(valid[triangles], axis=1)]
+        new_indices = np.cumsum(valid) - 1
+        positions, triangles = positions[valid], new_indices[triangles]
+    return positions.astype(np.float32), triangles
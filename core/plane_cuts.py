@@ -0,0 +1,234 @@
+"""
+    Сечения плоскостями: где плоскость пересекает отрезки и треугольники.
+    Сначала все точки одним умножением раскладываются по сторонам
+     плоскости, точные пересечения ищутся только у объектов, точки
+     которых лежат по разные стороны или на самой плоскости.
+"""
+
+from _weakref import ref
+from typing import Iterable
+from weakref import WeakKeyDictionary
+
+import glm
+import numpy as np
+import numpy.typing as npt
+
+from core.Base_geometry_objects import BasePlane, Point, Segment, Triangle
+from core.intersections import EPS
+
+
+class PlaneCut:
+    """Сечение одного объекта: точка для отрезка, отрезок для треугольника.
+     Для точки start и end совпадают"""
+    __slots__ = ('__source', 'start', 'end')
+
+    def __init__(self, source, start: glm.vec3, end: glm.vec3):
+        self.__source = ref(source)
+        self.start = start
+        self.end = end
+
+    @property
+    def source(self):
+        return self.__source()
+
+    def is_point(self) -> bool:
+        return self.start == self.end
+
+    def get_serializing_dict(self):
+        source = self.source
+        return {
+            "source": None if source is None else source.id,
+            "points": [list(self.start), list(self.end)]
+        }
+
+
+def get_tolerance(plane: BasePlane) -> float:
+    """Допуск, с которым точка считается лежащей на плоскости"""
+    return EPS * (1 + abs(plane.get_offset()))
+
+
+def classify_sides(distances: npt.NDArray[np.float64],
+                   tolerance: float) -> npt.NDArray[np.int8]:
+    """Сторона плоскости для каждого расстояния: -1, 0 или 1"""
+    return np.where(np.abs(distances) <= tolerance, 0,
+                    np.sign(distances)).astype(np.int8)
+
+
+def _cut_rows(positions: npt.NDArray[np.float64],
+              distances: npt.NDArray[np.float64], edges, tolerance: float) \
+        -> tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]]:
+    """
+        positions - K x V x 3 вершины объектов, distances - K x V расстояния
+         со знаком от вершин до плоскости, edges - пары вершин.
+        Возвращает начала и концы сечений K x 3, NaN - сечения нет.
+        Объекты, целиком лежащие в плоскости, не секутся.
+    """
+    count, vertices = distances.shape
+    sides = classify_sides(distances, tolerance)
+    candidates = [positions[:, i] for i in range(vertices)]
+    valid = [sides[:, i] == 0 for i in range(vertices)]
+    for i, j in edges:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = distances[:, i] / (distances[:, i] - distances[:, j])
+            candidates.append(positions[:, i] + t[:, None] *
+                              (positions[:, j] - positions[:, i]))
+        valid.append(sides[:, i] * sides[:, j] < 0)
+
+    candidates = np.stack(candidates, axis=1)
+    valid = np.stack(valid, axis=1) & ~np.all(sides == 0, axis=1)[:, None]
+    rows = np.arange(count)
+    starts = candidates[rows, np.argmax(valid, axis=1)]
+    offsets = candidates - starts[:, None]
+    spread = np.einsum('ncd,ncd->nc', offsets, offsets)
+    spread[~valid] = -1
+    ends = candidates[rows, np.argmax(spread, axis=1)]
+
+    missing = ~valid.any(axis=1)
+    starts[missing] = np.nan
+    ends[missing] = np.nan
+    return starts, ends
+
+
+class _SourceGroup:
+    """Однотипные объекты сечения и дескрипторы их точек"""
+
+    def __init__(self, sources: list, handles: npt.NDArray[np.int64], edges):
+        self.sources = sources
+        self.handles = handles
+        self.edges = edges
+        self.rows = None
+
+
+class _PlaneState:
+    __slots__ = ('topology_version', 'plane_version', 'versions',
+                 'distances', 'cuts')
+
+
+class PlaneCutEngine:
+    """
+        Считает сечения плоскостей всеми зарегистрированными отрезками
+         и треугольниками и складывает их в BasePlane.cuts.
+        Для каждой плоскости запоминаются версии точек и расстояния до
+         них, поэтому после перемещения пересчитываются только объекты
+         со сдвинутыми точками. Смена самой плоскости или набора
+         объектов приводит к полному пересчёту.
+    """
+
+    SEGMENT_EDGES = ((0, 1),)
+    TRIANGLE_EDGES = ((0, 1), (1, 2), (2, 0))
+
+    def __init__(self):
+        self.__sources = {}
+        self.__topology_version = 0
+        self.__groups = None
+        self.__unique = None
+        self.__states = WeakKeyDictionary()
+
+    def add_sources(self, primitives: Iterable):
+        for primitive in primitives:
+            if isinstance(primitive, (Segment, Triangle)):
+                self.__sources[primitive] = None
+                self.__topology_changed()
+
+    def remove_sources(self, primitives: Iterable):
+        for primitive in primitives:
+            if self.__sources.pop(primitive, 0) is None:
+                self.__topology_changed()
+
+    def clear(self):
+        self.__sources.clear()
+        self.__topology_changed()
+
+    def __topology_changed(self):
+        self.__topology_version += 1
+        self.__groups = None
+
+    def __get_groups(self) -> list[_SourceGroup]:
+        if self.__groups is not None:
+            return self.__groups
+
+        segments = [s for s in self.__sources if isinstance(s, Segment)]
+        triangles = [t for t in self.__sources if isinstance(t, Triangle)]
+        groups = [
+            _SourceGroup(segments, np.array(
+                [(s.point1.handle, s.point2.handle) for s in segments],
+                dtype=np.int64).reshape(-1, 2), PlaneCutEngine.SEGMENT_EDGES),
+            _SourceGroup(triangles, np.array(
+                [(t.point1.handle, t.point2.handle, t.point3.handle)
+                 for t in triangles], dtype=np.int64).reshape(-1, 3),
+                         PlaneCutEngine.TRIANGLE_EDGES)
+        ]
+        self.__unique, inverse = np.unique(
+            np.concatenate([group.handles.ravel() for group in groups]),
+            return_inverse=True)
+        offset = 0
+        for group in groups:
+            size = group.handles.size
+            group.rows = inverse[offset:offset + size].reshape(
+                group.handles.shape)
+            offset += size
+        self.__groups = groups
+        return groups
+
+    def update(self, plane: BasePlane) -> bool:
+        """Обновляет сечения плоскости. Возвращает True, если они
+         изменились"""
+        groups = self.__get_groups()
+        unique = self.__unique
+        versions = Point.STORE.versions[unique]
+        plane_version = plane.get_points_version()
+        state = self.__states.get(plane, None)
+
+        if state is None or \
+                state.topology_version != self.__topology_version or \
+                state.plane_version != plane_version:
+            state = _PlaneState()
+            state.topology_version = self.__topology_version
+            state.plane_version = plane_version
+            state.distances = self.__get_distances(plane, unique)
+            state.cuts = {}
+            changed = None
+        else:
+            changed = versions != state.versions
+            if not changed.any():
+                return False
+            state.distances[changed] = self.__get_distances(
+                plane, unique[changed])
+        state.versions = versions
+        self.__states[plane] = state
+
+        tolerance = get_tolerance(plane)
+        for index, group in enumerate(groups):
+            if changed is None:
+                rows = np.arange(len(group.sources))
+            else:
+                rows = np.flatnonzero(changed[group.rows].any(axis=1))
+            self.__update_rows(state.cuts, index, group, rows, state.distances,
+                               tolerance)
+        plane.set_cuts(state.cuts.values())
+        return True
+
+    @staticmethod
+    def __get_distances(plane: BasePlane, handles) -> npt.NDArray[np.float64]:
+        normal = np.array(plane.get_normal(), dtype=np.float64)
+        positions = Point.STORE.positions[handles].astype(np.float64)
+        return positions @ normal - plane.get_offset()
+
+    @staticmethod
+    def __update_rows(cuts: dict, index: int, group: _SourceGroup, rows,
+                      distances, tolerance: float):
+        if len(rows) == 0:
+            return
+        point_rows = group.rows[rows]
+        positions = Point.STORE.positions[group.handles[rows]].astype(
+            np.float64)
+        starts, ends = _cut_rows(positions, distances[point_rows],
+                                 group.edges, tolerance)
+        hit = ~np.isnan(starts[:, 0])
+        for row, is_hit, start, end in zip(rows.tolist(), hit.tolist(),
+                                           starts.tolist(), ends.tolist()):
+            if is_hit:
+                cuts[index, row] = PlaneCut(group.sources[row],
+                                            glm.vec3(*start), glm.vec3(*end))
+            else:
+                cuts.pop((index, row), None)
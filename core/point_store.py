@@ -0,0 +1,175 @@
+import sys
+import uuid
+from typing import Optional
+
+import glm
+import numpy as np
+import numpy.typing as npt
+
+
+class PointStore:
+    """
+        Колоночное хранилище точек. Точка - это целочисленный дескриптор,
+         её координаты лежат строкой в общем массиве N x 3 float32.
+        Имена по умолчанию не хранятся строками: вместо них хранится номер,
+         явно заданные имена интернируются в отдельной таблице.
+        Каждое изменение позиции увеличивает версию точки, по которой
+         зависимые объекты могут понять, что их кэш устарел.
+    """
+
+    INITIAL_CAPACITY = 1024
+    NAME_PREFIX = "Point"
+
+    def __init__(self, capacity: int = INITIAL_CAPACITY):
+        capacity = max(capacity, 1)
+        self.__positions = np.zeros((capacity, 3), dtype=np.float32)
+        self.__versions = np.zeros(capacity, dtype=np.uint32)
+        self.__numbers = np.zeros(capacity, dtype=np.int64)
+        self.__alive = np.zeros(capacity, dtype=bool)
+        self.__ids: list[Optional[str]] = [None] * capacity
+        self.__names: dict[int, str] = {}
+        self.__free: list[int] = []
+        self.__size = 0
+        self.__counter = 1
+
+    def __len__(self) -> int:
+        return self.__size - len(self.__free)
+
+    @property
+    def capacity(self) -> int:
+        return len(self.__positions)
+
+    @property
+    def positions(self) -> npt.NDArray[np.float32]:
+        """Массив позиций. Строки освобождённых точек содержат мусор"""
+        return self.__positions[:self.__size]
+
+    @property
+    def versions(self) -> npt.NDArray[np.uint32]:
+        return self.__versions[:self.__size]
+
+    @property
+    def alive_handles(self) -> npt.NDArray[np.int64]:
+        return np.flatnonzero(self.__alive[:self.__size])
+
+    def __reserve(self, size: int):
+        capacity = self.capacity
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        extra = capacity - self.capacity
+        self.__positions = np.concatenate(
+            [self.__positions, np.zeros((extra, 3), dtype=np.float32)])
+        self.__versions = np.concatenate(
+            [self.__versions, np.zeros(extra, dtype=np.uint32)])
+        self.__numbers = np.concatenate(
+            [self.__numbers, np.zeros(extra, dtype=np.int64)])
+        self.__alive = np.concatenate([self.__alive,
+                                       np.zeros(extra, dtype=bool)])
+        self.__ids.extend([None] * extra)
+
+    def allocate(self, pos: glm.vec3, name: Optional[str] = None,
+                 obj_id: Optional[str] = None) -> int:
+        if self.__free:
+            handle = self.__free.pop()
+        else:
+            self.__reserve(self.__size + 1)
+            handle = self.__size
+            self.__size += 1
+
+        self.__positions[handle] = (pos.x, pos.y, pos.z)
+        self.__versions[handle] += 1
+        self.__alive[handle] = True
+        self.__ids[handle] = obj_id
+        self.__set_name(handle, name)
+        return handle
+
+    def allocate_many(self, positions) -> npt.NDArray[np.int64]:
+        """Добавляет точки с именами по умолчанию одним пакетом"""
+        positions = np.asarray(positions, dtype=np.float32).reshape(-1, 3)
+        count = len(positions)
+        reused = self.__free[-count:] if count else []
+        del self.__free[len(self.__free) - len(reused):]
+        reused.reverse()
+
+        start = self.__size
+        self.__reserve(start + count - len(reused))
+        self.__size += count - len(reused)
+        handles = np.concatenate([np.array(reused, dtype=np.int64),
+                                  np.arange(start, self.__size)])
+
+        self.__positions[handles] = positions
+        self.__versions[handles] += 1
+        self.__alive[handles] = True
+        self.__numbers[handles] = np.arange(self.__counter,
+                                            self.__counter + count)
+        self.__counter += count
+        for handle in reused:
+            self.__ids[handle] = None
+            self.__names.pop(handle, None)
+        return handles
+
+    def release(self, handle: int):
+        if not self.__alive[handle]:
+            return
+        self.__alive[handle] = False
+        self.__versions[handle] += 1
+        self.__ids[handle] = None
+        self.__names.pop(handle, None)
+        self.__free.append(handle)
+
+    def get_position(self, handle: int) -> glm.vec3:
+        return glm.vec3(*self.__positions[handle].tolist())
+
+    def get_coordinate(self, handle: int, axis: int) -> float:
+        return float(self.__positions[handle, axis])
+
+    def set_position(self, handle: int, pos: glm.vec3):
+        self.__positions[handle] = (pos.x, pos.y, pos.z)
+        self.__versions[handle] += 1
+
+    def get_positions(self, handles) -> npt.NDArray[np.float32]:
+        return self.__positions[np.asarray(handles, dtype=np.int64)]
+
+    def set_positions(self, handles, positions):
+        handles = np.asarray(handles, dtype=np.int64)
+        self.__positions[handles] = positions
+        self.__versions[handles] += 1
+
+    def get_version(self, handle: int) -> int:
+        return int(self.__versions[handle])
+
+    def get_versions_sum(self, handles: tuple[int, ...]) -> int:
+        """Сумма версий точек. Версии только растут, поэтому сумма
+         меняется при изменении любой из точек"""
+        return sum(map(self.__versions.item, handles))
+
+    def get_id(self, handle: int) -> str:
+        obj_id = self.__ids[handle]
+        if obj_id is None:
+            obj_id = self.__ids[handle] = str(uuid.uuid4())
+        return obj_id
+
+    def get_name(self, handle: int) -> str:
+        name = self.__names.get(handle, None)
+        if name is None:
+            return f"{PointStore.NAME_PREFIX}{self.__numbers[handle]}"
+        return name
+
+    def set_name(self, handle: int, name: str):
+        self.__names[handle] = sys.intern(name)
+
+    def __set_name(self, handle: int, name: Optional[str]):
+        if name is None:
+            self.__numbers[handle] = self.__counter
+            self.__counter += 1
+            self.__names.pop(handle, None)
+        else:
+            self.__names[handle] = sys.intern(name)
+
+    def nbytes(self) -> int:
+        """Память, занятая колонками хранилища"""
+        return (self.__positions.nbytes + self.__versions.nbytes +
+                self.__numbers.nbytes + self.__alive.nbytes +
+                sys.getsizeof(self.__ids))
@@ -0,0 +1,243 @@
+"""
+    Выпуклая оболочка и триангуляция Делоне облака точек.
+    Оболочка строится алгоритмом quickhull: к граням прикрепляются
+     лежащие над ними точки, и на каждом шаге самая дальняя точка
+     заменяет видимые из неё грани веером граней к горизонту.
+    Триангуляция Делоне на плоскости - нижняя часть оболочки точек,
+     поднятых на параболоид z = x^2 + y^2.
+"""
+
+from typing import Optional
+
+import numpy as np
+import numpy.typing as npt
+
+from core.intersections import EPS
+
+# Сдвиг поднятых точек для Делоне, в долях размера облака: без него
+# точки на одной окружности лежат на одной грани параболоида
+DELAUNAY_JOGGLE = 1e-9
+DELAUNAY_EPS = 1e-13
+
+
+def _cross(u: npt.NDArray[np.float64],
+           v: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+    """Построчное векторное произведение: np.cross заметно медленнее
+     на маленьких массивах, которые строит каждый шаг quickhull"""
+    return u[:, [1, 2, 0]] * v[:, [2, 0, 1]] - \
+        u[:, [2, 0, 1]] * v[:, [1, 2, 0]]
+
+
+class _Face:
+    __slots__ = ('vertices', 'normal', 'offset', 'outside')
+
+    def __init__(self, vertices: tuple[int, int, int], normal, offset: float):
+        self.vertices = vertices
+        self.normal = normal
+        self.offset = offset
+        self.outside = None
+
+
+def _initial_simplex(points: npt.NDArray[np.float64],
+                     tolerance: float) -> Optional[list[int]]:
+    """Четыре точки общего положения или None для плоского облака"""
+    lows, highs = points.argmin(axis=0), points.argmax(axis=0)
+    axis = np.argmax(points[highs, range(3)] - points[lows, range(3)])
+    a, b = int(lows[axis]), int(highs[axis])
+    direction = points[b] - points[a]
+    if direction @ direction <= tolerance ** 2:
+        return None
+
+    offsets = _cross(points - points[a], direction[None, :])
+    c = int(np.argmax(np.einsum('nk,nk->n', offsets, offsets)))
+    normal = np.cross(direction, points[c] - points[a])
+    length = np.linalg.norm(normal)
+    if length <= tolerance * np.linalg.norm(direction):
+        return None
+
+    distances = (points - points[a]) @ (normal / length)
+    d = int(np.argmax(np.abs(distances)))
+    if abs(distances[d]) <= tolerance:
+        return None
+    return [a, b, c, d] if distances[d] < 0 else [a, c, b, d]
+
+
+class _Hull:
+    def __init__(self, points: npt.NDArray[np.float64], tolerance: float):
+        self.points = points
+        self.tolerance = tolerance
+        self.faces = {}
+        self.half_edges = {}
+        self.pending = []
+        self.next_id = 0
+
+    def add_faces(self, triangles: list[tuple[int, int, int]],
+                  candidates: npt.NDArray[np.int64]):
+        """Добавляет грани и раздаёт им candidates: каждая точка
+         прикрепляется к грани, над которой лежит выше всего"""
+        vertices = np.array(triangles, dtype=np.int64)
+        p1, p2, p3 = (self.points[vertices[:, k]] for k in range(3))
+        normals = _cross(p2 - p1, p3 - p1)
+        lengths = np.sqrt(np.einsum('nk,nk->n', normals, normals))
+        normals /= np.maximum(lengths, np.finfo(np.float64).tiny)[:, None]
+        offsets = np.einsum('nk,nk->n', normals, p1)
+
+        ids = []
+        for triangle, normal, offset in zip(triangles, normals,
+                                            offsets.tolist()):
+            face_id = self.next_id
+            self.next_id += 1
+            self.faces[face_id] = _Face(triangle, normal, offset)
+            a, b, c = triangle
+            self.half_edges[a, b] = face_id
+            self.half_edges[b, c] = face_id
+            self.half_edges[c, a] = face_id
+            ids.append(face_id)
+
+        if len(candidates) == 0:
+            return
+        distances = self.points[candidates] @ normals.T - offsets
+        best = np.argmax(distances, axis=1)
+        above = distances[np.arange(len(candidates)), best] > self.tolerance
+        candidates, best = candidates[above], best[above]
+        order = np.argsort(best, kind='stable')
+        candidates, best = candidates[order], best[order]
+        bounds = np.searchsorted(best, np.arange(len(ids) + 1))
+        for index, face_id in enumerate(ids):
+            if bounds[index] < bounds[index + 1]:
+                self.faces[face_id].outside = \
+                    candidates[bounds[index]:bounds[index + 1]]
+                self.pending.append(face_id)
+
+    def remove_face(self, face_id: int):
+        a, b, c = self.faces.pop(face_id).vertices
+        for edge in ((a, b), (b, c), (c, a)):
+            del self.half_edges[edge]
+
+    def distance(self, face: _Face, index: int) -> float:
+        return float(self.points[index] @ face.normal) - face.offset
+
+    def add_point(self, face_id: int):
+        """Заменяет грани, видимые из самой дальней точки грани face_id"""
+        face = self.faces[face_id]
+        outside = face.outside
+        eye = int(outside[np.argmax(self.points[outside] @ face.normal)])
+
+        visible = {face_id}
+        hidden = set()
+        horizon = []
+        stack = [face_id]
+        while stack:
+            a, b, c = self.faces[stack.pop()].vertices
+            for edge in ((a, b), (b, c), (c, a)):
+                neighbour = self.half_edges[edge[1], edge[0]]
+                if neighbour in visible:
+                    continue
+                if neighbour not in hidden and \
+                        self.distance(self.faces[neighbour], eye) > \
+                        self.tolerance:
+                    visible.add(neighbour)
+                    stack.append(neighbour)
+                else:
+                    hidden.add(neighbour)
+                    horizon.append(edge)
+
+        candidates = [self.faces[visible_id].outside for visible_id in visible
+                      if self.faces[visible_id].outside is not None]
+        for visible_id in visible:
+            self.remove_face(visible_id)
+        candidates = np.concatenate(candidates)
+        self.add_faces([(a, b, eye) for a, b in horizon],
+                       candidates[candidates != eye])
+
+    def build(self, simplex: list[int]) -> npt.NDArray[np.int64]:
+        a, b, c, d = simplex
+        rest = np.setdiff1d(np.arange(len(self.points)), simplex)
+        self.add_faces([(a, b, c), (a, d, b), (b, d, c), (c, d, a)], rest)
+        while self.pending:
+            face_id = self.pending.pop()
+            if face_id in self.faces:
+                self.add_point(face_id)
+        return np.array([face.vertices for face in self.faces.values()],
+                        dtype=np.int64).reshape(-1, 3)
+
+
+def _scale(points: npt.NDArray[np.float64]) -> float:
+    return float(np.abs(points).max()) if len(points) else 0.0
+
+
+def convex_hull(points, tolerance: Optional[float] = None) \
+        -> npt.NDArray[np.int64]:
+    """
+        Треугольники выпуклой оболочки точек N x 3 (индексы точек),
+         нормали смотрят наружу. Точки ближе tolerance к грани считаются
+         лежащими на ней. Для плоского облака возвращает пустой массив.
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    if tolerance is None:
+        tolerance = EPS * (1 + _scale(points))
+    if len(points) < 4:
+        return np.empty((0, 3), dtype=np.int64)
+    simplex = _initial_simplex(points, tolerance)
+    if simplex is None:
+        return np.empty((0, 3), dtype=np.int64)
+    return _Hull(points, tolerance).build(simplex)
+
+
+def _signed_areas(points: npt.NDArray[np.float64],
+                  triangles: npt.NDArray[np.int64]) -> npt.NDArray[np.float64]:
+    p1, p2, p3 = (points[triangles[:, k]] for k in range(3))
+    u, v = p2 - p1, p3 - p1
+    return (u[:, 0] * v[:, 1] - u[:, 1] * v[:, 0]) / 2
+
+
+def delaunay(points) -> npt.NDArray[np.int64]:
+    """Триангуляция Делоне точек плоскости N x 2, треугольники обходятся
+     против часовой стрелки"""
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    if len(points) < 3:
+        return np.empty((0, 3), dtype=np.int64)
+    center = (points.min(axis=0) + points.max(axis=0)) / 2
+    size = float(np.max(points.max(axis=0) - points.min(axis=0)))
+    if size == 0:
+        return np.empty((0, 3), dtype=np.int64)
+    local = (points - center) / size
+    jitter = np.random.default_rng(len(points)).uniform(
+        -DELAUNAY_JOGGLE, DELAUNAY_JOGGLE, local.shape)
+    jittered = local + jitter
+    lifted = np.column_stack([jittered,
+                              np.einsum('nk,nk->n', jittered, jittered)])
+
+    simplex = _initial_simplex(lifted, DELAUNAY_EPS)
+    if simplex is None:
+        return np.empty((0, 3), dtype=np.int64)
+    hull = _Hull(lifted, DELAUNAY_EPS)
+    triangles = hull.build(simplex)
+    lower = [face.normal[2] < 0 for face in hull.faces.values()]
+    triangles = triangles[np.array(lower, dtype=bool)]
+
+    areas = _signed_areas(local, triangles)
+    triangles = triangles[np.abs(areas) > EPS ** 2]
+    flipped = _signed_areas(local, triangles) < 0
+    triangles[flipped] = triangles[flipped][:, [0, 2, 1]]
+    return triangles
+
+
+def plane_basis(points) -> tuple[npt.NDArray[np.float64],
+                                 npt.NDArray[np.float64]]:
+    """Центр и три оси точек по убыванию разброса: две первые лежат
+     в плоскости наилучшего приближения, третья - её нормаль"""
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    center = points.mean(axis=0)
+    _, _, axes = np.linalg.svd(points - center)
+    return center, axes
+
+
+def triangulate_planar(points) -> npt.NDArray[np.int64]:
+    """Делоне для точек N x 3 в проекции на плоскость наилучшего
+     приближения"""
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    if len(points) < 3:
+        return np.empty((0, 3), dtype=np.int64)
+    center, axes = plane_basis(points)
+    return delaunay((points - center) @ axes[:2].T)
@@ -0,0 +1,120 @@
+import itertools
+
+import numpy as np
+import numpy.typing as npt
+
+# Совпадает с допуском core.helpers.almost_equal_vec: distance2 < 1e-8
+WELD_TOLERANCE = 1e-4
+
+# Множители хеша ячейки; коллизии лишь добавляют пары-кандидаты,
+# которые затем отсеиваются проверкой расстояния
+_CELL_HASH = np.array([73856093, 19349663, 83492791], dtype=np.uint64)
+
+# Половина из 26 соседних ячеек: каждая пара соседей рассматривается один раз
+_NEIGHBOUR_OFFSETS = [offset for offset in
+                      itertools.product((-1, 0, 1), repeat=3)
+                      if offset > (0, 0, 0)]
+
+
+def _cell_keys(cells: npt.NDArray[np.int64]) -> npt.NDArray[np.uint64]:
+    hashed = cells.astype(np.uint64) * _CELL_HASH
+    return hashed[:, 0] ^ hashed[:, 1] ^ hashed[:, 2]
+
+
+def _expand_pairs(order, starts, counts, cells_a, cells_b):
+    """Все пары точек из ячеек cells_a[i] и cells_b[i]"""
+    count_a, count_b = counts[cells_a], counts[cells_b]
+    totals = count_a * count_b
+    total = int(totals.sum())
+    if total == 0:
+        return np.empty(0, np.int64), np.empty(0, np.int64)
+
+    group = np.repeat(np.arange(len(totals)), totals)
+    local = np.arange(total) - np.repeat(np.cumsum(totals) - totals, totals)
+    width = count_b[group]
+    first = order[starts[cells_a[group]] + local // width]
+    second = order[starts[cells_b[group]] + local % width]
+    return first, second
+
+
+def _close_pairs(positions, tolerance):
+    """Пары индексов точек, расстояние между которыми меньше tolerance.
+     Точки раскладываются по ячейкам хеш-сетки с шагом tolerance,
+     сравниваются только точки из одной или соседних ячеек."""
+    coords = np.floor(positions / tolerance).astype(np.int64)
+    keys = _cell_keys(coords)
+    order = np.argsort(keys)
+    sorted_keys = keys[order]
+    is_start = np.empty(len(keys), dtype=bool)
+    is_start[0] = True
+    is_start[1:] = sorted_keys[1:] != sorted_keys[:-1]
+    starts = np.flatnonzero(is_start)
+    unique_cells = sorted_keys[starts]
+    counts = np.diff(np.append(starts, len(keys)))
+    coords = coords[order[starts]]
+
+    all_cells = np.arange(len(unique_cells))
+    first, second = _expand_pairs(order, starts, counts, all_cells, all_cells)
+    pairs = [(first[first < second], second[first < second])]
+    for offset in _NEIGHBOUR_OFFSETS:
+        neighbours = _cell_keys(coords + np.array(offset, dtype=np.int64))
+        found = np.searchsorted(unique_cells, neighbours)
+        found = np.minimum(found, len(unique_cells) - 1)
+        exists = unique_cells[found] == neighbours
+        pairs.append(_expand_pairs(order, starts, counts,
+                                   all_cells[exists], found[exists]))
+
+    first = np.concatenate([pair[0] for pair in pairs])
+    second = np.concatenate([pair[1] for pair in pairs])
+    distance2 = np.sum((positions[first] - positions[second]) ** 2, axis=1)
+    close = distance2 < tolerance * tolerance
+    return first[close], second[close]
+
+
+def _component_labels(count, first, second) -> npt.NDArray[np.int64]:
+    """Для каждой точки - наименьший индекс в её компоненте связности"""
+    labels = np.arange(count)
+    while True:
+        updated = labels.copy()
+        np.minimum.at(updated, first, labels[second])
+        np.minimum.at(updated, second, labels[first])
+        updated = updated[updated]
+        if np.array_equal(updated, labels):
+            return labels
+        labels = updated
+
+
+def weld_positions(positions, tolerance: float = WELD_TOLERANCE) -> (
+        npt.NDArray[np.int64], npt.NDArray[np.int64]):
+    """
+        Объединяет точки, находящиеся ближе tolerance друг к другу
+         (в том числе по цепочке).
+        Возвращает индексы оставшихся точек (первые в каждой группе,
+         в исходном порядке) и отображение старого индекса в новый.
+    """
+    positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+    if len(positions) == 0:
+        return np.empty(0, np.int64), np.empty(0, np.int64)
+
+    # Точные совпадения схлопываются сразу, чтобы ячейки сетки оставались
+    # маленькими даже для сотен копий одной точки
+    order = np.lexsort(positions.T[::-1])
+    ordered = positions[order]
+    is_start = np.empty(len(order), dtype=bool)
+    is_start[0] = True
+    is_start[1:] = np.any(ordered[1:] != ordered[:-1], axis=1)
+    first_index = order[is_start]
+    unique = positions[first_index]
+    inverse = np.empty(len(order), dtype=np.int64)
+    inverse[order] = np.cumsum(is_start) - 1
+
+    first, second = _close_pairs(unique, tolerance)
+    labels = _component_labels(len(unique), first, second)
+
+    representative = np.full(len(unique), len(positions), dtype=np.int64)
+    np.minimum.at(representative, labels, first_index)
+    kept_per_point = representative[labels][inverse]
+
+    kept = np.unique(kept_per_point)
+    remap = np.searchsorted(kept, kept_per_point)
+    return kept, remap
@@ -1,15 +1,18 @@
 import os.path
 
-from PyQt5.QtCore import QObject
+from PyQt5.QtCore import QObject, QTimer
 from PyQt5.QtGui import QCloseEvent
 from PyQt5.QtOpenGL import QGLWidget, QGLFormat
 from PyQt5.QtWidgets import (QMainWindow, QWidget, QSplitter, QHBoxLayout,
                              QSizePolicy, QVBoxLayout, QLineEdit, QLabel,
                              QShortcut, QFileDialog,
-                             QAction, QErrorMessage)
+                             QAction, QErrorMessage, QInputDialog,
+                             QMessageBox, QPushButton)
 
 from PIL import Image, ImageOps
 
+from core import generators, parametric
+
 from profiling.profiler import profile
 from core.event_dispatcher import *
 from gui.interfaces import GLSceneInterface
@@ -18,13 +21,23 @@ from interaction.camera_controller import CameraController
 from interaction.geometry_builders import *
 from render.shaders import ShaderProgram
 from scene.camera import Camera
-from scene.render_geometry import SceneGrid, SceneCoordAxis
+from scene.measurements import MeasurementEngine
+from scene.mesh_batch import MeshBatch
+from scene.render_geometry import SceneGrid, SceneCoordAxis, \
+    create_scene_object
 from scene.scene import Scene
+from scene.plane_slice import slice_by_plane
+from scene.point_meshes import hull_from_points, triangulate_points
+from scene.scene_diff import UndoStack
+from scene.subdivision import split_edges
+from scene.validation import repair_scene
 from scene.scene_object import SceneObject
-from serialization import serialize
+from serialization import serialize, compressed, mesh_io
 
 
 class Window(QMainWindow):
+    MESH_FILTER = "Модели (*.obj *.ply *.stl)"
+
     def __init__(self):
         super(Window, self).__init__()
         self.__editor = EditorGUI()
@@ -43,10 +56,33 @@ class Window(QMainWindow):
         self.__save_scene_action.triggered.connect(self.__on_save_scene)
 
         file_menu.addAction(self.__save_scene_action)
+        file_menu.addAction('Сохранить сжатую сцену',
+                            self.__on_save_compressed_scene, "Ctrl+Shift+S")
         file_menu.addAction('Открыть сцену', self.__on_load_scene, "Ctrl+O")
         file_menu.addAction('Новая сцена', self.__on_new_scene, "Ctrl+N")
         file_menu.addAction('Экспортировать в BMP', self.__export_bmp,
                             "Ctrl+E")
+        file_menu.addAction('Импортировать модель', self.__on_import_mesh,
+                            "Ctrl+I")
+        file_menu.addAction('Экспортировать модель', self.__on_export_mesh,
+                            "Ctrl+Shift+E")
+
+        self.__weld_action = QAction()
+        self.__weld_action.setText("Сваривать совпадающие точки")
+        self.__weld_action.setCheckable(True)
+        self.__weld_action.toggled.connect(self.__editor.set_weld_on_load)
+        file_menu.addAction(self.__weld_action)
+        file_menu.addAction('Проверить и исправить сцену',
+                            self.__on_repair_scene)
+
+        primitives_menu = menu_bar.addMenu('Примитивы')
+        for name in EditorGUI.PRIMITIVES:
+            primitives_menu.addAction(
+                name, lambda checked=False, primitive=name:
+                self.__editor.add_primitive(primitive))
+        primitives_menu.addSeparator()
+        primitives_menu.addAction('Параметрическая поверхность',
+                                  self.__on_add_surface)
 
         self.setCentralWidget(self.__editor)
         self.setWindowTitle('3D Editor')
@@ -100,13 +136,90 @@ class Window(QMainWindow):
             self.__error_message.setWindowTitle("Ошибка сохранения сцены")
             self.__error_message.showMessage(err_message)
 
+    def __on_save_compressed_scene(self):
+        dialog = self.__file_selection_dialog
+        dialog.setAcceptMode(QFileDialog.AcceptSave)
+        dialog.setFileMode(QFileDialog.AnyFile)
+
+        save_file = dialog.getSaveFileName(self, "Сохранение сжатой сцены",
+                                           directory="scene.scene")
+        file = save_file[0]
+        if not file:
+            return
+
+        err_message = self.__editor.save_scene(file, compress=True)
+        if err_message:
+            self.__error_message.setWindowTitle("Ошибка сохранения сцены")
+            self.__error_message.showMessage(err_message)
+
+    def __on_repair_scene(self):
+        QMessageBox.information(self, "Проверка сцены",
+                                self.__editor.repair_scene())
+
+    def __on_add_surface(self):
+        text, accepted = QInputDialog.getText(
+            self, "Параметрическая поверхность",
+            "x; y; z от u, v из [-1, 1]:", text=EditorGUI.DEFAULT_SURFACE)
+        if not accepted:
+            return
+
+        err_message = self.__editor.add_surface(text)
+        if err_message:
+            self.__error_message.setWindowTitle("Ошибка в выражении")
+            self.__error_message.showMessage(err_message)
+
+    def __on_import_mesh(self):
+        dialog = self.__file_selection_dialog
+        dialog.setAcceptMode(QFileDialog.AcceptOpen)
+        dialog.setFileMode(QFileDialog.ExistingFile)
+
+        load_file = dialog.getOpenFileName(self, "Импорт модели",
+                                           filter=Window.MESH_FILTER)
+        file = load_file[0]
+        if not file:
+            return
+
+        err_message = self.__editor.import_mesh(file)
+        if err_message:
+            self.__error_message.setWindowTitle("Ошибка импорта модели")
+            self.__error_message.showMessage(err_message)
+
+    def __on_export_mesh(self):
+        dialog = self.__file_selection_dialog
+        dialog.setAcceptMode(QFileDialog.AcceptSave)
+        dialog.setFileMode(QFileDialog.AnyFile)
+
+        save_file = dialog.getSaveFileName(self, "Экспорт модели",
+                                           directory="model.obj",
+                                           filter=Window.MESH_FILTER)
+        file = save_file[0]
+        if not file:
+            return
+
+        err_message = self.__editor.export_mesh(file)
+        if err_message:
+            self.__error_message.setWindowTitle("Ошибка экспорта модели")
+            self.__error_message.showMessage(err_message)
+
     def closeEvent(self, event: QCloseEvent):
         self.__editor.on_quit(event)
 
 
 class EditorGUI(QWidget):
+    STREAMING_OBJECT_COUNT = 200_000
+    PRIMITIVES = {
+        'Сфера': lambda: generators.sphere(1, 32, 16),
+        'Цилиндр': lambda: generators.cylinder(1, 2, 32),
+        'Тор': lambda: generators.torus(1.5, 0.5, 48, 24),
+        'Сетка': lambda: generators.grid(10, 10, 20, 20),
+    }
+    DEFAULT_SURFACE = "u; sin(3 * u) * cos(3 * v) / 3; v"
+    SURFACE_SAMPLES = 64
+    SURFACE_TOLERANCE = 1e-3
+
     def __init__(self):
         super(EditorGUI, self).__init__()
+        self.__weld_on_load = False
         self.__action_splitter = QSplitter(Qt.Vertical)
         self.__main_splitter = QSplitter(Qt.Horizontal)
 
@@ -144,29 +257,96 @@ class EditorGUI(QWidget):
     def new_scene(self):
         self.__gl_widget.set_scene(None, None)
 
-    def save_scene(self, file_name: str) -> str:
+    def set_weld_on_load(self, value: bool):
+        """Сваривать ли совпадающие точки при загрузке и импорте"""
+        self.__weld_on_load = value
+
+    def save_scene(self, file_name: str, compress: bool = False) -> str:
         try:
-            serialize.serialize_scene(self.__gl_widget.get_scene(), file_name)
+            self.__gl_widget.finish_streaming()
+            if compress:
+                compressed.serialize_scene_compressed(
+                    self.__gl_widget.get_scene(), file_name)
+            else:
+                serialize.serialize_scene(self.__gl_widget.get_scene(),
+                                          file_name)
             return ''
         except Exception as e:
             return str(e)
 
     def load_scene(self, file_name: str) -> str:
         try:
-            camera_settings, objects, children_data = \
-                serialize.deserialize_scene(file_name)
+            if compressed.is_compressed_scene(file_name):
+                streamer = compressed.SceneStreamer(file_name)
+                if self.__weld_on_load:
+                    streamer.weld()
+                if streamer.object_count >= EditorGUI.STREAMING_OBJECT_COUNT:
+                    self.__gl_widget.set_scene(streamer.camera_settings,
+                                               streamer=streamer)
+                    return ''
+                camera_settings = streamer.camera_settings
+                objects, children_data = streamer.load_all()
+            else:
+                camera_settings, objects, children_data = \
+                    serialize.deserialize_scene(file_name,
+                                                weld=self.__weld_on_load)
             self.__gl_widget.set_scene(camera_settings, objects,
                                        children_data)
             return ''
         except Exception as e:
             return str(e)
 
+    def import_mesh(self, file_name: str) -> str:
+        try:
+            mesh_io.import_mesh(self.__gl_widget.get_scene(), file_name,
+                                self.__weld_on_load)
+            return ''
+        except Exception as e:
+            return str(e)
+
+    def export_mesh(self, file_name: str) -> str:
+        """Экспортирует выделенные объекты, а если их нет - всю сцену"""
+        try:
+            self.__gl_widget.finish_streaming()
+            scene = self.__gl_widget.get_scene()
+            selected = [obj for obj in scene.objects if obj.selected]
+            mesh_io.export_mesh(scene, file_name, selected or None)
+            return ''
+        except Exception as e:
+            return str(e)
+
+    def add_primitive(self, name: str):
+        positions, triangles = EditorGUI.PRIMITIVES[name]()
+        self.__gl_widget.add_mesh(positions, triangles)
+
+    def repair_scene(self) -> str:
+        """Исправляет сцену и возвращает описание найденных проблем"""
+        return self.__gl_widget.repair_scene().summary()
+
+    def add_surface(self, expressions: str) -> str:
+        """Строит поверхность по трём выражениям через ';'"""
+        try:
+            parts = expressions.split(';')
+            if len(parts) != 3:
+                return "Нужно три выражения через ';'"
+            function = parametric.compile_expression(*parts)
+            count = EditorGUI.SURFACE_SAMPLES
+            positions, triangles = parametric.sample_surface(
+                function, (-1, 1), (-1, 1), count, count,
+                EditorGUI.SURFACE_TOLERANCE)
+            self.__gl_widget.add_mesh(positions, triangles)
+            return ''
+        except Exception as e:
+            return str(e)
+
     def on_quit(self, event: QCloseEvent):
         self.__gl_widget.unload()
         event.setAccepted(True)
 
 
 class GLScene(QGLWidget, GLSceneInterface, EventHandlerInterface):
+    STREAM_DISTANCE = 100
+
     def __init__(self):
 
         sur_format = QGLFormat()
@@ -183,6 +363,9 @@ class GLScene(QGLWidget, GLSceneInterface, EventHandlerInterface):
         self.__scene = None
         self.__camera_controller = None
         self.__geometry_builder = None
+        self.__streamer = None
+        self.__stream_cell = None
+        self.__undo_stack = None
         self.__last_action = None
         self.__initialized = False
         self.__shaders = []
@@ -198,35 +381,138 @@ class GLScene(QGLWidget, GLSceneInterface, EventHandlerInterface):
         self.__delete_sc.activated.connect(self.__on_delete)
         self.__cancel_sc = QShortcut("Esc", self)
         self.__cancel_sc.activated.connect(self.__cancel)
+        self.__undo_sc = QShortcut("Ctrl+Z", self)
+        self.__undo_sc.activated.connect(self.undo)
+        self.__redo_sc = QShortcut("Ctrl+Y", self)
+        self.__redo_sc.activated.connect(self.redo)
 
     def move(self, move: glm.vec3):
         if self.__rmb_held:
             self.get_scene().camera.move_by(move)
+            self.__stream_visible()
             self.redraw()
             return
 
-        if not self.__moving:
+        selected = self.__get_transformed_objects()
+        if not selected:
             return
-        selected = [obj for obj in self.get_scene().objects if obj.selected]
-        if len(selected) != 1:
-            return
-        selected = selected[0]
         camera = self.get_scene().camera
         transformed_move = move.x * camera.right + move.y * camera.up + \
                            move.z * camera.forward
-        selected.update_position(
-            selected.transform.translation + transformed_move)
+        self.get_scene().move_objects(selected, transformed_move)
+        self.redraw()
+
+    def rotate(self, angle: float):
+        """Поворачивает выделение вокруг направления взгляда камеры"""
+        selected = self.__get_transformed_objects()
+        if not selected:
+            return
+        axis = self.get_scene().camera.forward
+        self.get_scene().transform_objects(
+            selected, glm.rotate(glm.radians(angle), axis))
+        self.redraw()
+
+    def scale(self, factor: float):
+        selected = self.__get_transformed_objects()
+        if not selected:
+            return
+        self.get_scene().transform_objects(selected,
+                                           glm.scale(glm.vec3(factor)))
+        self.redraw()
+
+    def slice_by_plane(self):
+        """Режет выделенные грани и рёбра выделенной плоскостью"""
+        scene = self.get_scene()
+        selected = [obj for obj in scene.objects if obj.selected]
+        planes = [obj for obj in selected if isinstance(obj, ScenePlane)]
+        if len(planes) != 1:
+            print("Для разреза нужно выделить ровно одну плоскость")
+            return
+        with self.__undo_stack.group():
+            created = slice_by_plane(scene, planes[0], selected)
+        scene.select([obj for obj in created if isinstance(obj, ScenePoint)])
         self.redraw()
 
+    def subdivide(self, times: int = 1):
+        """Делит пополам выделенные рёбра и рёбра выделенных граней"""
+        scene = self.get_scene()
+        edges = {}
+        for obj in scene.objects:
+            if not obj.selected:
+                continue
+            if isinstance(obj, SceneEdge):
+                edges[obj] = None
+            elif isinstance(obj, SceneFace):
+                edges.update((parent, None) for parent in obj.parents
+                             if isinstance(parent, SceneEdge))
+        if not edges:
+            return
+        with self.__undo_stack.group():
+            created = split_edges(scene, edges, times=times)
+        scene.select([obj for obj in created if isinstance(obj, ScenePoint)])
+        self.redraw()
+
+    def repair_scene(self):
+        """Проверяет всю сцену и исправляет найденное одним действием"""
+        self.finish_streaming()
+        with self.__undo_stack.group():
+            report = repair_scene(self.get_scene())
+        self.redraw()
+        return report
+
+    def convex_hull(self):
+        """Строит выпуклую оболочку выделенных точек"""
+        self.__mesh_selected_points(hull_from_points, 4)
+
+    def triangulate(self):
+        """Триангулирует выделенные точки в их плоскости"""
+        self.__mesh_selected_points(triangulate_points, 3)
+
+    def __mesh_selected_points(self, build, min_count: int):
+        scene = self.get_scene()
+        points = [obj for obj in scene.objects
+                  if obj.selected and isinstance(obj, ScenePoint)]
+        if len(points) < min_count:
+            print(f"Нужно выделить хотя бы {min_count} точки")
+            return
+        with self.__undo_stack.group():
+            created = build(scene, points)
+        scene.select(created)
+        self.redraw()
+
+    def add_mesh(self, positions, triangles):
+        """Добавляет сетку из массивов вершин и треугольников одним
+         действием отмены и выделяет её"""
+        scene = self.get_scene()
+        batch = MeshBatch()
+        batch.add_points(positions)
+        batch.add_triangles(triangles)
+        with self.__undo_stack.group():
+            created = batch.add_to(scene)
+        scene.select(created)
+        self.redraw()
+
+    def __get_transformed_objects(self) -> list[SceneObject]:
+        if not self.__moving:
+            return []
+        return [obj for obj in self.get_scene().objects if obj.selected]
+
     @staticmethod
-    def __resolve_children(data, objects):
+    def __resolve_children(data, objects, scene=None):
+        def find(obj_id):
+            obj = objects.get(obj_id, None)
+            if obj is None and scene is not None:
+                obj = scene.get_object(obj_id)
+            return obj
+
         for parent_id, child_ids in data.items():
-            parent = objects[parent_id]
+            parent = find(parent_id)
             for child_id in child_ids:
-                child = objects[child_id]
+                child = find(child_id)
                 parent.add_children(child)
 
-    def set_scene(self, camera_settings=None, objects=None, children_data=None):
+    def set_scene(self, camera_settings=None, objects=None, children_data=None,
+                  streamer=None):
         SharedMesh.clear_meshes()
 
         camera = Camera(self.width(), self.height())
@@ -251,23 +537,62 @@ class GLScene(QGLWidget, GLSceneInterface, EventHandlerInterface):
         self.__scene = scene
         self.__camera_controller = controller
 
+        if self.__undo_stack is not None:
+            self.__undo_stack.detach()
+        self.__undo_stack = UndoStack(scene)
+
+        self.__streamer = streamer
+        self.__stream_cell = None
+        if streamer is not None:
+            scene.on_objects_removed += self.__on_streamed_objects_removed
+            self.__stream_visible()
+
         self.redraw()
 
+    def __stream_visible(self):
+        """Догружает объекты вокруг камеры при потоковой загрузке сцены"""
+        streamer = self.__streamer
+        if streamer is None or streamer.is_complete:
+            return
+
+        camera_pos = self.__scene.camera.translation
+        cell_size = GLScene.STREAM_DISTANCE / 2
+        cell = tuple(int(value // cell_size) for value in camera_pos)
+        if cell == self.__stream_cell:
+            return
+        self.__stream_cell = cell
+
+        distance = glm.vec3(GLScene.STREAM_DISTANCE)
+        objects, children_data = streamer.load_region(
+            (camera_pos - distance, camera_pos + distance))
+        self.__add_loaded_objects(objects, children_data)
+
+    def finish_streaming(self):
+        """Догружает всю сцену, например перед сохранением"""
+        if self.__streamer is None:
+            return
+        objects, children_data = self.__streamer.load_all()
+        self.__add_loaded_objects(objects, children_data)
+        self.__streamer = None
+
+    def __add_loaded_objects(self, objects, children_data):
+        if not objects:
+            return
+        scene_objects = dict(self.__convert_objects(objects))
+        self.__resolve_children(children_data, scene_objects, self.__scene)
+        with self.__undo_stack.paused():
+            self.__scene.add_objects(scene_objects.values())
+
+    def __on_streamed_objects_removed(self, scene_objects):
+        if self.__streamer is not None:
+            self.__streamer.forget(obj.id for obj in scene_objects)
+
     @staticmethod
     def __convert_objects(objects):
         for obj_id, obj in objects.items():
-            if isinstance(obj, Point):
-                yield obj_id, ScenePoint(obj)
-            elif isinstance(obj, BaseLine):
-                yield obj_id, SceneLine(obj)
-            elif isinstance(obj, BasePlane):
-                yield obj_id, ScenePlane(obj)
-            elif isinstance(obj, Segment):
-                yield obj_id, SceneEdge(obj)
-            elif isinstance(obj, Triangle):
-                yield obj_id, SceneFace(obj)
-            else:
-                print(f"Unknown object {obj}")
+            scene_object = create_scene_object(obj)
+            if scene_object is not None:
+                yield obj_id, scene_object
 
     @staticmethod
     def __action(func):
@@ -292,6 +617,20 @@ class GLScene(QGLWidget, GLSceneInterface, EventHandlerInterface):
     def redraw(self):
         self.update()
 
+    def undo(self):
+        if self.__geometry_builder is not None and \
+                self.__geometry_builder.has_any_progress:
+            return
+        if self.__undo_stack.undo():
+            self.redraw()
+
+    def redo(self):
+        if self.__geometry_builder is not None and \
+                self.__geometry_builder.has_any_progress:
+            return
+        if self.__undo_stack.redo():
+            self.redraw()
+
     def get_scene(self):
         return self.__scene
 
@@ -333,7 +672,11 @@ class GLScene(QGLWidget, GLSceneInterface, EventHandlerInterface):
         self.__initialized = True
 
     def eventFilter(self, a0: 'QObject', a1: 'QEvent') -> bool:
-        redraw = dispatch(self, a1)
+        if self.__undo_stack is None:
+            redraw = dispatch(self, a1)
+        else:
+            with self.__undo_stack.group():
+                redraw = dispatch(self, a1)
         if redraw:
             self.redraw()
         return super(GLScene, self).eventFilter(a0, a1)
@@ -385,6 +728,8 @@ class GLScene(QGLWidget, GLSceneInterface, EventHandlerInterface):
         if not self.__initialized:
             return False
         update = dispatch(self.__camera_controller, event)
+        if update:
+            self.__stream_visible()
         if self.__geometry_builder is not None:
             update |= dispatch(self.__geometry_builder, event)
         if update:
@@ -479,8 +824,10 @@ class SceneExplorer(QWidget):
         self.__list = SceneObjectList(gl_scene)
 
         self.__props = SceneObjectProperties(gl_scene)
+        self.__measurements = MeasurementPanel(gl_scene)
 
         layout.addWidget(self.__props)
+        layout.addWidget(self.__measurements)
         layout.addWidget(self.__list)
 
         self.setLayout(layout)
@@ -563,14 +910,21 @@ class SceneObjectProperties(QWidget):
             prev_scene.on_objects_selected -= self.__on_objects_selected
             prev_scene.on_objects_deselected -= self.__on_objects_deselected
             prev_scene.on_objects_removed -= self.__on_objects_removed
+            prev_scene.on_objects_moved -= self.__on_objects_changed
+            prev_scene.on_object_renamed -= self.__on_objects_changed
         if new_scene is not None:
             new_scene.on_objects_selected += self.__on_objects_selected
             new_scene.on_objects_deselected += self.__on_objects_deselected
             new_scene.on_objects_removed += self.__on_objects_removed
+            new_scene.on_objects_moved += self.__on_objects_changed
+            new_scene.on_object_renamed += self.__on_objects_changed
 
     def __on_objects_removed(self, scene_objects):
         self.__on_objects_deselected(scene_objects)
 
+    def __on_objects_changed(self, *args):
+        self.update_properties()
+
     def __on_objects_selected(self, scene_objects):
         for obj in scene_objects:
             self.__selected_objects.add(obj)
@@ -618,11 +972,116 @@ class SceneObjectProperties(QWidget):
             pos = glm.vec3(float(self.x_edit.text()),
                            float(self.y_edit.text()),
                            float(self.z_edit.text()))
-            prim = self.__scene_object.primitive
-            if prim is not None:
-                self.__scene_object.primitive.name = name
-                self.__scene_object.post_update()
-            self.__scene_object.update_position(pos)
+            scene = self.__gl_scene().get_scene()
+            if self.__scene_object.primitive is not None:
+                scene.rename_object(self.__scene_object, name)
+            scene.move_object(self.__scene_object, pos)
             self.__gl_scene().redraw()
         except ValueError:
             self.update_properties()
+
+
+class MeasurementPanel(QWidget):
+    """
+        Длина, площадь, объём и центр выделенных объектов.
+        События сцены только помечают данные устаревшими, пересчёт
+         откладывается таймером, так что серия событий при выделении
+         или перемещении большой сетки даёт один пересчёт.
+    """
+
+    def __init__(self, gl_scene: GLSceneInterface):
+        super(MeasurementPanel, self).__init__()
+
+        gl_scene.on_scene_changed += self.__on_scene_changed
+        self.__gl_scene = ref(gl_scene)
+
+        self.__engine = MeasurementEngine()
+        self.__selected_objects = {}
+        self.__selection_changed = False
+
+        self.__timer = QTimer(self)
+        self.__timer.setSingleShot(True)
+        self.__timer.timeout.connect(self.update_measurements)
+
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.setLayout(layout)
+
+        self.__summary = QLabel()
+        layout.addWidget(self.__summary)
+
+        query = QWidget()
+        query_layout = QHBoxLayout()
+        query_layout.setContentsMargins(0, 0, 0, 0)
+        self.__query_edit = QLineEdit("0 0 0")
+        nearest_button = QPushButton("Ближайшая точка")
+        nearest_button.clicked.connect(self.show_nearest_point)
+        query_layout.addWidget(self.__query_edit)
+        query_layout.addWidget(nearest_button)
+        query.setLayout(query_layout)
+        layout.addWidget(query)
+
+        self.__nearest = QLabel()
+        layout.addWidget(self.__nearest)
+
+        self.update_measurements()
+
+    def __on_scene_changed(self, prev_scene, new_scene):
+        if prev_scene is not None:
+            prev_scene.on_objects_selected -= self.__on_objects_selected
+            prev_scene.on_objects_deselected -= self.__on_objects_deselected
+            prev_scene.on_objects_removed -= self.__on_objects_deselected
+            prev_scene.on_objects_moved -= self.__on_objects_moved
+        if new_scene is not None:
+            new_scene.on_objects_selected += self.__on_objects_selected
+            new_scene.on_objects_deselected += self.__on_objects_deselected
+            new_scene.on_objects_removed += self.__on_objects_deselected
+            new_scene.on_objects_moved += self.__on_objects_moved
+        self.__selected_objects.clear()
+        self.__schedule(True)
+
+    def __on_objects_selected(self, scene_objects):
+        self.__selected_objects.update((obj, None) for obj in scene_objects)
+        self.__schedule(True)
+
+    def __on_objects_deselected(self, scene_objects):
+        for obj in scene_objects:
+            self.__selected_objects.pop(obj, None)
+        self.__schedule(True)
+
+    def __on_objects_moved(self, *args):
+        self.__schedule(False)
+
+    def __schedule(self, selection_changed: bool):
+        self.__selection_changed |= selection_changed
+        if not self.__timer.isActive():
+            self.__timer.start(0)
+
+    def update_measurements(self):
+        if self.__selection_changed:
+            self.__selection_changed = False
+            self.__engine.set_objects(self.__selected_objects)
+            self.__nearest.clear()
+        result = self.__engine.measure()
+        lines = [f"Точек: {result.point_count}, рёбер: {result.edge_count},"
+                 f" граней: {result.face_count}",
+                 f"Длина рёбер: {result.length:.4f}",
+                 f"Площадь: {result.area:.4f}",
+                 f"Объём: {result.volume:.4f}"]
+        if result.centroid is not None:
+            x, y, z = result.centroid
+            lines.append(f"Центр: {x:.4f} {y:.4f} {z:.4f}")
+        self.__summary.setText("\n".join(lines))
+
+    def show_nearest_point(self):
+        try:
+            x, y, z = map(float, self.__query_edit.text().split())
+        except ValueError:
+            self.__nearest.setText("Введите три координаты")
+            return
+        found = self.__engine.nearest_point((x, y, z))
+        if found is None:
+            self.__nearest.setText("Нет выделенных точек")
+            return
+        point, distance = found
+        self.__nearest.setText(f"{point.primitive.name}: {distance:.4f}")
@@ -11,6 +11,30 @@ class GLSceneInterface:
     def move(self, move: glm.vec3):
         pass
 
+    def rotate(self, angle: float):
+        pass
+
+    def scale(self, factor: float):
+        pass
+
+    def slice_by_plane(self):
+        pass
+
+    def subdivide(self, times: int = 1):
+        pass
+
+    def repair_scene(self):
+        pass
+
+    def convex_hull(self):
+        pass
+
+    def triangulate(self):
+        pass
+
+    def add_mesh(self, positions, triangles):
+        pass
+
     def get_scene(self) -> Scene:
         raise NotImplementedError
 
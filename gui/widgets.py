@@ -12,12 +12,21 @@ from PyQt5.QtWidgets import (QWidget, QHBoxLayout, QSizePolicy, QPushButton,
                              QListWidgetItem, QListView, QShortcut)
 
 import profiling.profiler
+from core import parametric
 from gui.interfaces import GLSceneInterface
 from scene.render_geometry import ScenePoint, SceneEdge
 from scene.scene_object import SceneObject
 
 
 class SceneActions(QWidget):
+    ROTATION_STEP = 15
+    SCALE_STEP = 1.1
+    STRESS_SURFACES = (
+        ('sinh(u) * cosh(v)', 'sinh(v)', 'cosh(u) * cosh(v)'),
+        ('u', 'v', 'sin(2 * (u + v ** 3))'),
+        ('u', 'v', 'sqrt(maximum(1 - u * u / 100 - v * v / 100, 0))'),
+    )
+
     def __init__(self, gl_scene: GLSceneInterface):
         super(QWidget, self).__init__()
 
@@ -54,9 +63,14 @@ class SceneActions(QWidget):
         create_button("Edge", self.action_edge, "Alt+E")
         create_button("Face", self.action_face, "Alt+F")
         create_button("Divide", self.action_divide, "Alt+D")
+        create_button("Subdiv", self.action_subdivide, "Alt+Shift+D")
         layout.addStretch()
         create_button("Line", self.action_line, "Alt+L")
         create_button("Plane", self.action_plane, "Alt+Shift+P")
+        create_button("Slice", self.action_slice, "Alt+S")
+        layout.addStretch()
+        create_button("Hull", self.action_hull, "Alt+H")
+        create_button("Triang", self.action_triangulate, "Alt+T")
         layout.addStretch()
         create_button("Rect", self.action_rect, "Alt+Shift+R")
         layout.addStretch()
@@ -73,6 +87,10 @@ class SceneActions(QWidget):
         create_shortcut("D", self.action_d)
         create_shortcut("Q", self.action_q)
         create_shortcut("E", self.action_e)
+        create_shortcut("R", self.action_rotate_left)
+        create_shortcut("Shift+R", self.action_rotate_right)
+        create_shortcut("=", self.action_scale_up)
+        create_shortcut("-", self.action_scale_down)
 
         self.setFixedHeight(layout.sizeHint().height())
 
@@ -100,6 +118,30 @@ class SceneActions(QWidget):
         move = glm.vec3(0, -1, 0)
         self.__gl_scene().move(move)
 
+    def action_rotate_left(self):
+        self.__gl_scene().rotate(SceneActions.ROTATION_STEP)
+
+    def action_rotate_right(self):
+        self.__gl_scene().rotate(-SceneActions.ROTATION_STEP)
+
+    def action_scale_up(self):
+        self.__gl_scene().scale(SceneActions.SCALE_STEP)
+
+    def action_scale_down(self):
+        self.__gl_scene().scale(1 / SceneActions.SCALE_STEP)
+
+    def action_slice(self):
+        self.__gl_scene().slice_by_plane()
+
+    def action_hull(self):
+        self.__gl_scene().convex_hull()
+
+    def action_triangulate(self):
+        self.__gl_scene().triangulate()
+
+    def action_subdivide(self):
+        self.__gl_scene().subdivide()
+
     def action_divide(self):
         self.__set_button_selected(self.sender())
         self.__gl_scene().create_division()
@@ -109,56 +151,11 @@ class SceneActions(QWidget):
         self.__gl_scene().create_rect()
 
     def action_stress_test2(self):
-        def set1(u, v):
-            x = glm.sinh(u) * glm.cosh(v)
-            y = glm.sinh(v)
-            z = glm.cosh(u) * glm.cosh(v)
-            return glm.vec3(x, y, z)
-
-        def set2(u, v):
-            x = u
-            y = v
-            z = glm.sin(2 * (x + y * y * y))
-            return glm.vec3(x, y, z)
-
-        def set3(u, v):
-            x = u
-            y = v
-            z = (1 - x * x / 100 - y * y / 100) ** 0.5
-            return glm.vec3(x, y, z.real)
-
-        scene = self.__gl_scene().get_scene()
-        bounds = 10
-        step = 0.2
-        max_buffer_size = 10_000
-
-        func = random.choice([set1, set2, set3])
-
-        prev = None
-        objects = []
-        u = -bounds
-        while u < bounds:
-            v = -bounds
-            while v < bounds:
-                v += step
-                pos = func(u, v)
-                point = ScenePoint.by_pos(pos)
-                objects.append(point)
-
-                if prev:
-                    edge = SceneEdge.by_two_points(prev, point)
-                    objects.append(edge)
-                prev = point
-
-                if len(objects) >= max_buffer_size - 2:
-                    scene.add_objects(objects)
-                    objects.clear()
-            u += step
-
-        if objects:
-            scene.add_objects(objects)
-
-        self.__gl_scene().redraw()
+        expressions = random.choice(SceneActions.STRESS_SURFACES)
+        positions, triangles = parametric.sample_surface(
+            parametric.compile_expression(*expressions), (-10, 10),
+            (-10, 10), 100, 100)
+        self.__gl_scene().add_mesh(positions, triangles)
 
     def action_stress_test1(self):
         scene = self.__gl_scene().get_scene()
@@ -295,6 +292,7 @@ class SceneObjectList(QListWidget):
     def __remove_object(self, scene_object):
         item = self.__object_to_item.pop(scene_object)
         self.__item_to_object.pop(item)
+        item.detach()
         self.takeItem(self.row(item))
 
     @profiling.profiler.profile
@@ -376,6 +374,9 @@ class SceneObjectItem(QListWidgetItem):
     def __object_updated(self, obj):
         self.setText(obj.name)
 
+    def detach(self):
+        self.__scene_object.on_updated -= self.__object_updated
+
     def get_object(self):
         return self.__scene_object
 
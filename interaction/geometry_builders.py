@@ -2,6 +2,8 @@ from abc import ABC
 from typing import Optional, cast
 from weakref import ref
 
+import numpy as np
+
 from PyQt5.QtCore import Qt
 
 from core.event import Event
@@ -9,7 +11,10 @@ from core.interfaces import EventHandlerInterface
 from scene.render_geometry import *
 from scene.scene import Scene
 from scene.scene_object import SceneObject
+from scene.mesh_batch import MeshBatch
+from scene.subdivision import split_edges
 from core.Base_geometry_objects import *
+from core import generators
 
 
 class BaseBuilder(EventHandlerInterface, ABC):
@@ -119,7 +124,7 @@ class LineBuilder(BaseBuilder):
         return True
 
     def __line_from_points(self, p1, p2):
-        child = SceneLine.common_child(p1, p2)
+        child = self._scene().find_child(SceneLine, p1, p2)
         if child is not None:
             self._scene().select(child)
             return child
@@ -200,7 +205,7 @@ class PlaneBuilder(BaseBuilder):
         return True
 
     def __plane_from_point_and_plane(self, point, plane):
-        child = ScenePlane.common_child(point, plane)
+        child = self._scene().find_child(ScenePlane, point, plane)
         if child is not None:
             self._scene().select(child)
             return child
@@ -209,7 +214,7 @@ class PlaneBuilder(BaseBuilder):
         return plane
 
     def __plane_from_point_and_line(self, point, line):
-        child = ScenePlane.common_child(point, line)
+        child = self._scene().find_child(ScenePlane, point, line)
         if child is not None:
             self._scene().select(child)
             return child
@@ -218,7 +223,8 @@ class PlaneBuilder(BaseBuilder):
         return plane
 
     def __plane_from_point_and_segment(self, point, segment):
-        child = ScenePlane.common_child(point, segment)
+        child = self._scene().find_child(ScenePlane, point,
+                                             segment)
         if child is not None:
             self._scene().select(child)
             return child
@@ -227,7 +233,7 @@ class PlaneBuilder(BaseBuilder):
         return plane
 
     def __plane_from_points(self, p1, p2, p3):
-        child = ScenePlane.common_child(p1, p2, p3)
+        child = self._scene().find_child(ScenePlane, p1, p2, p3)
         if child is not None:
             self._scene().select(child)
             return child
@@ -288,7 +294,7 @@ class EdgeBuilder(BaseBuilder):
         return True
 
     def __edge_from_points(self, p1, p2):
-        child = SceneEdge.common_child(p1, p2)
+        child = self._scene().find_child(SceneEdge, p1, p2)
         if child is not None:
             self._scene().select(child)
             return child
@@ -341,36 +347,16 @@ class DivisionBuilder(BaseBuilder):
             print("Edge expected to have exactly 2 point parents.")
             return False
 
-        attached_faces = [obj for obj in edge.children if isinstance(obj, SceneFace)]
-        faces_third_points = [obj for face in attached_faces for obj in face.parents
-                              if isinstance(obj, ScenePoint) and obj not in points]
-
-        div_point = ScenePoint.by_pos(div_point_raw)
-
-        scene = self._scene()
-        scene.remove_object(edge)
-
-        edge1 = SceneEdge.by_two_points(points[0], div_point)
-        edge2 = SceneEdge.by_two_points(points[1], div_point)
-
-        silent_added = [edge1, edge2]
-        selected_added = [div_point]
-
-        for third_point in faces_third_points:
-            connecting_edge = SceneEdge.by_two_points(div_point, third_point)
+        start, end = edge.edge.get_points()
+        ratio = glm.distance(start, div_point_raw) / glm.distance(start, end)
+        created = split_edges(self._scene(), [edge], [ratio])
 
-            face1 = SceneFace.by_three_points(points[0], div_point, third_point)
-            face2 = SceneFace.by_three_points(points[1], div_point, third_point)
-            face1.add_parents(edge1, connecting_edge,
-                              SceneEdge.common_child(third_point, points[0]))
-            face2.add_parents(edge2, connecting_edge,
-                              SceneEdge.common_child(third_point, points[1]))
-
-            selected_added.append(connecting_edge)
-            silent_added.extend([face1, face2])
-
-        scene.add_objects(silent_added + selected_added)
-        scene.select(selected_added)
+        # точка деления и соединяющие её с гранями рёбра
+        div_point = created[0]
+        selected_added = [div_point] + [
+            obj for obj in div_point.children if isinstance(obj, SceneEdge)
+            and not any(parent in points for parent in obj.parents)]
+        self._scene().select(selected_added)
 
         self._set_ready()
 
@@ -435,7 +421,7 @@ class FaceBuilder(BaseBuilder):
         return True
 
     def __edge_from_points(self, p1, p2):
-        child = SceneEdge.common_child(p1, p2)
+        child = self._scene().find_child(SceneEdge, p1, p2)
         if child is not None:
             self._scene().select(child)
             return child
@@ -444,7 +430,7 @@ class FaceBuilder(BaseBuilder):
         return edge
 
     def __face_from_points(self, p1, p2, p3):
-        child = SceneFace.common_child(p1, p2, p3)
+        child = self._scene().find_child(SceneFace, p1, p2, p3)
         if child is not None:
             self._scene().select(child)
             return child
@@ -494,79 +480,19 @@ class RectBuilder(BaseBuilder):
         return True
 
     def __create_cube(self, p2):
-        pos1 = self.p1.transform.translation
-        pos2 = p2.transform.translation
-        dx = glm.vec3(pos2.x - pos1.x, 0, 0)
-        dy = glm.vec3(0, pos2.y - pos1.y, 0)
-        dz = glm.vec3(0, 0, pos2.z - pos1.z)
-
         """
-        Определяет расположение точки относительно смотрящего
-         
-        f - far  | n - near
-        b - bot  | t - top
-        l - left | r - right
-        
-        pos1 = fbl
-        pos2 = ntr
+            Вершины 0 и 7 коробки - уже существующие точки p1 и p2,
+             остальные шесть создаются вместе с рёбрами и гранями
+             одним пакетом.
         """
+        positions, triangles = generators.box(self.p1.transform.translation,
+                                              p2.transform.translation)
+        batch = MeshBatch([self.p1, p2])
+        indices = np.concatenate([[0], batch.add_points(positions[1:7]), [1]])
+        batch.add_triangles(indices[triangles])
 
-        fbl = pos1
-
-        fbr = fbl + dx
-        ftl = fbl + dy
-        ftr = fbr + dy
-        nbl = fbl + dz
-        ntl = nbl + dy
-        nbr = nbl + dx
-
-        positions = [fbr, ftl, ftr, nbl, ntl, nbr]
-        points = [self.p1] + [ScenePoint.by_pos(pos) for pos in positions] + [
-            p2]
-        for i in range(1, len(points) - 1):
-            self._push_object(points[i], True)
-
-        def make_face(first_index, second_index, third_index):
-            first_point = points[first_index]
-            second_point = points[second_index]
-            third_point = points[third_index]
-            face = self.__face_from_points(first_point, second_point,
-                                           third_point)
-            first_edge = self.__edge_from_points(first_point, second_point)
-            second_edge = self.__edge_from_points(second_point, third_point)
-            third_edge = self.__edge_from_points(third_point, first_point)
-            face.add_parents(first_edge, second_edge, third_edge)
-
-        make_face(1, 2, 3)
-        make_face(0, 1, 2)
-        make_face(0, 4, 5)
-        make_face(0, 5, 2)
-        make_face(0, 4, 1)
-        make_face(2, 3, 7)
-        make_face(2, 5, 7)
-        make_face(4, 7, 5)
-        make_face(4, 6, 7)
-        make_face(1, 4, 6)
-        make_face(1, 3, 6)
-        make_face(3, 7, 6)
-
-    def __edge_from_points(self, p1, p2):
-        child = SceneEdge.common_child(p1, p2)
-        if child is not None:
-            self._scene().select(child)
-            return child
-        edge = SceneEdge.by_two_points(p1, p2)
-        self._push_object(edge, True)
-        return edge
-
-    def __face_from_points(self, p1, p2, p3):
-        child = SceneFace.common_child(p1, p2, p3)
-        if child is not None:
-            self._scene().select(child)
-            return child
-        face = SceneFace.by_three_points(p1, p2, p3)
-        self._push_object(face, True)
-        return face
+        scene = self._scene()
+        scene.select(batch.add_to(scene))
 
     def cancel(self):
         scene = self._scene()
@@ -0,0 +1,92 @@
+import gc
+import sys
+import tracemalloc
+
+import glm
+
+from core.Base_geometry_objects import Point
+from render.shared_vbo import MeshProvider
+from scene.render_geometry import ScenePoint, SceneEdge, SceneFace, \
+    SceneLine, ScenePlane
+from scene.scene_object import RawSceneObject
+
+
+class NullMesh:
+    def get_mesh(self):
+        return None
+
+    def set_positions(self, *args, **kwargs):
+        pass
+
+    def set_colors(self, *args, **kwargs):
+        pass
+
+    def set_indices(self, *args, **kwargs):
+        pass
+
+    def clear(self):
+        pass
+
+    def get_vertex_count(self):
+        return 1
+
+
+class NullMeshProvider(MeshProvider):
+    """Не выделяет память под меши, чтобы мерить только объекты сцены"""
+    MESH = NullMesh()
+
+    def get_unique_mesh(self):
+        return NullMeshProvider.MESH
+
+    def get_shared_mesh(self, vertices, render_mode):
+        return NullMeshProvider.MESH
+
+
+def measure(create, count: int) -> tuple[float, list]:
+    """Возвращает среднее число байт на объект и сами объекты"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    objects = [create(i) for i in range(count)]
+    gc.collect()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated = sum(stat.size_diff for stat in
+                    after.compare_to(before, 'filename'))
+    return allocated / count, objects
+
+
+def run(count: int = 20000) -> dict[str, float]:
+    RawSceneObject.MESH_PROVIDER = NullMeshProvider()
+    results = {}
+
+    # Point - объект-дескриптор и строка в Point.STORE; рост колонок
+    # хранилища при выделении тоже попадает в замер
+    results["point primitive"], primitives = measure(
+        lambda i: Point(glm.vec3(i, i % 7, i % 13)), count)
+    results["point object"] = float(sys.getsizeof(primitives[0]))
+    results["store row"] = Point.STORE.nbytes() / Point.STORE.capacity
+    del primitives
+    results["point"], points = measure(
+        lambda i: ScenePoint.by_pos(glm.vec3(i, i % 7, i % 13)), count)
+    results["edge"], _ = measure(
+        lambda i: SceneEdge.by_two_points(points[i], points[i - 1]), count)
+    results["face"], _ = measure(
+        lambda i: SceneFace.by_three_points(points[i], points[i - 1],
+                                            points[i - 2]), count)
+    results["line"], _ = measure(
+        lambda i: SceneLine.by_two_points(points[i], points[i - 1]), count)
+    results["plane"], _ = measure(
+        lambda i: ScenePlane.by_three_points(points[i], points[i - 1],
+                                             points[i - 2]), count)
+    return results
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    for name, size in run(count).items():
+        print(f"{name:>15}: {size:8.1f} bytes per object")
+
+
+if __name__ == '__main__':
+    main()
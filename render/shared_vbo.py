@@ -1,7 +1,9 @@
 import uuid
+from contextlib import contextmanager
 from typing import Iterable
 
 import glm
+import numpy as np
 from OpenGL import GL
 from numpy.typing import NDArray
 
@@ -18,6 +20,9 @@ class VirtualMesh:
     def get_mesh(self):
         return self.__shared_mesh
 
+    def get_offset(self) -> int:
+        return self.__vertex_offset
+
     def set_positions(self, positions: NDArray[glm.vec3]):
         if len(positions) > self.__vertex_count:
             print("Выход за границы выделенного массива")
@@ -47,23 +52,107 @@ class SharedMesh(Mesh):
         self._vbo_positions.reserve_size(max_vertices, glm.vec3)
         self._vbo_colors.reserve_size(max_vertices, glm.vec4)
 
+        self.__positions = np.zeros((max_vertices, 3), dtype=np.float32)
+        self.__colors = np.zeros((max_vertices, 4), dtype=np.float32)
+        self.__dirty_positions = None
+        self.__dirty_colors = None
+
     def clear_offset(self, vertices: int, offset: int):
-        self._vbo_positions.clear_offset(glm.sizeof(glm.vec3) * vertices,
-                                         glm.sizeof(glm.vec3) * offset)
-        self._vbo_colors.clear_offset(glm.sizeof(glm.vec4) * vertices,
-                                      glm.sizeof(glm.vec4) * offset)
+        self.__positions[offset:offset + vertices] = 0
+        self.__colors[offset:offset + vertices] = 0
+        self.__mark_positions(offset, offset + vertices)
+        self.__mark_colors(offset, offset + vertices)
 
     def set_positions_offset(self, positions: NDArray[glm.vec3], offset: int):
-        self._vbo_positions.set_data_offset(
-            glm.sizeof(glm.vec3) * len(positions),
-            glm.sizeof(glm.vec3) * offset, positions)
+        self.__positions[offset:offset + len(positions)] = positions
+        self.__mark_positions(offset, offset + len(positions))
 
     def set_colors_offset(self, colors: NDArray[glm.vec4], offset: int):
-        self._vbo_colors.set_data_offset(glm.sizeof(glm.vec4) * len(colors),
-                                         glm.sizeof(glm.vec4) * offset, colors)
+        self.__colors[offset:offset + len(colors)] = colors
+        self.__mark_colors(offset, offset + len(colors))
+
+    def set_positions_at(self, offsets: NDArray[np.int64],
+                         positions: NDArray[np.float32]):
+        """Записывает вершины по произвольным смещениям одной операцией"""
+        if len(offsets) == 0:
+            return
+        self.__positions[offsets] = positions
+        self.__mark_positions(int(offsets.min()), int(offsets.max()) + 1)
+
+    @staticmethod
+    def write_positions(meshes: list, positions: NDArray[np.float32]):
+        """
+            Записывает вершины многих мешей: positions[i] - вершины meshes[i].
+            Виртуальные меши одного общего буфера обновляются одной
+             операцией, остальные - по одному.
+        """
+        groups = {}
+        for index, mesh in enumerate(meshes):
+            if isinstance(mesh, VirtualMesh):
+                indices, offsets = groups.setdefault(mesh.get_mesh(), ([], []))
+                indices.append(index)
+                offsets.append(mesh.get_offset())
+            else:
+                mesh.set_positions(positions[index])
+
+        vertex_count = positions.shape[1]
+        for shared_mesh, (indices, offsets) in groups.items():
+            vertex_offsets = (np.array(offsets, dtype=np.int64)[:, None] +
+                              np.arange(vertex_count)).ravel()
+            shared_mesh.set_positions_at(vertex_offsets,
+                                         positions[indices].reshape(-1, 3))
+
+    def __mark_positions(self, start: int, end: int):
+        self.__dirty_positions = self.__extend(self.__dirty_positions,
+                                               start, end)
+        if not SharedMesh.__deferred:
+            self.flush()
+
+    def __mark_colors(self, start: int, end: int):
+        self.__dirty_colors = self.__extend(self.__dirty_colors, start, end)
+        if not SharedMesh.__deferred:
+            self.flush()
+
+    @staticmethod
+    def __extend(dirty, start, end):
+        if dirty is None:
+            return start, end
+        return min(dirty[0], start), max(dirty[1], end)
+
+    def flush(self):
+        """Отправляет изменённый диапазон вершин в видеопамять"""
+        if self.__dirty_positions is not None:
+            start, end = self.__dirty_positions
+            self._vbo_positions.set_data_offset(
+                glm.sizeof(glm.vec3) * (end - start),
+                glm.sizeof(glm.vec3) * start, self.__positions[start:end])
+            self.__dirty_positions = None
+        if self.__dirty_colors is not None:
+            start, end = self.__dirty_colors
+            self._vbo_colors.set_data_offset(
+                glm.sizeof(glm.vec4) * (end - start),
+                glm.sizeof(glm.vec4) * start, self.__colors[start:end])
+            self.__dirty_colors = None
 
     __meshes = []
     __available = []
+    __deferred = 0
+
+    @staticmethod
+    @contextmanager
+    def deferred_upload():
+        """
+            Внутри блока изменения вершин копятся в памяти и отправляются
+             в видеопамять одним вызовом на каждый буфер при выходе.
+        """
+        SharedMesh.__deferred += 1
+        try:
+            yield
+        finally:
+            SharedMesh.__deferred -= 1
+            if not SharedMesh.__deferred:
+                for mesh in SharedMesh.get_all_meshes():
+                    mesh.flush()
 
     @staticmethod
     def request_mesh(vertices: int,
@@ -4,6 +4,12 @@ from .transform import Transform
 
 
 class Camera(Transform):
+    """
+        Камера. Матрицы вида и проекции, их произведение и обратные
+         матрицы помечаются устаревшими при изменении параметров
+         и пересчитываются при первом обращении.
+    """
+
     def __init__(self, width: int, height: int):
         super(Camera, self).__init__()
 
@@ -13,17 +19,24 @@ class Camera(Transform):
         self.__width = width
         self.__height = height
 
-        self.__view_mat = glm.mat4(1)
-        self.__proj_mat = glm.mat4(1)
-        self.__pv_mat = glm.mat4(1)
+        self.__view_mat = None
+        self.__proj_mat = None
+        self.__pv_mat = None
+        self.__inv_view_mat = None
+        self.__inv_proj_mat = None
 
         self.translation = glm.vec3(-5, 2, -5)
 
-        self.__recalculate_proj_matrix()
-
     def _transform_changed(self):
         super(Camera, self)._transform_changed()
-        self.__recalculate_view_matrix()
+        self.__view_mat = None
+        self.__inv_view_mat = None
+        self.__pv_mat = None
+
+    def __projection_changed(self):
+        self.__proj_mat = None
+        self.__inv_proj_mat = None
+        self.__pv_mat = None
 
     @property
     def fov(self) -> float:
@@ -34,7 +47,7 @@ class Camera(Transform):
         if value <= 0.01:
             return
         self.__fov = value
-        self.__recalculate_proj_matrix()
+        self.__projection_changed()
 
     @property
     def min_z(self) -> float:
@@ -45,7 +58,7 @@ class Camera(Transform):
         if value <= 0.01:
             return
         self.__min_z = value
-        self.__recalculate_proj_matrix()
+        self.__projection_changed()
 
     @property
     def max_z(self) -> float:
@@ -56,7 +69,7 @@ class Camera(Transform):
         if value <= 0.01:
             return
         self.__max_z = value
-        self.__recalculate_proj_matrix()
+        self.__projection_changed()
 
     @property
     def width(self) -> float:
@@ -67,7 +80,7 @@ class Camera(Transform):
         if value <= 1:
             return
         self.__width = value
-        self.__recalculate_proj_matrix()
+        self.__projection_changed()
 
     @property
     def height(self) -> float:
@@ -78,20 +91,42 @@ class Camera(Transform):
         if value <= 1:
             return
         self.__height = value
-        self.__recalculate_proj_matrix()
+        self.__projection_changed()
 
     @property
     def proj_view_matrix(self) -> glm.mat4:
+        if self.__pv_mat is None:
+            self.__pv_mat = self.proj_matrix * self.view_matrix
         return self.__pv_mat
 
     @property
     def view_matrix(self) -> glm.mat4:
+        if self.__view_mat is None:
+            self.__view_mat = glm.lookAt(self.translation,
+                                         self.translation + self.forward,
+                                         self.up)
         return self.__view_mat
 
     @property
     def proj_matrix(self) -> glm.mat4:
+        if self.__proj_mat is None:
+            self.__proj_mat = glm.perspective(glm.radians(self.fov),
+                                              self.width / self.height,
+                                              self.min_z, self.max_z)
         return self.__proj_mat
 
+    @property
+    def inverse_view_matrix(self) -> glm.mat4:
+        if self.__inv_view_mat is None:
+            self.__inv_view_mat = glm.inverse(self.view_matrix)
+        return self.__inv_view_mat
+
+    @property
+    def inverse_proj_matrix(self) -> glm.mat4:
+        if self.__inv_proj_mat is None:
+            self.__inv_proj_mat = glm.inverse(self.proj_matrix)
+        return self.__inv_proj_mat
+
     def get_mvp(self, model_mat: glm.mat4) -> glm.mat4:
         return self.proj_view_matrix * model_mat
 
@@ -109,9 +144,9 @@ class Camera(Transform):
     def screen_to_world(self, screen_pos: glm.vec2) -> glm.vec3:
         screen = glm.vec4(2.0 * screen_pos.x / self.width - 1,
                           -(2.0 * screen_pos.y / self.height - 1), -1, 1)
-        view = glm.inverse(self.proj_matrix) * screen
+        view = self.inverse_proj_matrix * screen
         view = glm.vec4(view.x, view.y, -1, 0)
-        ray = glm.inverse(self.view_matrix) * view
+        ray = self.inverse_view_matrix * view
         return glm.normalize(glm.vec3(ray))
 
     def world_to_device(self, world_pos: glm.vec3) -> glm.vec3:
@@ -150,17 +185,3 @@ class Camera(Transform):
         bot_right_far = center_far - (up * (h_far / 2)) + (right * (w_far / 2))
         return [top_left_near, top_right_near, bot_left_near, bot_right_near,
                 top_left_far, top_right_far, bot_left_far, bot_right_far]
-
-    def __recalculate_view_matrix(self):
-        self.__view_mat = glm.lookAt(self.translation,
-                                     self.translation + self.forward, self.up)
-        self.__recalculate_pv_matrix()
-
-    def __recalculate_proj_matrix(self):
-        self.__proj_mat = glm.perspective(glm.radians(self.fov),
-                                          self.width / self.height, self.min_z,
-                                          self.max_z)
-        self.__recalculate_pv_matrix()
-
-    def __recalculate_pv_matrix(self):
-        self.__pv_mat = self.proj_matrix * self.view_matrix
@@ -0,0 +1,66 @@
+from typing import Iterable, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from scene.scene_object import SceneObject
+
+
+class DependencyGraph:
+    """
+        Граф зависимостей построенных объектов: ребро идёт от образующего
+         объекта к построенному по нему.
+        После перемещения точек каждый зависимый объект пересчитывается
+         ровно один раз и только после всех своих образующих.
+        Последний вычисленный порядок запоминается до изменения связей,
+         поэтому перетаскивание одних и тех же точек не обходит граф
+         на каждом шаге.
+    """
+
+    LINKS_VERSION = 0
+
+    __cached_key = None
+    __cached_order = None
+
+    @staticmethod
+    def links_changed():
+        DependencyGraph.LINKS_VERSION += 1
+
+    @staticmethod
+    def ordered_descendants(roots: Iterable['SceneObject']) \
+            -> list[tuple['SceneObject', 'SceneObject']]:
+        """
+            Возвращает потомков roots в топологическом порядке вместе
+             с образующим объектом, через который потомок был достигнут.
+        """
+        roots = list(roots)
+        key = (DependencyGraph.LINKS_VERSION,
+               frozenset(root.handle for root in roots))
+        if key == DependencyGraph.__cached_key:
+            return DependencyGraph.__cached_order
+
+        reached_from = {}
+        in_degree = {}
+        stack = list(roots)
+        visited = set(roots)
+        while stack:
+            obj = stack.pop()
+            for child in obj.children:
+                in_degree[child] = in_degree.get(child, 0) + 1
+                if child not in visited:
+                    visited.add(child)
+                    reached_from[child] = obj
+                    stack.append(child)
+
+        order = []
+        ready = [root for root in roots if root not in in_degree]
+        while ready:
+            obj = ready.pop()
+            if obj in reached_from:
+                order.append((obj, reached_from[obj]))
+            for child in obj.children:
+                in_degree[child] -= 1
+                if in_degree[child] == 0:
+                    ready.append(child)
+
+        DependencyGraph.__cached_key = key
+        DependencyGraph.__cached_order = order
+        return order
@@ -0,0 +1,173 @@
+"""
+    Измерения выделенных объектов: длина рёбер, площадь и объём граней,
+     центр масс и ближайшая точка. Вклад каждого ребра и грани хранится
+     в массивах вместе с версиями точек, как в PlaneCutEngine, поэтому
+     после перемещения пересчитываются только строки со сдвинутыми
+     точками.
+"""
+
+from typing import Iterable, Optional
+
+import numpy as np
+import numpy.typing as npt
+
+from core.Base_geometry_objects import Point
+from core.measurements import (PointGrid, edge_lengths, signed_volumes,
+                               triangle_areas)
+from .render_geometry import ScenePoint, SceneEdge, SceneFace
+from .scene_object import SceneObject
+
+
+class Measurements:
+    """
+        Результат измерения. volume - сумма объёмов со знаком, равна
+         объёму замкнутой сетки с нормалями наружу. centroid - центр
+         площади граней, если их нет - центр длины рёбер, иначе среднее
+         точек; None для пустого выделения.
+    """
+    __slots__ = ('point_count', 'edge_count', 'face_count', 'length', 'area',
+                 'volume', 'centroid')
+
+    def __init__(self):
+        self.point_count = 0
+        self.edge_count = 0
+        self.face_count = 0
+        self.length = 0.0
+        self.area = 0.0
+        self.volume = 0.0
+        self.centroid: Optional[npt.NDArray[np.float64]] = None
+
+
+class MeasurementEngine:
+    """
+        Измеряет набор объектов сцены. Точки набора - выделенные точки
+         и вершины выделенных рёбер и граней.
+        Сетка для поиска ближайшей точки строится заново только после
+         перемещения точек набора.
+    """
+
+    def __init__(self, scene_objects: Iterable[SceneObject] = ()):
+        self.set_objects(scene_objects)
+
+    def set_objects(self, scene_objects: Iterable[SceneObject]):
+        points = {}
+        edges = []
+        faces = []
+        self.__sources = []
+        for obj in scene_objects:
+            if isinstance(obj, ScenePoint):
+                points[obj.point.handle] = obj
+            elif isinstance(obj, SceneEdge):
+                edges.append((obj.edge.point1.handle, obj.edge.point2.handle))
+                self.__sources.append(obj)
+            elif isinstance(obj, SceneFace):
+                faces.append((obj.face.point1.handle, obj.face.point2.handle,
+                              obj.face.point3.handle))
+                self.__sources.append(obj)
+
+        edges = np.array(edges, dtype=np.int64).reshape(-1, 2)
+        faces = np.array(faces, dtype=np.int64).reshape(-1, 3)
+        self.__unique, inverse = np.unique(np.concatenate(
+            [np.array(list(points), dtype=np.int64), edges.ravel(),
+             faces.ravel()]), return_inverse=True)
+        self.__edges = inverse[len(points):len(points) + edges.size].reshape(
+            edges.shape)
+        self.__faces = inverse[len(points) + edges.size:].reshape(faces.shape)
+        self.__selected_points = points
+        # ScenePoint вершин ищутся среди образующих только для nearest_point
+        self.__points = None
+        self.__point_rows = None
+
+        self.__versions = None
+        self.__positions = None
+        self.__lengths = np.zeros(len(self.__edges))
+        self.__areas = np.zeros(len(self.__faces))
+        self.__volumes = np.zeros(len(self.__faces))
+        # длина или площадь, умноженная на центр ребра или грани
+        self.__edge_moments = np.zeros((len(self.__edges), 3))
+        self.__face_moments = np.zeros((len(self.__faces), 3))
+        self.__grid = None
+
+    def update(self) -> bool:
+        """Пересчитывает вклад объектов со сдвинутыми точками. Возвращает
+         True, если что-то изменилось"""
+        versions = Point.STORE.versions[self.__unique]
+        if self.__versions is None:
+            changed = np.ones(len(self.__unique), dtype=bool)
+        else:
+            changed = versions != self.__versions
+            if not changed.any():
+                return False
+        if self.__positions is None:
+            self.__positions = Point.STORE.positions[self.__unique].astype(
+                np.float64)
+        else:
+            self.__positions[changed] = Point.STORE.positions[
+                self.__unique[changed]]
+        self.__versions = versions
+        self.__grid = None
+
+        rows = np.flatnonzero(changed[self.__edges].any(axis=1))
+        if len(rows):
+            ends = self.__positions[self.__edges[rows]]
+            self.__lengths[rows] = edge_lengths(ends[:, 0], ends[:, 1])
+            self.__edge_moments[rows] = \
+                self.__lengths[rows, None] * ends.mean(axis=1)
+
+        rows = np.flatnonzero(changed[self.__faces].any(axis=1))
+        if len(rows):
+            corners = self.__positions[self.__faces[rows]]
+            self.__areas[rows] = triangle_areas(*corners.transpose(1, 0, 2))
+            self.__volumes[rows] = signed_volumes(*corners.transpose(1, 0, 2))
+            self.__face_moments[rows] = \
+                self.__areas[rows, None] * corners.mean(axis=1)
+        return True
+
+    def measure(self) -> Measurements:
+        self.update()
+        result = Measurements()
+        result.point_count = len(self.__unique)
+        result.edge_count = len(self.__edges)
+        result.face_count = len(self.__faces)
+        result.length = float(self.__lengths.sum())
+        result.area = float(self.__areas.sum())
+        result.volume = float(self.__volumes.sum())
+        result.centroid = self.__centroid(result)
+        return result
+
+    def __centroid(self, result: Measurements) \
+            -> Optional[npt.NDArray[np.float64]]:
+        if result.area > 0:
+            return self.__face_moments.sum(axis=0) / result.area
+        if result.length > 0:
+            return self.__edge_moments.sum(axis=0) / result.length
+        if result.point_count:
+            return self.__positions.mean(axis=0)
+        return None
+
+    def __collect_points(self):
+        points = dict(self.__selected_points)
+        for obj in self.__sources:
+            for parent in obj.parents:
+                if isinstance(parent, ScenePoint):
+                    points[parent.point.handle] = parent
+        handles = self.__unique.tolist()
+        self.__point_rows = np.array([row for row, handle in enumerate(handles)
+                                      if handle in points], dtype=np.int64)
+        self.__points = [points[handles[row]]
+                         for row in self.__point_rows.tolist()]
+
+    def nearest_point(self, position) \
+            -> Optional[tuple[ScenePoint, float]]:
+        """Ближайшая к position точка набора и расстояние до неё"""
+        self.update()
+        if self.__points is None:
+            self.__collect_points()
+            self.__grid = None
+        if self.__grid is None:
+            self.__grid = PointGrid(self.__positions[self.__point_rows])
+        found = self.__grid.nearest(position)
+        if found is None:
+            return None
+        index, distance = found
+        return self.__points[index], distance
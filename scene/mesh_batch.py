@@ -0,0 +1,153 @@
+import gc
+from contextlib import contextmanager
+from typing import Iterable, Optional
+
+import numpy as np
+import numpy.typing as npt
+
+from core.Base_geometry_objects import Point, Triangle
+from render.shared_vbo import SharedMesh
+from .render_geometry import ScenePoint, SceneEdge, SceneFace
+from .scene import Scene
+from .scene_object import SceneObject
+from .topology import MeshTopology
+
+
+@contextmanager
+def _collection_paused():
+    """Сборщик циклов не нужен, пока создаются сотни тысяч связанных
+     объектов: каждый его проход обходит всё уже созданное"""
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _unique_rows(rows: npt.NDArray[np.int64]) -> npt.NDArray[np.int64]:
+    """Убирает повторы и вырожденные строки, сохраняя исходный порядок
+     вершин в строке"""
+    if len(rows) == 0:
+        return rows
+    keys = np.sort(rows, axis=1)
+    valid = np.all(keys[:, 1:] != keys[:, :-1], axis=1)
+    rows, keys = rows[valid], keys[valid]
+    _, first = np.unique(keys, axis=0, return_index=True)
+    return rows[np.sort(first)]
+
+
+class MeshBatch:
+    """
+        Накапливает точки, рёбра и грани в виде массивов и создаёт объекты
+         сцены одним пакетом.
+        Индексы вершин сквозные: сначала идут существующие точки,
+         переданные в конструктор, затем добавленные позиции.
+    """
+
+    def __init__(self, existing_points: Iterable[ScenePoint] = ()):
+        self.__existing = list(existing_points)
+        self.__positions = []
+        self.__vertex_count = len(self.__existing)
+        self.__edges = []
+        self.__triangles = []
+        self.__triangle_edges = []
+
+    @property
+    def vertex_count(self) -> int:
+        return self.__vertex_count
+
+    def add_points(self, positions) -> npt.NDArray[np.int64]:
+        """Добавляет вершины (N x 3) и возвращает их индексы"""
+        positions = np.asarray(positions, dtype=np.float32).reshape(-1, 3)
+        start = self.__vertex_count
+        self.__positions.append(positions)
+        self.__vertex_count += len(positions)
+        return np.arange(start, self.__vertex_count)
+
+    def add_edges(self, edges):
+        """Добавляет рёбра (M x 2) по индексам вершин"""
+        self.__edges.append(np.asarray(edges, dtype=np.int64).reshape(-1, 2))
+
+    def add_triangles(self, triangles, with_edges: bool = True):
+        """Добавляет грани (K x 3) по индексам вершин. Если with_edges,
+         для каждой грани создаются и недостающие рёбра"""
+        triangles = np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+        self.__triangles.append(triangles)
+        if with_edges:
+            self.__triangle_edges.append(
+                triangles[:, [0, 1, 1, 2, 2, 0]].reshape(-1, 2))
+
+    def build(self, scene: Optional[Scene] = None) -> list[SceneObject]:
+        """
+            Создаёт объекты сцены. Возвращает только новые объекты:
+             точки, затем рёбра, затем грани.
+            Рёбра и грани между существующими точками ищутся в topology
+             сцены, без сцены - по детям точек.
+        """
+        topology = scene.topology if scene is not None else None
+        with SharedMesh.deferred_upload():
+            points = self.__build_points()
+            edges, new_edges = self.__build_edges(points, topology)
+            faces = self.__build_faces(points, edges, topology)
+        return points[len(self.__existing):] + new_edges + faces
+
+    def add_to(self, scene: Scene) -> list[SceneObject]:
+        with _collection_paused():
+            objects = self.build(scene)
+            scene.add_objects(objects)
+        return objects
+
+    def __build_points(self) -> list[ScenePoint]:
+        points = list(self.__existing)
+        for positions in self.__positions:
+            handles = Point.STORE.allocate_many(positions)
+            points.extend(ScenePoint(Point.from_handle(handle))
+                          for handle in handles.tolist())
+        return points
+
+    def __build_edges(self, points, topology: Optional[MeshTopology]):
+        rows = self.__edges + self.__triangle_edges
+        if not rows:
+            return {}, []
+        rows = _unique_rows(np.concatenate(rows))
+        rows = np.sort(rows, axis=1)
+
+        existing_count = len(self.__existing)
+        edges = {}
+        new_edges = []
+        for i, j in rows.tolist():
+            p1, p2 = points[i], points[j]
+            edge = None
+            if j < existing_count:
+                edge = topology.edge_between(p1, p2) \
+                    if topology is not None else SceneEdge.common_child(p1, p2)
+            if edge is None:
+                edge = SceneEdge.by_two_points(p1, p2)
+                new_edges.append(edge)
+            edges[i, j] = edge
+        return edges, new_edges
+
+    def __build_faces(self, points, edges,
+                      topology: Optional[MeshTopology]) -> list[SceneFace]:
+        if not self.__triangles:
+            return []
+        rows = _unique_rows(np.concatenate(self.__triangles))
+
+        existing_count = len(self.__existing)
+        faces = []
+        for i, j, k in rows.tolist():
+            p1, p2, p3 = points[i], points[j], points[k]
+            if max(i, j, k) < existing_count:
+                face = topology.face_between(p1, p2, p3) \
+                    if topology is not None else \
+                    SceneFace.common_child(p1, p2, p3)
+                if face is not None:
+                    continue
+            face_edges = [edges[key] for key in
+                          ((min(i, j), max(i, j)), (min(j, k), max(j, k)),
+                           (min(i, k), max(i, k))) if key in edges]
+            faces.append(SceneFace(Triangle(p1.point, p2.point, p3.point),
+                                   p1, p2, p3, *face_edges))
+        return faces
@@ -0,0 +1,101 @@
+from typing import Iterable
+
+import glm
+import numpy as np
+import numpy.typing as npt
+
+from core.Base_geometry_objects import Point
+from render.shared_vbo import SharedMesh
+from .dependency_graph import DependencyGraph
+from .render_geometry import ScenePoint, SceneEdge, SceneFace
+from .scene_object import SceneObject
+
+
+class MoveEngine:
+    """
+        Перемещение объектов сцены. Сначала собираются все точки, которые
+         сдвигаются вместе с объектами, затем их позиции меняются одной
+         операцией над хранилищем. После этого меши точек, рёбер и граней
+         обновляются пакетно, а остальные зависимые объекты - по одному
+         разу в топологическом порядке.
+    """
+
+    @staticmethod
+    def collect_points(scene_objects: Iterable[SceneObject]) \
+            -> list[ScenePoint]:
+        points = {}
+        stack = list(scene_objects)
+        visited = set()
+        while stack:
+            obj = stack.pop()
+            if obj in visited:
+                continue
+            visited.add(obj)
+            if isinstance(obj, ScenePoint):
+                points[obj] = None
+            else:
+                stack.extend(obj.get_moving_parents())
+        return list(points)
+
+    @staticmethod
+    def get_positions(points: list[ScenePoint]) -> npt.NDArray[np.float32]:
+        return Point.STORE.get_positions(MoveEngine.__handles(points))
+
+    @staticmethod
+    def get_center(points: list[ScenePoint]) -> glm.vec3:
+        return glm.vec3(*MoveEngine.get_positions(points).mean(axis=0)
+                        .tolist())
+
+    @staticmethod
+    def transform_positions(positions: npt.NDArray[np.float32],
+                            matrix: glm.mat4) -> npt.NDArray[np.float32]:
+        """Применяет матрицу ко всем позициям одним умножением"""
+        mat = np.array(matrix, dtype=np.float32)
+        return positions @ mat[:3, :3].T + mat[:3, 3]
+
+    @staticmethod
+    def move_object(scene_object: SceneObject,
+                    pos: glm.vec3) -> list[ScenePoint]:
+        """Переносит объект так, чтобы его transform оказался в pos"""
+        return MoveEngine.move_objects(
+            [scene_object], pos - scene_object.transform.translation)
+
+    @staticmethod
+    def move_objects(scene_objects: Iterable[SceneObject],
+                     offset: glm.vec3) -> list[ScenePoint]:
+        """Сдвигает объекты на offset, возвращает сдвинутые точки"""
+        points = MoveEngine.collect_points(scene_objects)
+        positions = MoveEngine.get_positions(points) + \
+            np.array([offset.x, offset.y, offset.z], dtype=np.float32)
+        MoveEngine.set_positions(points, positions)
+        return points
+
+    @staticmethod
+    def set_positions(points: list[ScenePoint], positions):
+        """Ставит точки в positions и обновляет всё, что от них зависит"""
+        if not points:
+            return
+        Point.STORE.set_positions(MoveEngine.__handles(points), positions)
+
+        edges = []
+        faces = []
+        others = []
+        for obj, parent in DependencyGraph.ordered_descendants(points):
+            if isinstance(obj, SceneEdge):
+                edges.append(obj)
+            elif isinstance(obj, SceneFace):
+                faces.append(obj)
+            else:
+                others.append((obj, parent))
+
+        with SharedMesh.deferred_upload():
+            ScenePoint.update_meshes(points)
+            SceneEdge.update_meshes(edges)
+            SceneFace.update_meshes(faces)
+            for obj, parent in others:
+                obj.on_parent_position_updated(parent)
+
+    @staticmethod
+    def __handles(points: list[ScenePoint]) -> npt.NDArray[np.int64]:
+        return np.fromiter((point.point.handle for point in points),
+                           dtype=np.int64, count=len(points))
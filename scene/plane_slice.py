@@ -0,0 +1,174 @@
+"""
+    Разрезание сетки плоскостью. Рёбра, пересекающие плоскость, делятся
+     точкой пересечения так же, как в DivisionBuilder, а грани с такими
+     рёбрами заменяются частями по обе стороны плоскости.
+"""
+
+from typing import Iterable
+
+import numpy as np
+import numpy.typing as npt
+
+from core.Base_geometry_objects import Point
+from core.plane_cuts import classify_sides, get_tolerance
+from .mesh_batch import MeshBatch
+from .render_geometry import ScenePlane, ScenePoint, SceneEdge, SceneFace
+from .scene import Scene
+from .scene_object import SceneObject
+
+
+def _face_handles(faces: list[SceneFace]) -> npt.NDArray[np.int64]:
+    return np.array([(face.primitive.point1.handle,
+                      face.primitive.point2.handle,
+                      face.primitive.point3.handle) for face in faces],
+                    dtype=np.int64).reshape(-1, 3)
+
+
+def _edge_handles(edges: list[SceneEdge]) -> npt.NDArray[np.int64]:
+    return np.array([(edge.primitive.point1.handle,
+                      edge.primitive.point2.handle) for edge in edges],
+                    dtype=np.int64).reshape(-1, 2)
+
+
+def _crossing_faces(sides: npt.NDArray[np.int8]) -> npt.NDArray[np.bool_]:
+    """Грани, у которых хотя бы одно ребро пересекает плоскость"""
+    return np.any(sides[:, [0, 1, 2]] * sides[:, [1, 2, 0]] < 0, axis=1)
+
+
+def _collect_crossing(faces: list[SceneFace], edges: list[SceneEdge],
+                      sides: npt.NDArray[np.int8]) \
+        -> tuple[list[SceneFace], list[SceneEdge]]:
+    """
+        Пересекающие плоскость грани и рёбра. К выбранным добавляются
+         грани, прилегающие к разрезаемым рёбрам, и рёбра этих граней,
+         иначе у соседних граней осталось бы неразделённое ребро.
+    """
+    face_mask = _crossing_faces(sides[_face_handles(faces)])
+    edge_handles = _edge_handles(edges)
+    edge_mask = sides[edge_handles[:, 0]] * sides[edge_handles[:, 1]] < 0
+    crossing_faces = {face: None for face, crossing in
+                      zip(faces, face_mask.tolist()) if crossing}
+    crossing_edges = {edge: None for edge, crossing in
+                      zip(edges, edge_mask.tolist()) if crossing}
+
+    pending_faces = list(crossing_faces)
+    pending_edges = list(crossing_edges)
+    while pending_faces or pending_edges:
+        for face in pending_faces:
+            for edge in face.parents:
+                if isinstance(edge, SceneEdge) and \
+                        edge not in crossing_edges and \
+                        sides.item(edge.primitive.point1.handle) * \
+                        sides.item(edge.primitive.point2.handle) < 0:
+                    crossing_edges[edge] = None
+                    pending_edges.append(edge)
+        pending_faces = []
+        for edge in pending_edges:
+            for face in edge.children:
+                if isinstance(face, SceneFace) and \
+                        face not in crossing_faces:
+                    crossing_faces[face] = None
+                    pending_faces.append(face)
+        pending_edges = []
+    return list(crossing_faces), list(crossing_edges)
+
+
+def _split_triangles(triangles: npt.NDArray[np.int64],
+                     sides: npt.NDArray[np.int8], divide) \
+        -> npt.NDArray[np.int64]:
+    """
+        Делит пересекающие плоскость треугольники с сохранением обхода.
+        Треугольник поворачивается так, чтобы первой шла вершина,
+         одна лежащая по свою сторону (или на самой плоскости).
+        divide(i, j) возвращает индексы точек деления рёбер ij.
+    """
+    rows = np.arange(len(triangles))
+    on_plane = sides == 0
+    lone = np.where(on_plane.any(axis=1), np.argmax(on_plane, axis=1),
+                    np.where(sides[:, 1] == sides[:, 2], 0,
+                             np.where(sides[:, 0] == sides[:, 2], 1, 2)))
+    order = (lone[:, None] + np.arange(3)) % 3
+    a, b, c = (triangles[rows, order[:, k]] for k in range(3))
+
+    through_vertex = on_plane[rows, lone]
+    result = []
+    if through_vertex.any():
+        av, bv, cv = a[through_vertex], b[through_vertex], c[through_vertex]
+        p = divide(bv, cv)
+        result.extend([np.stack([av, bv, p], axis=1),
+                       np.stack([av, p, cv], axis=1)])
+    across = ~through_vertex
+    if across.any():
+        av, bv, cv = a[across], b[across], c[across]
+        p = divide(av, bv)
+        q = divide(av, cv)
+        result.extend([np.stack([av, p, q], axis=1),
+                       np.stack([p, bv, cv], axis=1),
+                       np.stack([p, cv, q], axis=1)])
+    if not result:
+        return np.empty((0, 3), dtype=np.int64)
+    return np.concatenate(result)
+
+
+def slice_by_plane(scene: Scene, plane: ScenePlane,
+                   scene_objects: Iterable[SceneObject]) -> list[SceneObject]:
+    """
+        Разрезает выбранные грани и рёбра плоскостью. Возвращает новые
+         объекты: точки деления, затем рёбра и грани.
+    """
+    scene_objects = list(scene_objects)
+    faces = [obj for obj in scene_objects if isinstance(obj, SceneFace)]
+    edges = [obj for obj in scene_objects if isinstance(obj, SceneEdge)]
+    if not faces and not edges:
+        return []
+
+    primitive = plane.primitive
+    normal = np.array(primitive.get_normal(), dtype=np.float64)
+    distances = Point.STORE.positions.astype(np.float64) @ normal - \
+        primitive.get_offset()
+    sides = classify_sides(distances, get_tolerance(primitive))
+
+    faces, edges = _collect_crossing(faces, edges, sides)
+    if not faces and not edges:
+        return []
+
+    points = {}
+    for obj in faces + edges:
+        for parent in obj.parents:
+            if isinstance(parent, ScenePoint):
+                points[parent.primitive.handle] = parent
+    handles = np.array(sorted(points), dtype=np.int64)
+    existing = [points[handle] for handle in handles.tolist()]
+
+    triangles = np.searchsorted(handles, _face_handles(faces))
+    segments = np.searchsorted(handles, _edge_handles(edges))
+    local_sides = sides[handles]
+
+    pairs = np.concatenate([segments,
+                            triangles[:, [0, 1, 1, 2, 2, 0]].reshape(-1, 2)])
+    pairs = np.sort(pairs, axis=1)
+    pairs = pairs[local_sides[pairs[:, 0]] * local_sides[pairs[:, 1]] < 0]
+    keys = np.unique(pairs[:, 0] * len(handles) + pairs[:, 1])
+    first, second = np.divmod(keys, len(handles))
+
+    positions = Point.STORE.positions[handles].astype(np.float64)
+    local_distances = distances[handles]
+    t = local_distances[first] / (local_distances[first] -
+                                  local_distances[second])
+    division_positions = positions[first] + t[:, None] * (
+            positions[second] - positions[first])
+
+    batch = MeshBatch(existing)
+    division = batch.add_points(division_positions)
+
+    def divide(i, j):
+        return division[np.searchsorted(
+            keys, np.minimum(i, j) * len(handles) + np.maximum(i, j))]
+
+    batch.add_edges(np.concatenate([np.stack([first, division], axis=1),
+                                    np.stack([division, second], axis=1)]))
+    batch.add_triangles(_split_triangles(triangles, local_sides[triangles],
+                                         divide))
+
+    scene.remove_objects(edges + faces)
+    return batch.add_to(scene)
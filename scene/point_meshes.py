@@ -0,0 +1,51 @@
+"""
+    Грани по облаку точек сцены: выпуклая оболочка и триангуляция
+     Делоне в плоскости наилучшего приближения. Недостающие рёбра
+     и грани создаются одним пакетом, существующие переиспользуются.
+"""
+
+from typing import Iterable
+
+import numpy as np
+import numpy.typing as npt
+
+from core.Base_geometry_objects import Point
+from core.triangulation import convex_hull, triangulate_planar
+from .mesh_batch import MeshBatch
+from .render_geometry import ScenePoint
+from .scene import Scene
+from .scene_object import SceneObject
+
+
+def _unique_points(points: Iterable[ScenePoint]) -> list[ScenePoint]:
+    return list({point: None for point in points})
+
+
+def _positions(points: list[ScenePoint]) -> npt.NDArray[np.float32]:
+    return Point.STORE.get_positions([point.point.handle for point in points])
+
+
+def _add_triangles(scene: Scene, points: list[ScenePoint],
+                   triangles: npt.NDArray[np.int64]) -> list[SceneObject]:
+    if len(triangles) == 0:
+        return []
+    batch = MeshBatch(points)
+    batch.add_triangles(triangles)
+    return batch.add_to(scene)
+
+
+def hull_from_points(scene: Scene,
+                     points: Iterable[ScenePoint]) -> list[SceneObject]:
+    """Строит выпуклую оболочку точек. Возвращает новые рёбра и грани,
+     пустой список для плоского облака"""
+    points = _unique_points(points)
+    return _add_triangles(scene, points, convex_hull(_positions(points)))
+
+
+def triangulate_points(scene: Scene,
+                       points: Iterable[ScenePoint]) -> list[SceneObject]:
+    """Триангулирует точки в проекции на плоскость наилучшего
+     приближения. Возвращает новые рёбра и грани"""
+    points = _unique_points(points)
+    return _add_triangles(scene, points,
+                          triangulate_planar(_positions(points)))
@@ -1,5 +1,6 @@
 import OpenGL.GL as GL
 import glm
+import numpy.typing as npt
 
 import profiling.profiler
 from core.Base_geometry_objects import *
@@ -7,6 +8,7 @@ from render.mesh import Mesh
 from render.shared_vbo import SharedMesh
 from scene.camera import Camera
 from scene.scene_object import SceneObject, RawSceneObject
+from scene.transform import Transform
 from core.helpers import *
 
 SELECT_POINT = 1 << 0
@@ -16,18 +18,33 @@ SELECT_EDGE = 1 << 3
 SELECT_FACE = 1 << 4
 
 
+def _write_point_meshes(scene_objects: list[SceneObject],
+                        handles: npt.NDArray[np.int64]):
+    """Записывает в меши объектов позиции точек хранилища:
+     handles[i] - дескрипторы вершин i-го объекта"""
+    if len(scene_objects) == 0:
+        return
+    positions = Point.STORE.get_positions(handles.ravel())
+    SharedMesh.write_positions([obj.mesh for obj in scene_objects],
+                               positions.reshape(*handles.shape, 3))
+
+
 class ScenePoint(SceneObject):
+    """
+        Точка сцены. Своего переноса не хранит: transform строится
+         по позиции точки в хранилище.
+    """
+    __slots__ = ('point',)
+
     SEL_COLOR = glm.vec4(0.4, 0.4, 1, 1)
+    render_mode = GL.GL_POINTS
+    render_layer = 1
+    selection_mask = SELECT_POINT
 
     def __init__(self, point: Point):
         super(ScenePoint, self).__init__(point)
 
         self.point = point
-        self.transform.translation = point.pos
-        self.render_mode = GL.GL_POINTS
-        self.render_layer = 1
-        self.selection_mask = SELECT_POINT
-
         self.mesh = self.mesh_provider.get_shared_mesh(1, self.render_mode)
         self.__update_mesh()
         self.set_selected(False)
@@ -36,6 +53,11 @@ class ScenePoint(SceneObject):
         self.mesh.clear()
         super(ScenePoint, self).on_delete()
 
+    def on_restore(self):
+        super(ScenePoint, self).on_restore()
+        self.__update_mesh()
+        self.set_selected(False)
+
     def set_selected(self, value: bool):
         self.mesh.set_colors(
             np.array([ScenePoint.SEL_COLOR
@@ -49,19 +71,19 @@ class ScenePoint(SceneObject):
     def __update_mesh(self):
         self.mesh.set_positions(np.array([self.point.pos]))
 
-    def update_hierarchy_position(self, pos: glm.vec3,
-                                  ignored: set['SceneObject']):
-        self.point.pos = pos
-        self.transform.translation = pos
-        self.__update_mesh()
+    @staticmethod
+    def update_meshes(points: list['ScenePoint']):
+        handles = np.fromiter((point.point.handle for point in points),
+                              dtype=np.int64, count=len(points))
+        _write_point_meshes(points, handles[:, None])
 
-        for child in self.children:
-            if child not in ignored:
-                child.on_parent_position_updated(self)
+    @property
+    def transform(self) -> Transform:
+        return Transform.at(self.point.pos)
 
     def get_selection_weight(self, camera: Camera,
                              screen_pos: glm.vec2) -> float:
-        spos = camera.world_to_screen(self.transform.translation)
+        spos = camera.world_to_screen(self.point.pos)
         dist = glm.distance(screen_pos, spos)
 
         max_dist = 20
@@ -71,13 +93,16 @@ class ScenePoint(SceneObject):
 
 
 class SceneLine(SceneObject):
+    __slots__ = ('line',)
+
+    render_mode = GL.GL_LINES
+    render_layer = 1
+    selection_mask = SELECT_LINE
+
     def __init__(self, line: BaseLine, *parents: SceneObject):
         super(SceneLine, self).__init__(line, *parents)
 
         self.line = line
-        self.render_mode = GL.GL_LINES
-        self.render_layer = 1
-        self.selection_mask = SELECT_LINE
 
         self.mesh = self.mesh_provider.get_unique_mesh()
         self.__update_local_positions()
@@ -97,16 +122,8 @@ class SceneLine(SceneObject):
         self = cls(line, scene_point1, scene_point2)
         return self
 
-    def update_hierarchy_position(self, pos: glm.vec3,
-                                  ignored: set['SceneObject']):
-        move = pos - self.transform.translation
-        self.transform.translation = pos
-
-        ignored.add(self)
-        for point in (parent for parent in self.parents if
-                      parent not in ignored):
-            point.update_hierarchy_position(point.transform.translation + move,
-                                            ignored)
+    def get_moving_parents(self) -> Iterable[SceneObject]:
+        return self.parents
 
     def prepare_render(self, camera: Camera):
         dist = glm.distance(self.transform.translation, camera.translation)
@@ -139,15 +156,19 @@ class SceneLine(SceneObject):
 
 
 class ScenePlane(SceneObject):
+    __slots__ = ('plane', '__square_points', '__square_version')
+
     COLOR = glm.vec4(137 / 256, 143 / 256, 141 / 256, 0.7)
+    render_mode = GL.GL_TRIANGLES
+    render_layer = 1
+    selection_mask = SELECT_PLANE
 
     def __init__(self, plane: BasePlane, *parents: SceneObject):
         super(ScenePlane, self).__init__(plane, *parents)
 
         self.plane = plane
-        self.render_mode = GL.GL_TRIANGLES
-        self.render_layer = 1
-        self.selection_mask = SELECT_PLANE
+        self.__square_points = None
+        self.__square_version = -1
 
         self.mesh = self.mesh_provider.get_unique_mesh()
         self.__update_local_position()
@@ -192,25 +213,21 @@ class ScenePlane(SceneObject):
         self.mesh.set_positions(np.array(square_points))
 
     def __get_square_points(self):
-        p1, p2, p3 = self.plane.get_pivot_points()
-        center = (p1 + p2 + p3) / 3
-        norm = self.plane.get_normal()
-        op1 = glm.normalize(p1 - center) * 1000
-        op2 = glm.normalize(glm.cross(norm, op1)) * 1000
-        return [op1, op2, -op1, -op2]
-
-    def update_hierarchy_position(self, pos: glm.vec3,
-                                  ignored: set['SceneObject']):
-        move = pos - self.transform.translation
-        self.transform.translation = pos
-
-        ignored.add(self)
+        version = self.plane.get_points_version()
+        if version != self.__square_version:
+            p1, p2, p3 = self.plane.get_pivot_points()
+            center = (p1 + p2 + p3) / 3
+            norm = self.plane.get_normal()
+            op1 = glm.normalize(p1 - center) * 1000
+            op2 = glm.normalize(glm.cross(norm, op1)) * 1000
+            self.__square_points = [op1, op2, -op1, -op2]
+            self.__square_version = version
+        return self.__square_points
+
+    def get_moving_parents(self) -> Iterable[SceneObject]:
         point_parents = [parent for parent in self.parents if
                          isinstance(parent, ScenePoint)]
-        for i in range(min(len(point_parents), 3)):
-            point = point_parents[i]
-            point.update_hierarchy_position(point.transform.translation + move,
-                                            ignored)
+        return point_parents[:3]
 
     def get_selection_weight(self, camera: Camera,
                              click_pos: glm.vec2) -> float:
@@ -238,9 +255,6 @@ class ScenePlane(SceneObject):
 
     def on_parent_position_updated(self, parent: 'SceneObject'):
         self.__update_local_position()
-        for child in self.children:
-            if isinstance(child, ScenePlane):
-                child.on_parent_position_updated(self)
 
     def prepare_render(self, camera: Camera):
         dist = glm.distance(self.transform.translation, camera.translation)
@@ -249,15 +263,18 @@ class ScenePlane(SceneObject):
 
 
 class SceneEdge(SceneObject):
+    """Отрезок сцены. transform строится по середине отрезка"""
+    __slots__ = ('edge',)
+
     SEL_COLOR = glm.vec4(0.55, 0.55, 1, 1)
+    render_mode = GL.GL_LINES
+    render_layer = 1
+    selection_mask = SELECT_EDGE
 
     def __init__(self, segment: Segment, *parents: SceneObject):
         super(SceneEdge, self).__init__(segment, *parents)
 
         self.edge = segment
-        self.render_mode = GL.GL_LINES
-        self.render_layer = 1
-        self.selection_mask = SELECT_EDGE
 
         self.mesh = self.mesh_provider.get_shared_mesh(2, self.render_mode)
         self.__update_local_position()
@@ -267,6 +284,11 @@ class SceneEdge(SceneObject):
         self.mesh.clear()
         super(SceneEdge, self).on_delete()
 
+    def on_restore(self):
+        super(SceneEdge, self).on_restore()
+        self.__update_local_position()
+        self.set_selected(False)
+
     def set_selected(self, value: bool):
         self.mesh.set_colors(np.array(
             [SceneEdge.SEL_COLOR if value else glm.vec4(0, 0, 0, 1)] * 2))
@@ -278,9 +300,14 @@ class SceneEdge(SceneObject):
         self = cls(edge, scene_point1, scene_point2)
         return self
 
+    @property
+    def transform(self) -> Transform:
+        return Transform.at(self.__get_center())
+
+    def __get_center(self) -> glm.vec3:
+        return (self.edge.point1.pos + self.edge.point2.pos) / 2
+
     def __update_local_position(self):
-        p1, p2 = self.edge.point1, self.edge.point2
-        self.transform.translation = (p1.pos + p2.pos) / 2
         self.__update_mesh()
 
     @profiling.profiler.profile
@@ -288,20 +315,14 @@ class SceneEdge(SceneObject):
         p1, p2 = self.edge.point1, self.edge.point2
         self.mesh.set_positions(np.array([p1.pos, p2.pos]))
 
-    def update_hierarchy_position(self, pos: glm.vec3,
-                                  ignored: set['SceneObject']):
-        move = pos - self.transform.translation
-        self.transform.translation = pos
+    @staticmethod
+    def update_meshes(edges: list['SceneEdge']):
+        handles = np.array([(edge.edge.point1.handle, edge.edge.point2.handle)
+                            for edge in edges], dtype=np.int64)
+        _write_point_meshes(edges, handles)
 
-        ignored.add(self)
-        for point in (point for point in self.parents if point not in ignored):
-            point.update_hierarchy_position(point.transform.translation + move,
-                                            ignored)
-
-        self.__update_mesh()
-
-        for child in (child for child in self.children if child not in ignored):
-            child.on_parent_position_updated(self)
+    def get_moving_parents(self) -> Iterable[SceneObject]:
+        return self.parents
 
     def on_parent_position_updated(self, parent: 'SceneObject'):
         self.__update_local_position()
@@ -348,16 +369,19 @@ class SceneEdge(SceneObject):
 
 
 class SceneFace(SceneObject):
+    """Треугольник сцены. transform строится по центру треугольника"""
+    __slots__ = ('face',)
+
     COLOR = glm.vec4(137 / 256, 143 / 256, 141 / 256, 1)
     SEL_COLOR = glm.vec4(0.7, 0.7, 1, 1)
+    render_mode = GL.GL_TRIANGLES
+    render_layer = 1
+    selection_mask = SELECT_FACE
 
     def __init__(self, triangle: Triangle, *parents: SceneObject):
         super(SceneFace, self).__init__(triangle, *parents)
 
         self.face = triangle
-        self.render_mode = GL.GL_TRIANGLES
-        self.render_layer = 1
-        self.selection_mask = SELECT_FACE
 
         self.mesh = self.mesh_provider.get_shared_mesh(3, self.render_mode)
         self.__update_local_position()
@@ -367,6 +391,11 @@ class SceneFace(SceneObject):
         self.mesh.clear()
         super(SceneFace, self).on_delete()
 
+    def on_restore(self):
+        super(SceneFace, self).on_restore()
+        self.__update_local_position()
+        self.set_selected(False)
+
     def set_selected(self, value: bool):
         self.mesh.set_colors(
             np.array([SceneFace.SEL_COLOR if value else SceneFace.COLOR] * 3))
@@ -379,10 +408,15 @@ class SceneFace(SceneObject):
         self = cls(face, scene_point1, scene_point2, scene_point3)
         return self
 
-    def __update_local_position(self):
+    @property
+    def transform(self) -> Transform:
+        return Transform.at(self.__get_center())
+
+    def __get_center(self) -> glm.vec3:
         p1, p2, p3 = self.face.point1, self.face.point2, self.face.point3
-        center = (p1.pos + p2.pos + p3.pos) / 3
-        self.transform.translation = center
+        return (p1.pos + p2.pos + p3.pos) / 3
+
+    def __update_local_position(self):
         self.__update_mesh()
 
     @profiling.profiler.profile
@@ -390,18 +424,16 @@ class SceneFace(SceneObject):
         p1, p2, p3 = self.face.point1, self.face.point2, self.face.point3
         self.mesh.set_positions(np.array([p1.pos, p2.pos, p3.pos]))
 
-    def update_hierarchy_position(self, pos: glm.vec3,
-                                  ignored: set['SceneObject']):
-        move = pos - self.transform.translation
-        self.transform.translation = pos
-
-        ignored.add(self)
-        for point in (parent for parent in self.parents if
-                      isinstance(parent, ScenePoint) and parent not in ignored):
-            point.update_hierarchy_position(point.transform.translation + move,
-                                            ignored)
+    @staticmethod
+    def update_meshes(faces: list['SceneFace']):
+        handles = np.array([(face.face.point1.handle, face.face.point2.handle,
+                             face.face.point3.handle) for face in faces],
+                           dtype=np.int64)
+        _write_point_meshes(faces, handles)
 
-        self.__update_mesh()
+    def get_moving_parents(self) -> Iterable[SceneObject]:
+        return (parent for parent in self.parents
+                if isinstance(parent, ScenePoint))
 
     def on_parent_position_updated(self, parent: 'SceneObject'):
         self.__update_local_position()
@@ -539,3 +571,19 @@ class SceneGrid(RawSceneObject):
 
         GL.glLineWidth(1)
         super(SceneGrid, self).prepare_render(camera)
+
+
+def create_scene_object(primitive: BaseGeometryObject) -> Optional[SceneObject]:
+    """Создаёт объект сцены для примитива без связей с родителями"""
+    if isinstance(primitive, Point):
+        return ScenePoint(primitive)
+    if isinstance(primitive, BaseLine):
+        return SceneLine(primitive)
+    if isinstance(primitive, BasePlane):
+        return ScenePlane(primitive)
+    if isinstance(primitive, Segment):
+        return SceneEdge(primitive)
+    if isinstance(primitive, Triangle):
+        return SceneFace(primitive)
+    print(f"Unknown object {primitive}")
+    return None
@@ -3,22 +3,28 @@ import itertools
 import glm
 import numpy as np
 
-from typing import Iterable, Optional, Union
+from typing import Iterable, Optional, Type, TypeVar, Union
 
 from OpenGL import GL
 
 from profiling.profiler import profile
 from core.event import Event
+from core.plane_cuts import PlaneCutEngine
 from render.shared_vbo import SharedMesh
 from .camera import Camera
+from .move_engine import MoveEngine
 from .render_geometry import ScenePlane, ScenePoint, SceneEdge, SceneFace, \
     SceneLine
 from .scene_object import SceneObject, RawSceneObject
+from .topology import MeshTopology
+
+_T = TypeVar("_T")
 
 
 class Scene:
     def __init__(self):
         self.__objects = {}
+        self.__by_id = None
         self.camera: Optional[Camera] = None
 
         self.__points = {}
@@ -27,11 +33,19 @@ class Scene:
         self.__other = set()
         self.__planes = set()
         self.__lines = set()
+        self.__cut_engine = PlaneCutEngine()
+        self.__cuts_dirty = False
+        self.__topology = MeshTopology()
+        self.__by_parents = {}
+        self.__parent_keys = {}
+        SceneObject.LINK_LISTENERS.add(self)
 
         self.on_objects_added = Event()
         self.on_objects_removed = Event()
         self.on_objects_selected = Event()
         self.on_objects_deselected = Event()
+        self.on_objects_moved = Event()
+        self.on_object_renamed = Event()
 
     @staticmethod
     def __add_or_create(dest, obj):
@@ -54,14 +68,56 @@ class Scene:
             self.__add_or_create(self.__points, scene_object)
         elif isinstance(scene_object, SceneEdge):
             self.__add_or_create(self.__edges, scene_object)
+            self.__topology.add(scene_object)
+            self.__cut_engine.add_sources([scene_object.primitive])
+            self.__cuts_dirty = True
         elif isinstance(scene_object, SceneFace):
             self.__add_or_create(self.__faces, scene_object)
+            self.__topology.add(scene_object)
+            self.__cut_engine.add_sources([scene_object.primitive])
+            self.__cuts_dirty = True
         elif isinstance(scene_object, SceneLine):
             self.__lines.add(scene_object)
+            self.__index_by_parents(scene_object)
         elif isinstance(scene_object, ScenePlane):
             self.__planes.add(scene_object)
+            self.__index_by_parents(scene_object)
+            self.__cuts_dirty = True
         else:
             self.__other.add(scene_object)
+            self.__index_by_parents(scene_object)
+
+    @staticmethod
+    def __parents_key(parents: Iterable[SceneObject]) -> tuple[int, ...]:
+        return tuple(sorted(parent.handle for parent in parents))
+
+    def __index_by_parents(self, scene_object: RawSceneObject):
+        if not isinstance(scene_object, SceneObject):
+            return
+        key = self.__parents_key(scene_object.parents)
+        if not key:
+            return
+        self.__parent_keys[scene_object.handle] = key
+        self.__by_parents.setdefault(key, []).append(scene_object)
+
+    def __unindex_by_parents(self, scene_object: RawSceneObject):
+        key = self.__parent_keys.pop(scene_object.handle, None)
+        if key is None:
+            return
+        children = self.__by_parents[key]
+        children.remove(scene_object)
+        if not children:
+            self.__by_parents.pop(key)
+
+    def parents_changed(self, scene_object: SceneObject):
+        """Переносит объект сцены под новый ключ образующих. Вызывается
+         объектом через SceneObject.LINK_LISTENERS"""
+        if self.__objects.get(scene_object.handle, None) is not scene_object \
+                or isinstance(scene_object, (ScenePoint, SceneEdge,
+                                             SceneFace)):
+            return
+        self.__unindex_by_parents(scene_object)
+        self.__index_by_parents(scene_object)
 
     @profile
     def __remove_from_storage(self, scene_object):
@@ -69,18 +125,29 @@ class Scene:
             self.__remove(self.__points, scene_object)
         elif isinstance(scene_object, SceneEdge):
             self.__remove(self.__edges, scene_object)
+            self.__topology.remove(scene_object)
+            self.__cut_engine.remove_sources([scene_object.primitive])
+            self.__cuts_dirty = True
         elif isinstance(scene_object, SceneFace):
             self.__remove(self.__faces, scene_object)
+            self.__topology.remove(scene_object)
+            self.__cut_engine.remove_sources([scene_object.primitive])
+            self.__cuts_dirty = True
         elif isinstance(scene_object, SceneLine):
             self.__lines.remove(scene_object)
+            self.__unindex_by_parents(scene_object)
         elif isinstance(scene_object, ScenePlane):
             self.__planes.remove(scene_object)
+            self.__unindex_by_parents(scene_object)
         else:
             self.__other.remove(scene_object)
+            self.__unindex_by_parents(scene_object)
 
     @profile
     def add_object(self, scene_object: RawSceneObject):
-        self.__objects[scene_object.id] = scene_object
+        self.__objects[scene_object.handle] = scene_object
+        if self.__by_id is not None:
+            self.__by_id[scene_object.id] = scene_object
         self.__store_object(scene_object)
         if isinstance(scene_object, SceneObject):
             self.on_objects_added.invoke([scene_object])
@@ -93,10 +160,12 @@ class Scene:
     @profile
     def __remove_object_silent(self, scene_object: RawSceneObject) \
             -> list[RawSceneObject]:
-        if scene_object.id not in self.__objects:
+        if scene_object.handle not in self.__objects:
             return []
 
-        self.__objects.pop(scene_object.id)
+        self.__objects.pop(scene_object.handle)
+        if self.__by_id is not None:
+            self.__by_id.pop(scene_object.id, None)
         self.__remove_from_storage(scene_object)
         if not isinstance(scene_object, SceneObject):
             return []
@@ -111,8 +180,11 @@ class Scene:
     @profile
     def add_objects(self, scene_objects: Iterable[RawSceneObject]):
         invoke_list = []
+        by_id = self.__by_id
         for obj in scene_objects:
-            self.__objects[obj.id] = obj
+            self.__objects[obj.handle] = obj
+            if by_id is not None:
+                by_id[obj.id] = obj
             self.__store_object(obj)
             if isinstance(obj, SceneObject):
                 invoke_list.append(obj)
@@ -125,6 +197,114 @@ class Scene:
             removed.extend(self.__remove_object_silent(obj))
         self.on_objects_removed.invoke(removed)
 
+    @profile
+    def restore_objects(self, scene_objects: Iterable[SceneObject]):
+        """Возвращает в сцену удалённые ранее объекты вместе со связями"""
+        scene_objects = list(scene_objects)
+        for obj in scene_objects:
+            obj.on_restore()
+        self.add_objects(scene_objects)
+
+    @profile
+    def move_object(self, scene_object: SceneObject, pos: glm.vec3):
+        """Перемещает объект и сообщает, какие точки сдвинулись"""
+        self.move_objects([scene_object],
+                          pos - scene_object.transform.translation)
+
+    @profile
+    def move_objects(self, scene_objects: Iterable[SceneObject],
+                     offset: glm.vec3):
+        points = MoveEngine.collect_points(scene_objects)
+        old_positions = MoveEngine.get_positions(points)
+        new_positions = old_positions + np.array(
+            [offset.x, offset.y, offset.z], dtype=np.float32)
+        self.set_point_positions(points, new_positions, old_positions)
+
+    @profile
+    def transform_objects(self, scene_objects: Iterable[SceneObject],
+                          matrix: glm.mat4, about_center: bool = True):
+        """
+            Применяет матрицу к точкам объектов. При about_center поворот
+             и масштаб делаются относительно центра этих точек.
+        """
+        points = MoveEngine.collect_points(scene_objects)
+        if not points:
+            return
+        if about_center:
+            center = MoveEngine.get_center(points)
+            matrix = glm.translate(center) * matrix * glm.translate(-center)
+        old_positions = MoveEngine.get_positions(points)
+        self.set_point_positions(
+            points, MoveEngine.transform_positions(old_positions, matrix),
+            old_positions)
+
+    @profile
+    def set_point_positions(self, points: list[ScenePoint], positions,
+                            old_positions=None):
+        """Ставит точки в positions одним пакетом и сообщает о сдвиге"""
+        if old_positions is None:
+            old_positions = MoveEngine.get_positions(points)
+        positions = np.asarray(positions, dtype=np.float32)
+        MoveEngine.set_positions(points, positions)
+
+        changed = np.flatnonzero(np.any(positions != old_positions, axis=1))
+        moves = {points[i]: (glm.vec3(*old_positions[i].tolist()),
+                             glm.vec3(*positions[i].tolist()))
+                 for i in changed.tolist()}
+        if moves:
+            self.__cuts_dirty = True
+            self.on_objects_moved.invoke(moves)
+
+    @profile
+    def update_plane_cuts(self):
+        """
+            Пересчитывает сечения плоскостей после изменений сцены.
+            Вызывается перед отрисовкой и сохранением, поэтому несколько
+             изменений подряд обрабатываются одним пересчётом.
+        """
+        if not self.__cuts_dirty:
+            return
+        self.__cuts_dirty = False
+        for plane in self.__planes:
+            self.__cut_engine.update(plane.primitive)
+
+    def rename_object(self, scene_object: SceneObject, name: str):
+        old_name = scene_object.name
+        if old_name == name:
+            return
+        scene_object.primitive.name = name
+        scene_object.post_update()
+        self.on_object_renamed.invoke(scene_object, old_name, name)
+
+    @property
+    def topology(self) -> MeshTopology:
+        """Смежность рёбер и граней сцены"""
+        return self.__topology
+
+    def find_child(self, cls: Type[_T], *parents: SceneObject) \
+            -> Optional[_T]:
+        """
+            Объект сцены типа cls, построенный ровно по parents, порядок
+             не важен. Рёбра и грани по точкам ищутся в topology, прочие
+             объекты - по кортежу дескрипторов образующих, который
+             обновляется при изменении образующих объекта.
+        """
+        if all(isinstance(parent, ScenePoint) for parent in parents):
+            if cls is SceneEdge and len(parents) == 2:
+                return self.__topology.edge_between(*parents)
+            if cls is SceneFace and len(parents) == 3:
+                return self.__topology.face_between(*parents)
+        for child in self.__by_parents.get(self.__parents_key(parents), ()):
+            if isinstance(child, cls):
+                return child
+        return None
+
+    def get_object(self, obj_id) -> Optional[RawSceneObject]:
+        """Поиск по сохраняемому id. Индекс строится при первом вызове"""
+        if self.__by_id is None:
+            self.__by_id = {obj.id: obj for obj in self.__objects.values()}
+        return self.__by_id.get(obj_id, None)
+
     @property
     def all_objects(self) -> Iterable[RawSceneObject]:
         yield from self.__objects.values()
@@ -137,6 +317,8 @@ class Scene:
 
     @profile
     def render_shared(self):
+        self.update_plane_cuts()
+
         for obj in self.__other:
             self.__render_single(obj)
 
@@ -228,6 +410,11 @@ class Scene:
 
     def unload(self):
         self.__objects.clear()
+        self.__by_id = None
+        self.__cut_engine.clear()
+        self.__topology.clear()
+        self.__by_parents.clear()
+        self.__parent_keys.clear()
         self.camera = None
 
     @profile
@@ -0,0 +1,195 @@
+from contextlib import contextmanager
+from typing import Iterable, Optional
+
+import glm
+import numpy as np
+
+from .render_geometry import ScenePoint
+from .scene import Scene
+from .scene_object import SceneObject
+
+ADDED = "added"
+REMOVED = "removed"
+MOVED = "moved"
+RENAMED = "renamed"
+
+
+class SceneDiff:
+    """
+        Изменение сцены в виде последовательности операций:
+         добавление и удаление объектов, перемещение точек, переименование.
+        Хранит только затронутые объекты, поэтому его размер зависит
+         от правки, а не от сцены.
+    """
+
+    def __init__(self):
+        self.__changes = []
+
+    @property
+    def changes(self) -> list[tuple]:
+        return self.__changes
+
+    @property
+    def is_empty(self) -> bool:
+        return not self.__changes
+
+    def record_added(self, scene_objects: Iterable[SceneObject]):
+        scene_objects = list(scene_objects)
+        if scene_objects:
+            self.__changes.append((ADDED, scene_objects))
+
+    def record_removed(self, scene_objects: Iterable[SceneObject]):
+        scene_objects = list(scene_objects)
+        if scene_objects:
+            self.__changes.append((REMOVED, scene_objects))
+
+    def record_moved(self, moves: dict[ScenePoint, tuple[glm.vec3, glm.vec3]]):
+        """Последовательные перемещения склеиваются: для каждой точки
+         остаются первая старая и последняя новая позиции"""
+        if self.__changes and self.__changes[-1][0] == MOVED:
+            merged = self.__changes[-1][1]
+            for point, (old, new) in moves.items():
+                merged[point] = (merged[point][0], new) \
+                    if point in merged else (old, new)
+        elif moves:
+            self.__changes.append((MOVED, dict(moves)))
+
+    def record_renamed(self, scene_object: SceneObject, old_name: str,
+                       new_name: str):
+        self.__changes.append((RENAMED, scene_object, old_name, new_name))
+
+    def apply(self, scene: Scene):
+        for change in self.__changes:
+            self.__apply_change(scene, change, False)
+
+    def revert(self, scene: Scene):
+        for change in reversed(self.__changes):
+            self.__apply_change(scene, change, True)
+
+    @staticmethod
+    def __apply_change(scene: Scene, change: tuple, backward: bool):
+        kind = change[0]
+        if kind in (ADDED, REMOVED):
+            if (kind == ADDED) != backward:
+                scene.restore_objects(change[1])
+            else:
+                scene.remove_objects(change[1])
+        elif kind == MOVED:
+            # через сцену, чтобы пересчитались сечения и подписчики узнали
+            # о сдвиге; UndoStack во время отмены событий не записывает
+            points = list(change[1])
+            scene.set_point_positions(points, np.array(
+                [old if backward else new for old, new in change[1].values()],
+                dtype=np.float32))
+        elif kind == RENAMED:
+            _, scene_object, old_name, new_name = change
+            scene.rename_object(scene_object,
+                                old_name if backward else new_name)
+
+
+class UndoStack:
+    """
+        История правок сцены. Собирает SceneDiff из событий сцены.
+        Изменения внутри group() образуют один шаг отмены.
+    """
+
+    LIMIT = 1000
+
+    def __init__(self, scene: Scene):
+        self.__scene = scene
+        self.__undo = []
+        self.__redo = []
+        self.__group: Optional[SceneDiff] = None
+        self.__group_depth = 0
+        self.__applying = False
+
+        scene.on_objects_added += self.__on_objects_added
+        scene.on_objects_removed += self.__on_objects_removed
+        scene.on_objects_moved += self.__on_objects_moved
+        scene.on_object_renamed += self.__on_object_renamed
+
+    def detach(self):
+        scene = self.__scene
+        scene.on_objects_added -= self.__on_objects_added
+        scene.on_objects_removed -= self.__on_objects_removed
+        scene.on_objects_moved -= self.__on_objects_moved
+        scene.on_object_renamed -= self.__on_object_renamed
+
+    @property
+    def can_undo(self) -> bool:
+        return bool(self.__undo)
+
+    @property
+    def can_redo(self) -> bool:
+        return bool(self.__redo)
+
+    @contextmanager
+    def group(self):
+        if self.__group_depth == 0:
+            self.__group = SceneDiff()
+        self.__group_depth += 1
+        try:
+            yield
+        finally:
+            self.__group_depth -= 1
+            if self.__group_depth == 0:
+                diff, self.__group = self.__group, None
+                self.push(diff)
+
+    @contextmanager
+    def paused(self):
+        """Изменения внутри не попадают в историю"""
+        applying, self.__applying = self.__applying, True
+        try:
+            yield
+        finally:
+            self.__applying = applying
+
+    def push(self, diff: SceneDiff):
+        if diff.is_empty:
+            return
+        self.__undo.append(diff)
+        if len(self.__undo) > UndoStack.LIMIT:
+            self.__undo.pop(0)
+        self.__redo.clear()
+
+    def undo(self) -> bool:
+        return self.__step(self.__undo, self.__redo, SceneDiff.revert)
+
+    def redo(self) -> bool:
+        return self.__step(self.__redo, self.__undo, SceneDiff.apply)
+
+    def __step(self, source, destination, action) -> bool:
+        if not source or self.__group_depth:
+            return False
+        diff = source.pop()
+        self.__applying = True
+        try:
+            action(diff, self.__scene)
+        finally:
+            self.__applying = False
+        destination.append(diff)
+        return True
+
+    def __record(self, record, *args):
+        if self.__applying:
+            return
+        if self.__group is not None:
+            record(self.__group, *args)
+            return
+        diff = SceneDiff()
+        record(diff, *args)
+        self.push(diff)
+
+    def __on_objects_added(self, scene_objects):
+        self.__record(SceneDiff.record_added, scene_objects)
+
+    def __on_objects_removed(self, scene_objects):
+        self.__record(SceneDiff.record_removed, scene_objects)
+
+    def __on_objects_moved(self, moves):
+        self.__record(SceneDiff.record_moved, moves)
+
+    def __on_object_renamed(self, scene_object, old_name, new_name):
+        self.__record(SceneDiff.record_renamed, scene_object, old_name,
+                      new_name)
@@ -1,6 +1,7 @@
+import itertools
 import uuid
-from typing import Iterable, Type, Optional, TypeVar, final
-from weakref import ref
+from typing import Iterable, Type, Optional, TypeVar
+from weakref import WeakSet, ref
 from abc import ABC
 
 import glm
@@ -11,35 +12,58 @@ from core.Base_geometry_objects import BaseGeometryObject
 from core.event import Event
 from render.shared_vbo import MeshProvider
 from scene.camera import Camera
+from scene.dependency_graph import DependencyGraph
 from scene.transform import Transform
 
 
 class RawSceneObject(ABC):
+    """
+        Объект, который умеет рисовать сцена. Режим и слой отрисовки,
+         шейдер и поставщик мешей общие для класса, поэтому хранятся
+         в классе, а не в каждом объекте.
+        Внутри программы объект различается целочисленным дескриптором,
+         id нужен только для сохранения и создаётся при первом обращении.
+        Дескриптор у каждого объекта свой, поэтому сравнение и хэш
+         остаются стандартными - по самому объекту.
+    """
+    __slots__ = ('__weakref__', '__handle', '__id', '__transform', 'mesh')
+
     SHADER_PROGRAM = None
     MESH_PROVIDER = MeshProvider()
+    HANDLES = itertools.count(1)
+    render_mode = GL.GL_TRIANGLES
+    render_layer = 0
 
     def __init__(self, obj_id: uuid.UUID = None):
-        self.__id = obj_id if obj_id is not None else uuid.uuid4()
-        self.transform: Transform = Transform()
-
-        self.mesh_provider = RawSceneObject.MESH_PROVIDER
+        self.__handle = next(RawSceneObject.HANDLES)
+        self.__id = obj_id
+        self.__transform = None
         self.mesh = None
-        self.shader_program = self.SHADER_PROGRAM
-        self.render_mode = GL.GL_TRIANGLES
-        self.render_layer = 0
 
-    def __eq__(self, other):
-        if other is None:
-            return self is None
-        return self.id == other.id
+    @property
+    def handle(self) -> int:
+        return self.__handle
+
+    @property
+    def transform(self) -> Transform:
+        if self.__transform is None:
+            self.__transform = Transform()
+        return self.__transform
+
+    @property
+    def mesh_provider(self) -> MeshProvider:
+        return RawSceneObject.MESH_PROVIDER
+
+    @property
+    def shader_program(self):
+        return self.SHADER_PROGRAM
 
     @property
     def id(self) -> uuid.UUID:
+        if self.__id is None:
+            self.__id = uuid.uuid4()
         return self.__id
 
-    def __hash__(self):
-        return self.id.__hash__()
-
     def get_render_mat(self, camera: Camera) -> glm.mat4:
         return camera.get_mvp(self.transform.model_matrix)
 
@@ -51,67 +75,139 @@ class RawSceneObject(ABC):
 
 
 class SceneObject(RawSceneObject):
+    """
+        Объект сцены над геометрическим примитивом. Событие обновления
+         и словари родителей и детей создаются при первом обращении:
+         у большинства точек сцены нет ни подписчиков, ни детей.
+    """
+    __slots__ = ('__primitive', 'selected', '__on_updated', '__parents',
+                 '__children')
+
     SHADER_PROGRAM = None
+    selection_mask = 0
+    # сцены, которым сообщается об изменении образующих объекта:
+    # Scene.find_child хранит объекты по их образующим
+    LINK_LISTENERS = WeakSet()
 
     def __init__(self, primitive: BaseGeometryObject, *parents: 'SceneObject'):
-        super(SceneObject, self).__init__(primitive.id)
+        super(SceneObject, self).__init__()
 
         self.__primitive = primitive
         self.selected = False
-        self.selection_mask = 0
-        self.on_updated = Event()
+        self.__on_updated = None
+
+        self.__parents = None
+        self.__children = None
+        if parents:
+            # Связи нового объекта заведомо отсутствуют, поэтому они
+            # записываются напрямую, без взаимных проверок add_parents
+            self.__parents = {parent.handle: ref(parent)
+                              for parent in parents}
+            for parent in parents:
+                if parent.__children is None:
+                    parent.__children = {}
+                parent.__children[self.handle] = self
+            DependencyGraph.links_changed()
 
-        self.__parents = {}
-        self.__children = {}
-        self.add_parents(*parents)
-        for parent in parents:
-            parent.add_children(self)
+    @property
+    def on_updated(self) -> Event:
+        if self.__on_updated is None:
+            self.__on_updated = Event()
+        return self.__on_updated
+
+    @on_updated.setter
+    def on_updated(self, value: Event):
+        self.__on_updated = value
 
     def post_update(self):
-        self.on_updated.invoke(self)
+        if self.__on_updated is not None:
+            self.__on_updated.invoke(self)
 
     _T = TypeVar("_T")
 
     @classmethod
     def common_child(cls: Type[_T], *objects: 'SceneObject') -> Optional[_T]:
-        children_sets = [
-            set(child_id for child_id, child in obj.__children.items()
-                if isinstance(child, cls)) for obj in objects]
-        intersection = set.intersection(*children_sets)
-        return objects[0].__children[
-            next(iter(intersection))] if intersection else None
+        """Общий потомок типа cls. Перебираются только дети объекта,
+         у которого их меньше всего, остальные проверяются по словарям"""
+        children = [obj.__children for obj in objects]
+        if not all(children):
+            return None
+        smallest = min(children, key=len)
+        for handle, child in smallest.items():
+            if isinstance(child, cls) and \
+                    all(handle in other for other in children):
+                return child
+        return None
 
     @property
     def parents(self) -> Iterable['SceneObject']:
-        for parent in self.__parents.values():
-            yield parent()
+        """Живые образующие: ссылка на удалённый сборщиком объект
+         пропускается"""
+        if self.__parents:
+            for parent_ref in self.__parents.values():
+                parent = parent_ref()
+                if parent is not None:
+                    yield parent
+
+    @property
+    def parent_links_count(self) -> int:
+        """Число ссылок на образующие вместе с мёртвыми"""
+        return len(self.__parents) if self.__parents else 0
+
+    def has_parent(self, parent: 'SceneObject') -> bool:
+        return bool(self.__parents) and parent.handle in self.__parents
+
+    def has_child(self, child: 'SceneObject') -> bool:
+        return bool(self.__children) and child.handle in self.__children
+
+    def remove_dead_parents(self):
+        """Убирает ссылки на образующие, удалённые сборщиком"""
+        if self.__parents:
+            for handle, parent_ref in list(self.__parents.items()):
+                if parent_ref() is None:
+                    self.__parents.pop(handle)
+                    DependencyGraph.links_changed()
+                    self.__parents_changed()
+
+    def __parents_changed(self):
+        for listener in SceneObject.LINK_LISTENERS:
+            listener.parents_changed(self)
 
     @property
     def children(self) -> Iterable['SceneObject']:
-        yield from self.__children.values()
+        if self.__children:
+            yield from self.__children.values()
 
     def add_parents(self, *parents: 'SceneObject'):
         for parent in parents:
-            if parent.id not in self.__parents:
-                self.__parents[parent.id] = ref(parent)
+            if self.__parents is None:
+                self.__parents = {}
+            if parent.handle not in self.__parents:
+                self.__parents[parent.handle] = ref(parent)
+                self.__parents_changed()
                 parent.add_children(self)
 
     def remove_parents(self, *parents: 'SceneObject'):
         for parent in parents:
-            if parent.id in self.__parents:
-                self.__parents.pop(parent.id)
+            if self.__parents and parent.handle in self.__parents:
+                self.__parents.pop(parent.handle)
+                self.__parents_changed()
                 parent.remove_children(self)
 
     def add_children(self, *children: 'SceneObject'):
         for child in children:
-            if child.id not in self.__children:
-                self.__children[child.id] = child
+            if self.__children is None:
+                self.__children = {}
+            if child.handle not in self.__children:
+                self.__children[child.handle] = child
+                DependencyGraph.links_changed()
                 child.add_parents(self)
 
     def remove_children(self, *children: 'SceneObject', silent=False):
         for child in children:
-            if child.id in self.__children:
-                self.__children.pop(child.id)
+            if self.__children and child.handle in self.__children:
+                self.__children.pop(child.handle)
+                DependencyGraph.links_changed()
                 if not silent:
                     child.remove_parents(self)
 
@@ -119,6 +215,10 @@ class SceneObject(RawSceneObject):
     def primitive(self) -> BaseGeometryObject:
         return self.__primitive
 
+    @property
+    def id(self) -> str:
+        return self.__primitive.id
+
     @property
     def name(self) -> str:
         return self.primitive.name
@@ -127,13 +227,9 @@ class SceneObject(RawSceneObject):
     def type(self) -> str:
         return self.primitive.type
 
-    @final
-    def update_position(self, pos: glm.vec3):
-        self.update_hierarchy_position(pos, set())
-
-    def update_hierarchy_position(self, pos: glm.vec3,
-                                  ignored: set['SceneObject']):
-        self.transform.translation = pos
+    def get_moving_parents(self) -> Iterable['SceneObject']:
+        """Образующие, которые сдвигаются при перемещении объекта"""
+        return ()
 
     def on_parent_position_updated(self, parent: 'SceneObject'):
         pass
@@ -145,6 +241,12 @@ class SceneObject(RawSceneObject):
         for parent in self.parents:
             parent.remove_children(self, silent=True)
 
+    def on_restore(self):
+        """Вызывается при возвращении удалённого объекта в сцену"""
+        self.selected = False
+        for parent in self.parents:
+            parent.add_children(self)
+
     def get_selection_weight(self, camera: Camera,
                              click_pos: glm.vec2) -> float:
         """
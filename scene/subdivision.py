@@ -0,0 +1,130 @@
+"""
+    Пакетное деление рёбер. Каждое ребро делится точкой, а прилегающие
+     грани перестраиваются так же, как в DivisionBuilder, но для всех
+     рёбер сразу: новые объекты добавляются в сцену одним add_objects,
+     старые удаляются одним remove_objects.
+"""
+
+from typing import Iterable, Optional
+
+import numpy as np
+import numpy.typing as npt
+
+from core.Base_geometry_objects import Point
+from .mesh_batch import MeshBatch
+from .render_geometry import ScenePoint, SceneEdge
+from .scene import Scene
+from .scene_object import SceneObject
+
+_KEY_BASE = 2 ** 31
+_EDGES = np.array([(0, 1), (1, 2), (2, 0)])
+
+
+def _pair_keys(first, second) -> npt.NDArray[np.int64]:
+    return np.minimum(first, second) * _KEY_BASE + np.maximum(first, second)
+
+
+def _split_triangles(triangles: npt.NDArray[np.int64], keys, middles) \
+        -> npt.NDArray[np.int64]:
+    """
+        Перестраивает треугольники, у которых делятся рёбра с ключами keys.
+        Одно ребро - два треугольника к противоположной вершине,
+         два - три треугольника, три - четыре. Обход сохраняется.
+    """
+    edge_keys = _pair_keys(triangles[:, _EDGES[:, 0]],
+                           triangles[:, _EDGES[:, 1]])
+    found = np.minimum(np.searchsorted(keys, edge_keys), len(keys) - 1)
+    split = keys[found] == edge_keys
+    count = split.sum(axis=1)
+    result = [triangles[count == 0]]
+
+    def rotated(mask, shift):
+        rows = np.flatnonzero(mask)
+        order = (shift[mask][:, None] + np.arange(3)) % 3
+        vertices = [triangles[rows, order[:, k]] for k in range(3)]
+        mids = [middles[found[rows, order[:, k]]] for k in range(3)]
+        return vertices, mids
+
+    one = count == 1
+    if one.any():
+        (a, b, c), (m, _, _) = rotated(one, np.argmax(split, axis=1))
+        result.extend([np.stack([a, m, c], axis=1),
+                       np.stack([m, b, c], axis=1)])
+    two = count == 2
+    if two.any():
+        whole = np.argmin(split, axis=1)
+        (a, b, c), (m0, m1, _) = rotated(two, (whole + 1) % 3)
+        result.extend([np.stack([m0, b, m1], axis=1),
+                       np.stack([a, m0, m1], axis=1),
+                       np.stack([a, m1, c], axis=1)])
+    three = count == 3
+    if three.any():
+        (a, b, c), (m0, m1, m2) = rotated(three,
+                                          np.zeros(len(count), dtype=np.int64))
+        result.extend([np.stack([a, m0, m2], axis=1),
+                       np.stack([m0, b, m1], axis=1),
+                       np.stack([m2, m1, c], axis=1),
+                       np.stack([m0, m1, m2], axis=1)])
+    return np.concatenate(result)
+
+
+def split_edges(scene: Scene, edges: Iterable[SceneEdge],
+                ratios: Optional[Iterable[float]] = None,
+                times: int = 1) -> list[SceneObject]:
+    """
+        Делит рёбра и прилегающие к ним грани.
+        ratios - положение точки деления от первой точки ребра для
+         первого прохода, по умолчанию середина. Каждый следующий проход
+         делит получившиеся половины пополам, так что после times
+         проходов ребро состоит из 2 ** times частей.
+        Возвращает новые объекты: точки, затем рёбра и грани.
+    """
+    edges = list({edge: None for edge in edges})
+    if not edges or times < 1:
+        return []
+    ratios = np.full(len(edges), 0.5) if ratios is None else \
+        np.asarray(list(ratios), dtype=np.float64)
+
+    topology = scene.topology
+    faces = list({face: None for edge in edges
+                  for face in topology.edge_faces(edge)})
+
+    points = {}
+    for obj in edges + faces:
+        for parent in obj.parents:
+            if isinstance(parent, ScenePoint):
+                points[parent.primitive.handle] = parent
+    handles = np.array(sorted(points), dtype=np.int64)
+
+    pairs = np.searchsorted(handles, np.array(
+        [(edge.primitive.point1.handle, edge.primitive.point2.handle)
+         for edge in edges], dtype=np.int64).reshape(-1, 2))
+    triangles = np.searchsorted(handles, np.array(
+        [(face.primitive.point1.handle, face.primitive.point2.handle,
+          face.primitive.point3.handle) for face in faces],
+        dtype=np.int64).reshape(-1, 3))
+    positions = [Point.STORE.positions[handles].astype(np.float64)]
+    vertex_count = len(handles)
+
+    for _ in range(times):
+        order = np.argsort(_pair_keys(pairs[:, 0], pairs[:, 1]))
+        pairs, ratios = pairs[order], ratios[order]
+        keys = _pair_keys(pairs[:, 0], pairs[:, 1])
+        all_positions = np.concatenate(positions)
+        middles = np.arange(vertex_count, vertex_count + len(pairs))
+        positions.append(all_positions[pairs[:, 0]] + ratios[:, None] * (
+                all_positions[pairs[:, 1]] - all_positions[pairs[:, 0]]))
+        vertex_count += len(pairs)
+
+        triangles = _split_triangles(triangles, keys, middles)
+        pairs = np.concatenate([np.stack([pairs[:, 0], middles], axis=1),
+                                np.stack([middles, pairs[:, 1]], axis=1)])
+        ratios = np.full(len(pairs), 0.5)
+
+    batch = MeshBatch(points[handle] for handle in handles.tolist())
+    batch.add_points(np.concatenate(positions[1:]))
+    batch.add_edges(pairs)
+    batch.add_triangles(triangles)
+
+    scene.remove_objects(edges + faces)
+    return batch.add_to(scene)
@@ -0,0 +1,113 @@
+from typing import Iterable, Optional
+
+from .render_geometry import ScenePoint, SceneEdge, SceneFace
+from .scene_object import RawSceneObject
+
+
+def _edge_key(handle1: int, handle2: int) -> tuple[int, int]:
+    return (handle1, handle2) if handle1 < handle2 else (handle2, handle1)
+
+
+def _face_key(handle1: int, handle2: int,
+              handle3: int) -> tuple[int, int, int]:
+    return tuple(sorted((handle1, handle2, handle3)))
+
+
+class MeshTopology:
+    """
+        Индекс смежности рёбер и граней сцены. Ключи - дескрипторы точек
+         в PointStore, поэтому индекс не зависит от связей родителей
+         и детей и не меняется при перемещении точек.
+        Обновляется сценой при добавлении и удалении объектов, все
+         запросы - поиск в словаре.
+    """
+
+    def __init__(self):
+        self.__edges = {}
+        self.__faces = {}
+        self.__vertex_edges = {}
+        self.__edge_faces = {}
+
+    def add(self, scene_object: RawSceneObject):
+        if isinstance(scene_object, SceneEdge):
+            segment = scene_object.primitive
+            handles = segment.point1.handle, segment.point2.handle
+            self.__edges.setdefault(_edge_key(*handles), []).append(
+                scene_object)
+            for handle in handles:
+                self.__vertex_edges.setdefault(handle, {})[scene_object] = None
+        elif isinstance(scene_object, SceneFace):
+            triangle = scene_object.primitive
+            handles = (triangle.point1.handle, triangle.point2.handle,
+                       triangle.point3.handle)
+            self.__faces.setdefault(_face_key(*handles), []).append(
+                scene_object)
+            for i in range(3):
+                key = _edge_key(handles[i], handles[i - 1])
+                self.__edge_faces.setdefault(key, {})[scene_object] = None
+
+    def remove(self, scene_object: RawSceneObject):
+        if isinstance(scene_object, SceneEdge):
+            segment = scene_object.primitive
+            handles = segment.point1.handle, segment.point2.handle
+            self.__discard(self.__edges, _edge_key(*handles), scene_object)
+            for handle in handles:
+                self.__discard(self.__vertex_edges, handle, scene_object)
+        elif isinstance(scene_object, SceneFace):
+            triangle = scene_object.primitive
+            handles = (triangle.point1.handle, triangle.point2.handle,
+                       triangle.point3.handle)
+            self.__discard(self.__faces, _face_key(*handles), scene_object)
+            for i in range(3):
+                self.__discard(self.__edge_faces,
+                               _edge_key(handles[i], handles[i - 1]),
+                               scene_object)
+
+    @staticmethod
+    def __discard(index: dict, key, scene_object: RawSceneObject):
+        values = index.get(key, None)
+        if values is None or scene_object not in values:
+            return
+        if isinstance(values, list):
+            values.remove(scene_object)
+        else:
+            values.pop(scene_object)
+        if not values:
+            index.pop(key)
+
+    def clear(self):
+        self.__edges.clear()
+        self.__faces.clear()
+        self.__vertex_edges.clear()
+        self.__edge_faces.clear()
+
+    def edge_between(self, point1: ScenePoint,
+                     point2: ScenePoint) -> Optional[SceneEdge]:
+        edges = self.__edges.get(
+            _edge_key(point1.point.handle, point2.point.handle), None)
+        return edges[0] if edges else None
+
+    def face_between(self, point1: ScenePoint, point2: ScenePoint,
+                     point3: ScenePoint) -> Optional[SceneFace]:
+        faces = self.__faces.get(_face_key(point1.point.handle,
+                                           point2.point.handle,
+                                           point3.point.handle), None)
+        return faces[0] if faces else None
+
+    def vertex_edges(self, point: ScenePoint) -> Iterable[SceneEdge]:
+        """Рёбра, один из концов которых - point"""
+        yield from self.__vertex_edges.get(point.point.handle, ())
+
+    def edge_faces(self, edge: SceneEdge) -> Iterable[SceneFace]:
+        """Грани, у которых есть сторона с теми же концами, что у edge"""
+        segment = edge.primitive
+        yield from self.__edge_faces.get(
+            _edge_key(segment.point1.handle, segment.point2.handle), ())
+
+    def vertex_faces(self, point: ScenePoint) -> Iterable[SceneFace]:
+        """Грани, одна из вершин которых - point. Грань находится через
+         рёбра точки, так что у неё должно быть хотя бы одно такое ребро"""
+        faces = {}
+        for edge in self.vertex_edges(point):
+            faces.update((face, None) for face in self.edge_faces(edge))
+        yield from faces
@@ -2,14 +2,27 @@ import glm
 
 
 class Transform:
+    """
+        Перенос, поворот и масштаб. Тождественные поворот и масштаб
+         не хранятся в объекте, а матрица модели считается при первом
+         обращении после изменения.
+    """
+    __slots__ = ('__translation', '__rotation', '__scale', '__model_mat')
+
     def __init__(self):
         self.__translation = glm.vec3()
-        self.__rotation = glm.quat()
-        self.__scale = glm.vec3(1)
-        self.__model_mat = glm.mat4(1)
+        self.__rotation = None
+        self.__scale = None
+        self.__model_mat = None
+
+    @classmethod
+    def at(cls, translation: glm.vec3) -> 'Transform':
+        transform = cls()
+        transform.__translation = translation
+        return transform
 
     def _transform_changed(self):
-        self.__recalculate_matrix()
+        self.__model_mat = None
 
     @property
     def translation(self) -> glm.vec3:
@@ -22,7 +35,7 @@ class Transform:
 
     @property
     def eulers(self) -> glm.vec3:
-        return glm.eulerAngles(self.__rotation)
+        return glm.eulerAngles(self.rotation)
 
     @eulers.setter
     def eulers(self, value: glm.vec3):
@@ -33,6 +46,8 @@ class Transform:
 
     @property
     def rotation(self) -> glm.quat:
+        if self.__rotation is None:
+            return glm.quat()
         return self.__rotation
 
     @rotation.setter
@@ -42,6 +57,8 @@ class Transform:
 
     @property
     def scale(self) -> glm.vec3:
+        if self.__scale is None:
+            return glm.vec3(1)
         return self.__scale
 
     @scale.setter
@@ -49,6 +66,17 @@ class Transform:
         self.__scale = value
         self._transform_changed()
 
+    def set(self, translation: glm.vec3 = None, rotation: glm.quat = None,
+            scale: glm.vec3 = None):
+        """Меняет несколько составляющих за одно обновление матриц"""
+        if translation is not None:
+            self.__translation = translation
+        if rotation is not None:
+            self.__rotation = rotation
+        if scale is not None:
+            self.__scale = scale
+        self._transform_changed()
+
     def rotate_by(self, value: glm.vec3):
         self.rotation *= glm.quat(value * glm.pi() / 180)
 
@@ -71,10 +99,15 @@ class Transform:
         return self.rotation * glm.vec3(0, 1, 0)
 
     def __recalculate_matrix(self):
-        self.__model_mat = (glm.translate(self.translation) *
-                            glm.mat4_cast(self.rotation) *
-                            glm.scale(self.scale))
+        self.__model_mat = glm.translate(self.translation)
+        if self.__rotation is not None:
+            self.__model_mat = self.__model_mat * glm.mat4_cast(
+                self.__rotation)
+        if self.__scale is not None:
+            self.__model_mat = self.__model_mat * glm.scale(self.__scale)
 
     @property
     def model_matrix(self):
+        if self.__model_mat is None:
+            self.__recalculate_matrix()
         return self.__model_mat
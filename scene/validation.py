@@ -0,0 +1,196 @@
+"""
+    Проверка и исправление сцены. Геометрия проверяется массивами
+     по дескрипторам точек в PointStore, связи образующих и детей -
+     одним проходом по объектам сцены.
+"""
+
+from typing import Optional
+
+import numpy as np
+import numpy.typing as npt
+
+from core.Base_geometry_objects import BaseGeometryObject, Point
+from core.intersections import EPS
+from .render_geometry import SceneEdge, SceneFace
+from .scene import Scene
+from .scene_object import SceneObject
+
+
+class ValidationReport:
+    """Найденные проблемы. Пары записываются как (образующий, ребёнок)"""
+
+    def __init__(self):
+        self.degenerate_faces: list[SceneFace] = []
+        self.zero_edges: list[SceneEdge] = []
+        # (лишняя копия, оставляемый объект)
+        self.duplicate_faces: list[tuple[SceneFace, SceneFace]] = []
+        self.duplicate_edges: list[tuple[SceneEdge, SceneEdge]] = []
+        self.dangling: list[SceneObject] = []
+        self.dead_parents: list[SceneObject] = []
+        self.missing_children: list[tuple[SceneObject, SceneObject]] = []
+        self.missing_parents: list[tuple[SceneObject, SceneObject]] = []
+        self.stale_children: list[tuple[SceneObject, SceneObject]] = []
+        # (объект, образующий его примитива, которого нет в сцене)
+        self.missing_forming: list[tuple[SceneObject,
+                                         BaseGeometryObject]] = []
+
+    def __sections(self) -> list[tuple[str, list]]:
+        return [
+            ("Вырожденные грани", self.degenerate_faces),
+            ("Отрезки нулевой длины", self.zero_edges),
+            ("Повторяющиеся грани", self.duplicate_faces),
+            ("Повторяющиеся отрезки", self.duplicate_edges),
+            ("Объекты с образующими вне сцены", self.dangling),
+            ("Ссылки на удалённые образующие", self.dead_parents),
+            ("Ребёнок не записан у образующего", self.missing_children),
+            ("Образующий не записан у ребёнка", self.missing_parents),
+            ("Дети вне сцены", self.stale_children),
+            ("Образующие примитива вне сцены", self.missing_forming),
+        ]
+
+    @property
+    def issue_count(self) -> int:
+        return sum(len(items) for _, items in self.__sections())
+
+    def is_clean(self) -> bool:
+        return self.issue_count == 0
+
+    def summary(self) -> str:
+        lines = [f"{title}: {len(items)}"
+                 for title, items in self.__sections() if items]
+        return "\n".join(lines) if lines else "Проблем не найдено"
+
+
+def _tolerances(positions: npt.NDArray[np.float64]) \
+        -> npt.NDArray[np.float64]:
+    """Допуск для каждого объекта K x V x 3 с поправкой на масштаб"""
+    return EPS * (1 + np.abs(positions).max(axis=(1, 2)))
+
+
+def _duplicates(objects: list, keys: npt.NDArray[np.int64]) -> list[tuple]:
+    """Пары (копия, первый объект с тем же набором точек)"""
+    if len(objects) == 0:
+        return []
+    _, first, inverse = np.unique(np.sort(keys, axis=1), axis=0,
+                                  return_index=True, return_inverse=True)
+    kept = first[inverse.ravel()]
+    copies = np.flatnonzero(kept != np.arange(len(objects)))
+    return [(objects[i], objects[kept[i]]) for i in copies.tolist()]
+
+
+def _check_edges(report: ValidationReport, edges: list[SceneEdge]):
+    handles = np.array([(edge.primitive.point1.handle,
+                         edge.primitive.point2.handle) for edge in edges],
+                       dtype=np.int64).reshape(-1, 2)
+    positions = Point.STORE.positions[handles].astype(np.float64)
+    lengths = np.linalg.norm(positions[:, 1] - positions[:, 0], axis=1)
+    zero = lengths <= _tolerances(positions)
+    report.zero_edges = [edges[i] for i in np.flatnonzero(zero).tolist()]
+    report.duplicate_edges = _duplicates(edges, handles)
+
+
+def _check_faces(report: ValidationReport, faces: list[SceneFace]):
+    handles = np.array([(face.primitive.point1.handle,
+                         face.primitive.point2.handle,
+                         face.primitive.point3.handle) for face in faces],
+                       dtype=np.int64).reshape(-1, 3)
+    positions = Point.STORE.positions[handles].astype(np.float64)
+    sides = positions[:, [1, 2, 0]] - positions
+    doubled_areas = np.linalg.norm(np.cross(sides[:, 0], sides[:, 1]),
+                                   axis=1)
+    longest = np.linalg.norm(sides, axis=2).max(axis=1)
+    # высота к самой длинной стороне не больше допуска
+    degenerate = doubled_areas <= _tolerances(positions) * longest
+    report.degenerate_faces = [faces[i]
+                               for i in np.flatnonzero(degenerate).tolist()]
+    report.duplicate_faces = _duplicates(faces, handles)
+
+
+def _check_links(report: ValidationReport, objects: list[SceneObject]):
+    in_scene = {obj.handle for obj in objects}
+    primitives = {obj.primitive for obj in objects
+                  if obj.primitive is not None}
+    for obj in objects:
+        primitive = obj.primitive
+        forming = primitive.get_forming_objects() \
+            if primitive is not None else ()
+        if not primitives.issuperset(forming):
+            report.missing_forming.extend(
+                (obj, missing) for missing in forming
+                if missing not in primitives)
+        parents = list(obj.parents)
+        if len(parents) != obj.parent_links_count:
+            report.dead_parents.append(obj)
+        if any(parent.handle not in in_scene for parent in parents) or \
+                len(parents) != obj.parent_links_count:
+            report.dangling.append(obj)
+        for parent in parents:
+            if not parent.has_child(obj):
+                report.missing_children.append((parent, obj))
+        for child in obj.children:
+            if child.handle not in in_scene:
+                report.stale_children.append((obj, child))
+            elif not child.has_parent(obj):
+                report.missing_parents.append((obj, child))
+
+
+def validate_scene(scene: Scene) -> ValidationReport:
+    """Ищет проблемы геометрии и связей, ничего не меняя"""
+    objects = list(scene.objects)
+    report = ValidationReport()
+    _check_edges(report, [obj for obj in objects
+                          if isinstance(obj, SceneEdge)])
+    _check_faces(report, [obj for obj in objects
+                          if isinstance(obj, SceneFace)])
+    _check_links(report, objects)
+    return report
+
+
+def _merge_into(duplicate: SceneObject, kept: SceneObject):
+    """Переносит детей копии на оставляемый объект вместе со ссылками
+     их примитивов на примитив копии"""
+    for child in list(duplicate.children):
+        if child.primitive is not None and \
+                child.primitive.replace_forming_object(duplicate.primitive,
+                                                       kept.primitive):
+            child.on_parent_position_updated(kept)
+        child.add_parents(kept)
+        duplicate.remove_children(child)
+
+
+def repair_scene(scene: Scene,
+                 report: Optional[ValidationReport] = None) \
+        -> ValidationReport:
+    """
+        Исправляет найденные проблемы и возвращает отчёт о них.
+        Связи восстанавливаются с обеих сторон, ссылки на детей вне
+         сцены и на удалённые образующие убираются. Дети копий
+         переносятся на оставляемый объект. Копии, вырожденные объекты
+         и объекты с образующими вне сцены (по связям или по ссылкам
+         примитива) удаляются одним remove_objects вместе со своими
+         детьми.
+        Совпадающие в пространстве разные точки не сливаются.
+    """
+    if report is None:
+        report = validate_scene(scene)
+
+    for parent, child in report.missing_children:
+        parent.add_children(child)
+    for parent, child in report.missing_parents:
+        child.add_parents(parent)
+    for parent, child in report.stale_children:
+        parent.remove_children(child, silent=True)
+    for obj in report.dead_parents:
+        obj.remove_dead_parents()
+    for duplicate, kept in report.duplicate_edges + report.duplicate_faces:
+        _merge_into(duplicate, kept)
+
+    removed = {}
+    for duplicate, _ in report.duplicate_edges + report.duplicate_faces:
+        removed[duplicate] = None
+    for obj in report.degenerate_faces + report.zero_edges + report.dangling:
+        removed[obj] = None
+    for obj, _ in report.missing_forming:
+        removed[obj] = None
+    scene.remove_objects(removed)
+    return report
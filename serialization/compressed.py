@@ -0,0 +1,366 @@
+import json
+import lzma
+import os
+import struct
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Optional
+
+import numpy as np
+
+from scene.scene import Scene
+from serialization.generator_of_decoding_objects import \
+    generate_object_by_deserialized_data
+from serialization.region import Region, intersects, bounds_to_list, \
+    collect_dependencies, forming_ids
+from serialization.serialize import extract_camera_settings, extract_children
+from serialization.weld import weld_scene_data
+
+MAGIC = b'3DSC'
+VERSION = 2
+HEADER = struct.Struct('<4sBI')
+
+CHUNK_SIZE = 4096
+PARALLEL_THRESHOLD = 4 * 1024 * 1024
+MORTON_BITS = 10
+
+COMPRESSORS = {
+    "zlib": (zlib.compress, zlib.decompress),
+    "lzma": (lzma.compress, lzma.decompress),
+}
+
+
+def is_compressed_scene(file_name: str) -> bool:
+    with open(file_name, "rb") as file:
+        return file.read(len(MAGIC)) == MAGIC
+
+
+def _encode(data, method: str) -> bytes:
+    compress, _ = COMPRESSORS[method]
+    return compress(json.dumps(data).encode("utf-8"))
+
+
+def _decode(payload: bytes, method: str):
+    _, decompress = COMPRESSORS[method]
+    return json.loads(decompress(payload).decode("utf-8"))
+
+
+def _spread_bits(values):
+    """Раздвигает биты так, чтобы между ними было по два нулевых"""
+    values = values.astype(np.uint64)
+    result = np.zeros_like(values)
+    for bit in range(MORTON_BITS):
+        result |= ((values >> np.uint64(bit)) & np.uint64(1)) \
+                  << np.uint64(3 * bit)
+    return result
+
+
+def _morton_codes(boxes):
+    centers = (boxes[:, :3] + boxes[:, 3:]) / 2
+    low, high = centers.min(axis=0), centers.max(axis=0)
+    extent = np.where(high > low, high - low, 1)
+    cells = ((centers - low) / extent * ((1 << MORTON_BITS) - 1)).astype(
+        np.uint64)
+    return (_spread_bits(cells[:, 0]) |
+            (_spread_bits(cells[:, 1]) << np.uint64(1)) |
+            (_spread_bits(cells[:, 2]) << np.uint64(2)))
+
+
+def _spatial_order(group, boxes):
+    """Упорядочивает объекты вдоль кривой Мортона, чтобы соседние в файле
+     объекты были соседними и в пространстве. Неограниченные идут в конце."""
+    bounded = [i for i, box in enumerate(boxes) if box is not None]
+    unbounded = sorted((i for i, box in enumerate(boxes) if box is None),
+                       key=lambda i: group[i].id)
+    if bounded:
+        codes = _morton_codes(np.array([boxes[i] for i in bounded]))
+        bounded = [bounded[i] for i in np.argsort(codes, kind="stable")]
+    return bounded + unbounded
+
+
+def _split_into_chunks(primitives, chunk_size):
+    by_type = {}
+    for primitive in primitives:
+        by_type.setdefault(primitive.type, []).append(primitive)
+
+    for obj_type in sorted(by_type):
+        group = by_type[obj_type]
+        boxes = [bounds_to_list(primitive.get_bounding_box())
+                 for primitive in group]
+        order = _spatial_order(group, boxes)
+        for start in range(0, len(order), chunk_size):
+            part = order[start:start + chunk_size]
+            yield obj_type, [group[i] for i in part], [boxes[i] for i in part]
+
+
+def _chunk_bounds(boxes) -> Optional[list[float]]:
+    """Общий ограничивающий параллелепипед или None, если среди объектов
+     есть неограниченные"""
+    if any(box is None for box in boxes):
+        return None
+    boxes = np.array(boxes)
+    return boxes[:, :3].min(axis=0).tolist() + boxes[:, 3:].max(axis=0).tolist()
+
+
+def serialize_scene_compressed(scene: Scene, file_name: str,
+                               method: str = "zlib",
+                               chunk_size: int = CHUNK_SIZE):
+    """Сохраняет сцену в контейнер из независимо сжатых чанков.
+     Каждый чанк содержит объекты одного типа, близкие в пространстве.
+     Оглавление хранит границы чанков (пространственный индекс) и чанки,
+     от которых они зависят."""
+    if method not in COMPRESSORS:
+        raise ValueError(f"Unknown compression method {method}")
+
+    primitives = []
+    children = {}
+    scene.update_plane_cuts()
+    for obj in scene.objects:
+        if obj.primitive is None:
+            print(
+                f"Scene object name: {obj.name} id: {obj.id} has no primitive")
+            continue
+        extract_children(children, obj)
+        primitives.append(obj.primitive)
+
+    chunks = list(_split_into_chunks(primitives, chunk_size))
+    chunk_of = {primitive.id: index
+                for index, (_, group, _) in enumerate(chunks)
+                for primitive in group}
+
+    records = []
+    payloads = []
+    offset = 0
+    for index, (obj_type, group, boxes) in enumerate(chunks):
+        objects = {}
+        requires = set()
+        for primitive in group:
+            serialized = primitive.get_serializing_dict()
+            objects.update(serialized)
+            for forming_id in forming_ids(serialized[primitive.id]):
+                if forming_id in chunk_of:
+                    requires.add(chunk_of[forming_id])
+        requires.discard(index)
+
+        payload = _encode({
+            "objects": objects,
+            "bounds": {primitive.id: box
+                       for primitive, box in zip(group, boxes)
+                       if box is not None},
+            "children": {obj_id: children[obj_id] for obj_id in objects
+                         if children.get(obj_id)}
+        }, method)
+        payloads.append(payload)
+        records.append({
+            "type": obj_type,
+            "count": len(group),
+            "offset": offset,
+            "size": len(payload),
+            "bounds": _chunk_bounds(boxes),
+            "requires": sorted(requires)
+        })
+        offset += len(payload)
+
+    index = zlib.compress(json.dumps({
+        "method": method,
+        "camera": extract_camera_settings(scene.camera),
+        "chunks": records
+    }).encode("utf-8"))
+
+    with open(file_name, "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION, len(index)))
+        file.write(index)
+        for payload in payloads:
+            file.write(payload)
+
+
+def read_index(file_name: str) -> (dict, int):
+    """Читает оглавление контейнера. Возвращает его и смещение данных чанков"""
+    with open(file_name, "rb") as file:
+        magic, version, index_size = HEADER.unpack(file.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"{file_name} is not a compressed scene")
+        if version != VERSION:
+            raise ValueError(f"Unsupported scene version {version}")
+        index = json.loads(zlib.decompress(file.read(index_size)))
+    return index, HEADER.size + index_size
+
+
+def read_chunks(file_name: str, index: dict, data_offset: int,
+                chunk_indices: Iterable[int],
+                workers: Optional[int] = None) -> dict[int, dict]:
+    """Читает и распаковывает чанки. Крупные наборы распаковываются
+     параллельно в отдельных процессах."""
+    chunks = index["chunks"]
+    chunk_indices = list(chunk_indices)
+    payloads = []
+    with open(file_name, "rb") as file:
+        for i in chunk_indices:
+            file.seek(data_offset + chunks[i]["offset"])
+            payloads.append(file.read(chunks[i]["size"]))
+
+    method = index["method"]
+    total_size = sum(len(payload) for payload in payloads)
+    if workers is None:
+        workers = os.cpu_count() if total_size >= PARALLEL_THRESHOLD else 1
+
+    if workers > 1 and len(payloads) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            decoded = list(executor.map(_decode, payloads,
+                                        [method] * len(payloads)))
+    else:
+        decoded = [_decode(payload, method) for payload in payloads]
+
+    return dict(zip(chunk_indices, decoded))
+
+
+class SceneStreamer:
+    """
+        Загружает сжатую сцену по частям.
+        Каждый вызов load_region догружает объекты, пересекающие область,
+         вместе с их образующими и возвращает только новые объекты.
+    """
+
+    def __init__(self, file_name: str,
+                 types: Optional[Iterable[str]] = None,
+                 workers: Optional[int] = None):
+        self.__file_name = file_name
+        self.__index, self.__data_offset = read_index(file_name)
+        self.__types = set(types) if types is not None else None
+        self.__workers = workers
+
+        self.__decoded = set()
+        self.__data = {}
+        self.__bounds = {}
+        self.__children = {}
+        self.__parents = {}
+        self.__pending = {
+            i: None for i, chunk in enumerate(self.__index["chunks"])
+            if self.__types is None or chunk["type"] in self.__types}
+
+        self.__objects = {}
+        self.__removed = set()
+
+    @property
+    def camera_settings(self) -> dict[str, str]:
+        return self.__index["camera"]
+
+    @property
+    def object_count(self) -> int:
+        return sum(chunk["count"] for chunk in self.__index["chunks"])
+
+    @property
+    def is_complete(self) -> bool:
+        return not self.__pending
+
+    def forget(self, obj_ids: Iterable[str]):
+        """Помечает объекты удалёнными: они и зависящие от них объекты
+         больше не будут загружены"""
+        for obj_id in obj_ids:
+            self.__removed.add(obj_id)
+            self.__objects.pop(obj_id, None)
+
+    def load_all(self):
+        return self.load_region(None)
+
+    def weld(self):
+        """Декодирует все чанки и сваривает совпадающие точки.
+         Вызывается до загрузки объектов."""
+        self.__decode(self.__with_dependencies(self.__pending))
+        dropped = weld_scene_data(self.__data, self.__children)
+        for obj_id in dropped:
+            self.__bounds.pop(obj_id, None)
+        for pending in self.__pending.values():
+            pending.difference_update(dropped)
+
+        self.__parents = {}
+        for parent_id, child_ids in self.__children.items():
+            for child_id in child_ids:
+                self.__parents.setdefault(child_id, []).append(parent_id)
+
+    def load_region(self, region: Optional[Region]):
+        chunks = self.__index["chunks"]
+        selected = [i for i in self.__pending
+                    if region is None or intersects(chunks[i]["bounds"],
+                                                    region)]
+        self.__decode(self.__with_dependencies(selected))
+
+        requested = []
+        for i in selected:
+            pending = self.__pending[i]
+            hits = [obj_id for obj_id in pending
+                    if region is None or
+                    intersects(self.__bounds.get(obj_id), region)]
+            pending.difference_update(hits)
+            if not pending:
+                self.__pending.pop(i)
+            requested.extend(hits)
+
+        new_ids = collect_dependencies(requested, self.__data,
+                                       self.__objects, self.__removed)
+        for obj_id in new_ids:
+            generate_object_by_deserialized_data(obj_id, self.__data,
+                                                 self.__objects)
+
+        objects = {obj_id: self.__objects[obj_id] for obj_id in new_ids
+                   if obj_id in self.__objects}
+        return objects, self.__new_links(objects)
+
+    def __with_dependencies(self, selected: Iterable[int]) -> list[int]:
+        chunks = self.__index["chunks"]
+        result = set()
+        stack = list(selected)
+        while stack:
+            i = stack.pop()
+            if i in result or i in self.__decoded:
+                continue
+            result.add(i)
+            stack.extend(chunks[i]["requires"])
+        return sorted(result)
+
+    def __decode(self, chunk_indices: list[int]):
+        if not chunk_indices:
+            return
+        decoded = read_chunks(self.__file_name, self.__index,
+                              self.__data_offset, chunk_indices,
+                              self.__workers)
+        for i, chunk in decoded.items():
+            self.__decoded.add(i)
+            self.__data.update(chunk["objects"])
+            self.__bounds.update(chunk["bounds"])
+            for parent_id, child_ids in chunk["children"].items():
+                self.__children[parent_id] = child_ids
+                for child_id in child_ids:
+                    self.__parents.setdefault(child_id, []).append(parent_id)
+            if i in self.__pending:
+                self.__pending[i] = set(chunk["objects"])
+
+    def __new_links(self, new_objects) -> dict[str, list[str]]:
+        """Связи родитель-потомок, в которых участвует хотя бы один новый
+         объект, а оба конца уже загружены"""
+        links = {}
+        loaded = self.__objects
+        for obj_id in new_objects:
+            for child_id in self.__children.get(obj_id, ()):
+                if child_id in loaded:
+                    links.setdefault(obj_id, set()).add(child_id)
+            for parent_id in self.__parents.get(obj_id, ()):
+                if parent_id in loaded:
+                    links.setdefault(parent_id, set()).add(obj_id)
+        return {parent_id: list(child_ids)
+                for parent_id, child_ids in links.items()}
+
+
+def deserialize_scene_compressed(file_name: str,
+                                 types: Optional[Iterable[str]] = None,
+                                 region: Optional[Region] = None,
+                                 workers: Optional[int] = None,
+                                 weld: bool = False):
+    """Загружает сцену из сжатого контейнера.
+     types и region ограничивают загрузку объектами нужных типов,
+     пересекающими область; их образующие подгружаются автоматически."""
+    streamer = SceneStreamer(file_name, types, workers)
+    if weld:
+        streamer.weld()
+    objects, children_data = streamer.load_region(region)
+    return streamer.camera_settings, objects, children_data
@@ -0,0 +1,425 @@
+import os
+import re
+from typing import Iterable, Optional
+
+import numpy as np
+import numpy.typing as npt
+
+from core.Base_geometry_objects import Point
+from core.weld import WELD_TOLERANCE, weld_positions
+from scene.mesh_batch import MeshBatch
+from scene.render_geometry import ScenePoint, SceneEdge, SceneFace
+from scene.scene import Scene
+from scene.scene_object import SceneObject
+
+MeshData = tuple[npt.NDArray[np.float32], npt.NDArray[np.int64],
+                 npt.NDArray[np.int64]]
+
+STL_RECORD = np.dtype([("normal", "<f4", 3),
+                       ("vertices", "<f4", (3, 3)),
+                       ("attributes", "<u2")])
+
+PLY_TYPES = {
+    "char": "i1", "int8": "i1", "uchar": "u1", "uint8": "u1",
+    "short": "i2", "int16": "i2", "ushort": "u2", "uint16": "u2",
+    "int": "i4", "int32": "i4", "uint": "u4", "uint32": "u4",
+    "float": "f4", "float32": "f4", "double": "f8", "float64": "f8",
+}
+
+
+def empty_mesh() -> MeshData:
+    return (np.zeros((0, 3), dtype=np.float32),
+            np.zeros((0, 2), dtype=np.int64),
+            np.zeros((0, 3), dtype=np.int64))
+
+
+def fan_triangulate(polygons: npt.NDArray[np.int64]) -> npt.NDArray[np.int64]:
+    """Разбивает выпуклые многоугольники (F x k) на треугольники веером"""
+    k = polygons.shape[1]
+    if k == 3:
+        return polygons
+    fans = [polygons[:, [0, i, i + 1]] for i in range(1, k - 1)]
+    return np.stack(fans, axis=1).reshape(-1, 3)
+
+
+def _parse_rows(lines: list[str], dtype) \
+        -> list[tuple[npt.NDArray[np.int64], np.ndarray]]:
+    """
+        Разбирает строки чисел. Строки группируются по количеству чисел,
+         каждая группа разбирается одним вызовом numpy. Для группы
+         возвращаются и номера её строк в lines.
+    """
+    if not lines:
+        return []
+    text = re.sub(r"[ \t]+", " ", "\n".join(lines))
+    text = re.sub(r" ?\n ?", "\n", text).strip(" ")
+
+    # Количество чисел в строке = количество пробелов в ней + 1
+    chars = np.frombuffer(text.encode("ascii"), dtype=np.uint8)
+    line_ends = np.append(np.flatnonzero(chars == ord("\n")), len(chars))
+    spaces = np.flatnonzero(chars == ord(" "))
+    widths = np.diff(np.searchsorted(spaces, line_ends), prepend=0) + 1
+
+    if np.all(widths == widths[0]):
+        return [(np.arange(len(widths)),
+                 np.fromstring(text, dtype=dtype, sep=" ").reshape(
+                     len(widths), widths[0]))]
+
+    lines = text.split("\n")
+    groups = []
+    for width in np.unique(widths):
+        indices = np.flatnonzero(widths == width)
+        group = "\n".join(lines[i] for i in indices)
+        groups.append((indices, np.fromstring(group, dtype=dtype,
+                                              sep=" ").reshape(-1, width)))
+    return groups
+
+
+def _obj_indices(rows: np.ndarray, vertex_counts: np.ndarray,
+                 total: int) -> np.ndarray:
+    """
+        Переводит индексы obj (с единицы, отрицательные - от последней
+         вершины, прочитанной до строки) в индексы с нуля.
+        vertex_counts - число вершин перед каждой строкой rows, total -
+         число вершин в файле.
+    """
+    indices = np.where(rows < 0, rows + vertex_counts[:, None], rows - 1)
+    if np.any((indices < 0) | (indices >= total)):
+        raise ValueError("Vertex index out of range")
+    return indices
+
+
+def _obj_elements(lines: list[str], vertex_counts: list[int],
+                  total: int) -> list[np.ndarray]:
+    vertex_counts = np.array(vertex_counts, dtype=np.int64)
+    return [_obj_indices(rows, vertex_counts[indices], total)
+            for indices, rows in _parse_rows(lines, np.int64)]
+
+
+def read_obj(file_name: str) -> MeshData:
+    with open(file_name, "r") as file:
+        lines = file.read().splitlines()
+
+    vertex_lines, face_lines, line_lines = [], [], []
+    face_counts, line_counts = [], []
+    for line in lines:
+        parts = line.split(None, 1)
+        if len(parts) < 2:
+            continue
+        keyword, rest = parts
+        if keyword == "v":
+            vertex_lines.append(rest)
+        elif keyword == "f":
+            face_lines.append(rest)
+            face_counts.append(len(vertex_lines))
+        elif keyword == "l":
+            line_lines.append(rest)
+            line_counts.append(len(vertex_lines))
+
+    positions, edges, triangles = empty_mesh()
+    vertex_rows = _parse_rows(vertex_lines, np.float64)
+    if vertex_rows:
+        if len(vertex_rows) > 1:
+            raise ValueError("Vertices with different number of coordinates")
+        positions = vertex_rows[0][1][:, :3].astype(np.float32)
+
+    # Отбрасываем ссылки на текстурные координаты и нормали: "1/2/3" -> "1"
+    if face_lines:
+        face_lines = re.sub(r"/\S*", "", "\n".join(face_lines)).split("\n")
+    polygons = _obj_elements(face_lines, face_counts, len(positions))
+    if polygons:
+        triangles = np.concatenate([fan_triangulate(rows)
+                                    for rows in polygons])
+
+    polylines = _obj_elements(line_lines, line_counts, len(positions))
+    if polylines:
+        edges = np.concatenate([
+            np.stack([rows[:, :-1], rows[:, 1:]], axis=2).reshape(-1, 2)
+            for rows in polylines])
+
+    return positions, edges, triangles
+
+
+def write_obj(file_name: str, positions, edges, triangles):
+    with open(file_name, "w") as file:
+        file.write("# 3D Editor\n")
+        np.savetxt(file, positions, fmt="v %.6f %.6f %.6f")
+        np.savetxt(file, np.asarray(triangles) + 1, fmt="f %d %d %d")
+        np.savetxt(file, np.asarray(edges) + 1, fmt="l %d %d")
+
+
+def read_stl(file_name: str) -> MeshData:
+    """Читает бинарный STL. Совпадающие вершины треугольников объединяются"""
+    with open(file_name, "rb") as file:
+        data = file.read()
+
+    if len(data) < 84:
+        raise ValueError("Only binary STL is supported")
+    count = int(np.frombuffer(data, "<u4", 1, 80)[0])
+    if 84 + count * STL_RECORD.itemsize != len(data):
+        raise ValueError("Only binary STL is supported")
+
+    records = np.frombuffer(data, STL_RECORD, count, 84)
+    vertices = records["vertices"].reshape(-1, 3)
+    positions, inverse = np.unique(vertices, axis=0, return_inverse=True)
+    triangles = inverse.reshape(-1, 3).astype(np.int64)
+    return positions.astype(np.float32), empty_mesh()[1], triangles
+
+
+def triangle_normals(positions, triangles) -> npt.NDArray[np.float32]:
+    corners = np.asarray(positions, dtype=np.float32)[triangles]
+    normals = np.cross(corners[:, 1] - corners[:, 0],
+                       corners[:, 2] - corners[:, 0])
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    return np.divide(normals, lengths, out=np.zeros_like(normals),
+                     where=lengths > 0)
+
+
+def write_stl(file_name: str, positions, edges, triangles):
+    triangles = np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+    records = np.zeros(len(triangles), dtype=STL_RECORD)
+    records["normal"] = triangle_normals(positions, triangles)
+    records["vertices"] = np.asarray(positions, dtype=np.float32)[triangles]
+
+    with open(file_name, "wb") as file:
+        file.write(b"3D Editor".ljust(80, b" "))
+        file.write(np.array([len(records)], dtype="<u4").tobytes())
+        file.write(records.tobytes())
+
+
+def _read_ply_header(data: bytes):
+    end = data.find(b"end_header")
+    if not data.startswith(b"ply") or end < 0:
+        raise ValueError("Not a PLY file")
+    body_offset = data.index(b"\n", end) + 1
+
+    byte_order = None
+    elements = []
+    for line in data[:end].decode("ascii").splitlines():
+        words = line.split()
+        if not words:
+            continue
+        if words[0] == "format":
+            if words[1] == "binary_little_endian":
+                byte_order = "<"
+            elif words[1] == "binary_big_endian":
+                byte_order = ">"
+            else:
+                raise ValueError("Only binary PLY is supported")
+        elif words[0] == "element":
+            elements.append((words[1], int(words[2]), []))
+        elif words[0] == "property":
+            if words[1] == "list":
+                elements[-1][2].append(
+                    (words[4], PLY_TYPES[words[2]], PLY_TYPES[words[3]]))
+            else:
+                elements[-1][2].append((words[2], PLY_TYPES[words[1]], None))
+
+    if byte_order is None:
+        raise ValueError("PLY format is not specified")
+    return byte_order, elements, body_offset
+
+
+def _read_ply_element(data, offset, byte_order, count, properties):
+    """Читает элемент PLY. Если у всех списков одинаковая длина, элемент
+     читается одним вызовом frombuffer. Возвращает массив и новое смещение"""
+    fields = []
+    probe = offset
+    for name, value_type, item_type in properties:
+        if item_type is None:
+            fields.append((name, byte_order + value_type))
+            probe += np.dtype(value_type).itemsize
+            continue
+        length = int(np.frombuffer(data, byte_order + value_type, 1, probe)[0]) \
+            if count else 0
+        fields.append((name + "_count", byte_order + value_type))
+        fields.append((name, byte_order + item_type, (length,)))
+        probe += np.dtype(value_type).itemsize + \
+            length * np.dtype(item_type).itemsize
+
+    dtype = np.dtype(fields)
+    if offset + count * dtype.itemsize <= len(data):
+        rows = np.frombuffer(data, dtype, count, offset)
+        uniform = all(np.all(rows[name + "_count"] == rows[name].shape[1])
+                      for name, _, item_type in properties
+                      if item_type is not None)
+        if uniform:
+            return rows, offset + count * dtype.itemsize
+
+    if len(properties) != 1:
+        raise ValueError("Unsupported PLY element layout")
+
+    # Многоугольники разной длины: разбираем построчно и группируем по длине
+    name, value_type, item_type = properties[0]
+    count_type = np.dtype(byte_order + value_type)
+    item_type = np.dtype(byte_order + item_type)
+    groups = {}
+    for _ in range(count):
+        length = int(np.frombuffer(data, count_type, 1, offset)[0])
+        offset += count_type.itemsize
+        groups.setdefault(length, []).append(
+            np.frombuffer(data, item_type, length, offset))
+        offset += length * item_type.itemsize
+    return {name: [np.array(group) for group in groups.values()]}, offset
+
+
+def read_ply(file_name: str) -> MeshData:
+    with open(file_name, "rb") as file:
+        data = file.read()
+
+    byte_order, elements, offset = _read_ply_header(data)
+    positions, edges, triangles = empty_mesh()
+    polygons = []
+    for name, count, properties in elements:
+        rows, offset = _read_ply_element(data, offset, byte_order, count,
+                                         properties)
+        if name == "vertex":
+            positions = np.stack([rows["x"], rows["y"], rows["z"]],
+                                 axis=1).astype(np.float32)
+        elif name == "face":
+            key = "vertex_indices" if "vertex_indices" in \
+                                      [p[0] for p in properties] \
+                else "vertex_index"
+            groups = rows[key]
+            polygons.extend(groups if isinstance(groups, list) else [groups])
+        elif name == "edge":
+            edges = np.stack([rows["vertex1"], rows["vertex2"]],
+                             axis=1).astype(np.int64)
+
+    polygons = [fan_triangulate(group.astype(np.int64))
+                for group in polygons if len(group)]
+    if polygons:
+        triangles = np.concatenate(polygons)
+    return positions, edges, triangles
+
+
+def write_ply(file_name: str, positions, edges, triangles):
+    positions = np.asarray(positions, dtype="<f4").reshape(-1, 3)
+    triangles = np.asarray(triangles).reshape(-1, 3)
+    edges = np.asarray(edges).reshape(-1, 2)
+
+    faces = np.zeros(len(triangles), dtype=[("count", "u1"),
+                                            ("indices", "<i4", (3,))])
+    faces["count"] = 3
+    faces["indices"] = triangles
+
+    header = "\n".join([
+        "ply",
+        "format binary_little_endian 1.0",
+        "comment 3D Editor",
+        f"element vertex {len(positions)}",
+        "property float x",
+        "property float y",
+        "property float z",
+        f"element face {len(triangles)}",
+        "property list uchar int vertex_indices",
+        f"element edge {len(edges)}",
+        "property int vertex1",
+        "property int vertex2",
+        "end_header",
+    ]) + "\n"
+
+    with open(file_name, "wb") as file:
+        file.write(header.encode("ascii"))
+        file.write(positions.tobytes())
+        file.write(faces.tobytes())
+        file.write(edges.astype("<i4").tobytes())
+
+
+READERS = {".obj": read_obj, ".stl": read_stl, ".ply": read_ply}
+WRITERS = {".obj": write_obj, ".stl": write_stl, ".ply": write_ply}
+
+
+def _extension(file_name: str, formats) -> str:
+    extension = os.path.splitext(file_name)[1].lower()
+    if extension not in formats:
+        raise ValueError(f"Unsupported mesh format {extension}")
+    return extension
+
+
+def read_mesh(file_name: str) -> MeshData:
+    return READERS[_extension(file_name, READERS)](file_name)
+
+
+def write_mesh(file_name: str, positions, edges, triangles):
+    WRITERS[_extension(file_name, WRITERS)](file_name, positions, edges,
+                                            triangles)
+
+
+def extract_mesh(scene_objects: Iterable[SceneObject]) -> MeshData:
+    """
+        Собирает точки, рёбра и грани в массивы прямо из PointStore.
+        Рёбра, лежащие на гранях, не выгружаются: при импорте они
+         восстанавливаются по граням.
+    """
+    point_handles = []
+    edge_handles = []
+    face_handles = []
+    for obj in scene_objects:
+        if isinstance(obj, ScenePoint):
+            point_handles.append(obj.point.handle)
+        elif isinstance(obj, SceneEdge):
+            edge_handles.append((obj.edge.point1.handle,
+                                 obj.edge.point2.handle))
+        elif isinstance(obj, SceneFace):
+            face_handles.append((obj.face.point1.handle,
+                                 obj.face.point2.handle,
+                                 obj.face.point3.handle))
+
+    point_handles = np.array(point_handles, dtype=np.int64)
+    edge_handles = np.array(edge_handles, dtype=np.int64).reshape(-1, 2)
+    face_handles = np.array(face_handles, dtype=np.int64).reshape(-1, 3)
+
+    all_handles = np.concatenate([point_handles, face_handles.ravel(),
+                                  edge_handles.ravel()])
+    handles, first, inverse = np.unique(all_handles, return_index=True,
+                                        return_inverse=True)
+    # Вершины идут в порядке первого появления
+    order = np.argsort(first, kind="stable")
+    rank = np.empty(len(order), dtype=np.int64)
+    rank[order] = np.arange(len(order))
+    indices = rank[inverse]
+
+    face_start = len(point_handles)
+    edge_start = face_start + face_handles.size
+    triangles = indices[face_start:edge_start].reshape(-1, 3)
+    edges = indices[edge_start:].reshape(-1, 2)
+
+    vertex_count = max(len(handles), 1)
+    face_edges = np.sort(triangles[:, [0, 1, 1, 2, 2, 0]].reshape(-1, 2),
+                         axis=1)
+    sorted_edges = np.sort(edges, axis=1)
+    on_face = np.isin(sorted_edges[:, 0] * vertex_count + sorted_edges[:, 1],
+                      face_edges[:, 0] * vertex_count + face_edges[:, 1])
+
+    positions = Point.STORE.get_positions(handles[order])
+    return positions, edges[~on_face], triangles
+
+
+def weld_mesh(positions, edges, triangles,
+              tolerance: float = WELD_TOLERANCE) -> MeshData:
+    """Объединяет близкие вершины и переписывает на них рёбра и грани.
+     Вырожденные и повторяющиеся рёбра и грани отбрасывает MeshBatch."""
+    kept, remap = weld_positions(positions, tolerance)
+    return (np.asarray(positions, dtype=np.float32)[kept],
+            remap[np.asarray(edges, dtype=np.int64)],
+            remap[np.asarray(triangles, dtype=np.int64)])
+
+
+def import_mesh(scene: Scene, file_name: str,
+                weld: bool = False) -> list[SceneObject]:
+    positions, edges, triangles = read_mesh(file_name)
+    if weld:
+        positions, edges, triangles = weld_mesh(positions, edges, triangles)
+    batch = MeshBatch()
+    batch.add_points(positions)
+    batch.add_edges(edges)
+    batch.add_triangles(triangles)
+    return batch.add_to(scene)
+
+
+def export_mesh(scene: Scene, file_name: str,
+                scene_objects: Optional[Iterable[SceneObject]] = None):
+    if scene_objects is None:
+        scene_objects = scene.objects
+    write_mesh(file_name, *extract_mesh(scene_objects))
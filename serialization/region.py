@@ -0,0 +1,77 @@
+from typing import Iterable, Optional
+
+import glm
+
+Region = tuple[glm.vec3, glm.vec3]
+Bounds = Optional[list[float]]
+
+
+def intersects(bounds: Bounds, region: Region) -> bool:
+    """Пересекается ли параллелепипед [min_xyz, max_xyz] с областью.
+     Неограниченные объекты (прямые и плоскости) пересекают всё."""
+    if bounds is None:
+        return True
+    low, high = region
+    return (bounds[0] <= high.x and low.x <= bounds[3] and
+            bounds[1] <= high.y and low.y <= bounds[4] and
+            bounds[2] <= high.z and low.z <= bounds[5])
+
+
+def bounds_to_list(box: Optional[tuple[glm.vec3, glm.vec3]]) -> Bounds:
+    if box is None:
+        return None
+    low, high = box
+    return [low.x, low.y, low.z, high.x, high.y, high.z]
+
+
+def forming_ids(obj_data: dict) -> list[str]:
+    """Возвращает id образующих объектов по декодированному словарю json"""
+    if obj_data["type"] == "point":
+        return []
+    return obj_data["forming objects"]
+
+
+def raw_bounds(obj_id: str, data: dict, cache: dict) -> Bounds:
+    """Вычисляет ограничивающий параллелепипед объекта по декодированному
+     словарю json, не создавая сами объекты"""
+    if obj_id in cache:
+        return cache[obj_id]
+
+    obj_data = data[obj_id]
+    obj_type = obj_data["type"]
+    result = None
+    if obj_type == "point":
+        result = list(obj_data["forming objects"][:3]) * 2
+    elif obj_type in ("segment", "triangle"):
+        boxes = [raw_bounds(req_id, data, cache)
+                 for req_id in obj_data["forming objects"]]
+        result = [min(box[i] for box in boxes) for i in range(3)] + \
+                 [max(box[i] for box in boxes) for i in range(3, 6)]
+
+    cache[obj_id] = result
+    return result
+
+
+def collect_dependencies(obj_ids: Iterable[str], data: dict, known,
+                         removed=frozenset()) -> list[str]:
+    """Возвращает ещё не созданные объекты вместе с их образующими в порядке,
+     при котором образующие идут раньше зависимых.
+     Объекты, зависящие от удалённых, пропускаются."""
+    result = {}
+    rejected = set()
+
+    def visit(obj_id) -> bool:
+        if obj_id in known or obj_id in result:
+            return True
+        if obj_id in rejected or obj_id in removed or obj_id not in data:
+            rejected.add(obj_id)
+            return False
+        if not all(visit(req_id) for req_id in forming_ids(data[obj_id])):
+            rejected.add(obj_id)
+            return False
+        result[obj_id] = None
+        return True
+
+    for obj_id in obj_ids:
+        visit(obj_id)
+    return list(result)
@@ -0,0 +1,99 @@
+import glm
+
+from scene.render_geometry import create_scene_object
+from scene.scene import Scene
+from scene.scene_diff import SceneDiff, ADDED, REMOVED, MOVED, RENAMED
+from serialization.generator_of_decoding_objects import \
+    generate_object_by_deserialized_data
+
+
+def _vec_to_list(vec) -> list[float]:
+    return [vec.x, vec.y, vec.z]
+
+
+def diff_to_dict(diff: SceneDiff) -> dict:
+    """Переводит изменение сцены в словарь, пригодный для json"""
+    changes = []
+    for change in diff.changes:
+        kind = change[0]
+        if kind in (ADDED, REMOVED):
+            objects = {}
+            parents = {}
+            for obj in change[1]:
+                objects.update(obj.primitive.get_serializing_dict())
+                parents[obj.id] = [parent.id for parent in obj.parents]
+            changes.append({"kind": kind, "objects": objects,
+                            "parents": parents})
+        elif kind == MOVED:
+            changes.append({"kind": kind, "points": {
+                point.id: [_vec_to_list(old), _vec_to_list(new)]
+                for point, (old, new) in change[1].items()}})
+        elif kind == RENAMED:
+            _, obj, old_name, new_name = change
+            changes.append({"kind": kind, "id": obj.id,
+                            "names": [old_name, new_name]})
+    return {"changes": changes}
+
+
+def diff_from_dict(data: dict, scene: Scene) -> SceneDiff:
+    """
+        Восстанавливает изменение по словарю для применения к scene.
+        Объекты, которых нет в сцене, создаются в удалённом состоянии:
+         их добавит apply или revert.
+    """
+    known = {}
+
+    def find(obj_id):
+        obj = known.get(obj_id, None)
+        return obj if obj is not None else scene.get_object(obj_id)
+
+    diff = SceneDiff()
+    for change in data["changes"]:
+        kind = change["kind"]
+        if kind in (ADDED, REMOVED):
+            objects = _resolve_objects(change, find, known)
+            if kind == ADDED:
+                diff.record_added(objects)
+            else:
+                diff.record_removed(objects)
+        elif kind == MOVED:
+            diff.record_moved({
+                find(obj_id): (glm.vec3(*old), glm.vec3(*new))
+                for obj_id, (old, new) in change["points"].items()})
+        elif kind == RENAMED:
+            diff.record_renamed(find(change["id"]), *change["names"])
+    return diff
+
+
+def _resolve_objects(change: dict, find, known: dict):
+    object_data = change["objects"]
+    primitives = {}
+    for obj_id in object_data:
+        obj = find(obj_id)
+        if obj is not None:
+            primitives[obj_id] = obj.primitive
+
+    def add_existing(req_id):
+        if req_id not in object_data and req_id not in primitives:
+            primitives[req_id] = find(req_id).primitive
+
+    created = []
+    for obj_id, obj_data in object_data.items():
+        if obj_data["type"] != "point":
+            for req_id in obj_data["forming objects"]:
+                add_existing(req_id)
+        if find(obj_id) is None:
+            generate_object_by_deserialized_data(obj_id, object_data,
+                                                 primitives)
+            scene_object = create_scene_object(primitives[obj_id])
+            if scene_object is not None:
+                known[obj_id] = scene_object
+                created.append(scene_object)
+
+    for scene_object in created:
+        scene_object.add_parents(*(find(parent_id) for parent_id in
+                                   change["parents"][scene_object.id]))
+    for scene_object in created:
+        scene_object.on_delete()
+
+    return [find(obj_id) for obj_id in object_data if find(obj_id)]
@@ -1,4 +1,5 @@
 import json
+from typing import Optional
 
 import glm
 
@@ -7,6 +8,9 @@ from scene.scene import Scene
 from scene.scene_object import SceneObject
 from serialization.generator_of_decoding_objects import \
     generate_object_by_deserialized_data
+from serialization.region import Region, intersects, raw_bounds, \
+    collect_dependencies
+from serialization.weld import weld_scene_data
 
 
 def extract_camera_settings(camera: Camera):
@@ -21,9 +25,7 @@ def extract_camera_settings(camera: Camera):
 def inject_camera_settings(camera: Camera, settings: dict[str, str]):
     pos = glm.vec3(*[float(value) for value in settings["translation"].split()])
     rot = glm.quat(*[float(value) for value in settings["rotation"].split()])
-    glm.vec2()
-    camera.translation = pos
-    camera.rotation = rot
+    camera.set(translation=pos, rotation=rot)
 
 
 def extract_children(destination, scene_object):
@@ -38,6 +40,7 @@ def serialize_scene(scene: Scene, file_name: str):
     serialized_objects = {}
     children = {}
 
+    scene.update_plane_cuts()
     for obj in scene.objects:
         extract_children(children, obj)
         primitive = obj.primitive
@@ -57,8 +60,13 @@ def serialize_scene(scene: Scene, file_name: str):
     with open(file_name, "w") as file:
         json.dump(data, file)
 
-def deserialize_scene(file_name: str) -> (
+
+def deserialize_scene(file_name: str, region: Optional[Region] = None,
+                      weld: bool = False) -> (
         dict[str, str], dict[str, SceneObject]):
+    """Загружает сцену. Если задана область, создаются только объекты,
+     пересекающие её, и их образующие. Если weld, совпадающие точки
+     свариваются до создания объектов"""
     with open(file_name, "r") as file:
         data = json.load(file)
 
@@ -67,8 +75,25 @@ def deserialize_scene(file_name: str) -> (
     camera_settings = data["camera"]
     object_data = data["objects"]
     children_data = data["children"]
-
-    for obj_id in object_data:
+    if weld:
+        weld_scene_data(object_data, children_data)
+
+    obj_ids = object_data
+    if region is not None:
+        bounds = {}
+        obj_ids = collect_dependencies(
+            [obj_id for obj_id in object_data
+             if intersects(raw_bounds(obj_id, object_data, bounds), region)],
+            object_data, objects)
+
+    for obj_id in obj_ids:
         generate_object_by_deserialized_data(obj_id, object_data, objects)
 
+    if region is not None:
+        children_data = {
+            parent_id: [child_id for child_id in child_ids
+                        if child_id in objects]
+            for parent_id, child_ids in children_data.items()
+            if parent_id in objects}
+
     return camera_settings, objects, children_data
@@ -0,0 +1,78 @@
+import numpy as np
+
+from core.weld import WELD_TOLERANCE, weld_positions
+from serialization.region import collect_dependencies, forming_ids
+
+# Объекты, которые не зависят от порядка образующих точек
+_UNORDERED_TYPES = ("segment", "triangle")
+
+
+def weld_scene_data(data: dict, children_data: dict,
+                    tolerance: float = WELD_TOLERANCE) -> set[str]:
+    """
+        Сваривает совпадающие точки в декодированном словаре json.
+        Ссылки на объединённые точки заменяются оставшимися, после чего
+         повторяющиеся объекты объединяются, а вырожденные (с совпавшими
+         образующими) удаляются вместе с зависящими от них.
+        Изменяет data и children_data на месте, возвращает id выброшенных
+         объектов.
+    """
+    point_ids = [obj_id for obj_id, obj_data in data.items()
+                 if obj_data["type"] == "point"]
+    if not point_ids:
+        return set()
+
+    positions = np.array([data[obj_id]["forming objects"][:3]
+                          for obj_id in point_ids], dtype=np.float64)
+    kept, remap = weld_positions(positions, tolerance)
+    replaced = {obj_id: point_ids[kept[new_index]]
+                for obj_id, new_index in zip(point_ids, remap.tolist())
+                if point_ids[kept[new_index]] != obj_id}
+    removed = set()
+
+    by_forming = {}
+    for obj_id in collect_dependencies(data, data, {}):
+        obj_data = data[obj_id]
+        if obj_data["type"] == "point":
+            continue
+        forming = forming_ids(obj_data)
+        if any(req_id in removed for req_id in forming):
+            removed.add(obj_id)
+            continue
+        forming = [replaced.get(req_id, req_id) for req_id in forming]
+        if len(set(forming)) != len(forming):
+            removed.add(obj_id)
+            continue
+        obj_data["forming objects"] = forming
+
+        key = (obj_data["type"], frozenset(forming)
+               if obj_data["type"] in _UNORDERED_TYPES else tuple(forming))
+        if key in by_forming:
+            replaced[obj_id] = by_forming[key]
+        else:
+            by_forming[key] = obj_id
+
+    dropped = removed | set(replaced)
+    _weld_children(children_data, replaced, removed)
+    for obj_id in dropped:
+        del data[obj_id]
+    return dropped
+
+
+def _weld_children(children_data: dict, replaced: dict, removed: set):
+    welded = {}
+    for parent_id, child_ids in children_data.items():
+        if parent_id in removed:
+            continue
+        parent_id = replaced.get(parent_id, parent_id)
+        children = welded.setdefault(parent_id, {})
+        for child_id in child_ids:
+            if child_id in removed:
+                continue
+            child_id = replaced.get(child_id, child_id)
+            if child_id != parent_id:
+                children[child_id] = None
+
+    children_data.clear()
+    children_data.update((parent_id, list(children))
+                         for parent_id, children in welded.items())
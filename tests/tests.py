@@ -1,12 +1,36 @@
+import json
+import os
+import tempfile
 import unittest
 
+import numpy as np
+
 from PyQt5 import QtCore
 
+from core import batch_helpers, generators, helpers, intersections, \
+    measurements, parametric, triangulation
+from core.point_store import PointStore
+from core.weld import weld_positions
 from interaction.geometry_builders import *
 from render.shared_vbo import MeshProvider
 from scene.render_geometry import *
+from scene.measurements import MeasurementEngine
+from scene.mesh_batch import MeshBatch
+from scene.plane_slice import slice_by_plane
+from scene.point_meshes import hull_from_points, triangulate_points
 from scene.scene import Scene
+from scene.dependency_graph import DependencyGraph
+from scene.move_engine import MoveEngine
+from scene.scene_diff import SceneDiff, UndoStack
+from scene.subdivision import split_edges
 from scene.transform import Transform
+from scene.validation import validate_scene, repair_scene
+from serialization.compressed import serialize_scene_compressed, \
+    deserialize_scene_compressed, is_compressed_scene, SceneStreamer
+from serialization.mesh_io import read_mesh, write_mesh, import_mesh, \
+    export_mesh, weld_mesh
+from serialization.scene_patch import diff_to_dict, diff_from_dict
+from serialization.serialize import serialize_scene, deserialize_scene
 
 
 class TestMesh:
@@ -44,6 +68,78 @@ def shift_mods():
     return QtCore.Qt.ShiftModifier
 
 
+class BatchHelpersTests(unittest.TestCase):
+    def setUp(self):
+        self.rng = np.random.default_rng(7)
+
+    def vecs(self, count, dim=3):
+        return self.rng.uniform(-2, 2, (count, dim))
+
+    def assert_matches(self, batch, scalar):
+        scalar = np.array(scalar, dtype=np.float64)
+        self.assertEqual(batch.shape, scalar.shape)
+        self.assertTrue(np.array_equal(np.isnan(batch), np.isnan(scalar)))
+        mask = ~np.isnan(scalar)
+        self.assertTrue(np.allclose(batch[mask], scalar[mask], atol=1e-4))
+
+    def test_ray_triangles(self):
+        origins = self.vecs(20)
+        directions = -origins + self.rng.uniform(-0.5, 0.5, (20, 3))
+        triangles = self.vecs(15 * 3).reshape(15, 3, 3)
+        scalar = [[helpers.ray_triangle_intersection_distance(
+            glm.vec3(*o), glm.vec3(*d), *(glm.vec3(*p) for p in triangle))
+            for triangle in triangles] for o, d in zip(origins, directions)]
+        self.assert_matches(batch_helpers.ray_triangle_intersection_distances(
+            origins, directions, triangles), scalar)
+        self.assertTrue(np.any(~np.isnan(np.array(scalar))))
+
+    def test_ray_planes(self):
+        origins, directions = self.vecs(10), self.vecs(10)
+        points, norms = self.vecs(8), self.vecs(8)
+        scalar = [[helpers.ray_plane_intersection_distance(
+            glm.vec3(*o), glm.vec3(*d), glm.vec3(*p), glm.vec3(*n))
+            for p, n in zip(points, norms)] for o, d in zip(origins, directions)]
+        self.assert_matches(batch_helpers.ray_plane_intersection_distances(
+            origins, directions, points, norms), scalar)
+
+    def test_point_segments_and_lines(self):
+        points, s1, s2 = self.vecs(12, 2), self.vecs(9, 2), self.vecs(9, 2)
+        to_segments = [[helpers.point_to_segment_distance(
+            glm.vec2(*p), glm.vec2(*a), glm.vec2(*b)) for a, b in zip(s1, s2)]
+            for p in points]
+        to_lines = [[helpers.point_to_line_distance(
+            glm.vec2(*p), glm.vec2(*a), glm.vec2(*b)) for a, b in zip(s1, s2)]
+            for p in points]
+        self.assert_matches(
+            batch_helpers.point_to_segment_distances(points, s1, s2),
+            to_segments)
+        self.assert_matches(
+            batch_helpers.point_to_line_distances(points, s1, s2), to_lines)
+
+    def test_inside_polygon(self):
+        polygon = [(0, 0), (4, 0), (4, 4), (2, 1), (0, 4)]
+        points = self.rng.uniform(-1, 5, (50, 2))
+        scalar = [helpers.is_inside_polygon(
+            glm.vec2(*p), [glm.vec2(*v) for v in polygon]) for p in points]
+        self.assertEqual(
+            batch_helpers.is_inside_polygon(points, polygon).tolist(), scalar)
+
+    def test_line_line(self):
+        a1, a2, b1 = self.vecs(6), self.vecs(6), self.vecs(6)
+        # половина прямых b проходит через отрезок a, остальные скрещиваются
+        through = a1 + (a2 - a1) * 0.3
+        b2 = np.where(np.arange(6)[:, None] % 2 == 0,
+                      2 * through - b1, self.vecs(6))
+        for i in range(6):
+            scalar = helpers.line_line_intersection(
+                *(glm.vec3(*v[i]) for v in (a1, a2, b1, b2)))
+            batch = batch_helpers.line_line_intersections(a1, a2, b1, b2)[i]
+            if scalar is None:
+                self.assertTrue(np.all(np.isnan(batch)))
+            else:
+                self.assertTrue(np.allclose(batch, scalar, atol=1e-4))
+
+
 class IntersectionTests(unittest.TestCase):
     def test_ray_triangle(self):
         t1 = glm.vec3(1, 0, 0)
@@ -56,6 +152,100 @@ class IntersectionTests(unittest.TestCase):
         self.assertFalse(glm.isnan(intersection))
 
 
+class IntersectionEngineTests(unittest.TestCase):
+    def test_lines(self):
+        p1 = Point(glm.vec3(0, 0, 0))
+        p2 = Point(glm.vec3(2, 2, 1))
+        p3 = Point(glm.vec3(0, 2, 0.5))
+        p4 = Point(glm.vec3(2, 0, 0.5))
+        p5 = Point(glm.vec3(0, 0, 5))
+        line = LineBy2Points(p1, p2)
+        intersection = line.get_intersection_with_line(LineBy2Points(p3, p4))
+        self.assertTrue(almost_equal_vec(intersection, glm.vec3(1, 1, 0.5)))
+        # скрещивающиеся и параллельные прямые
+        self.assertIsNone(line.get_intersection_with_line(
+            LineBy2Points(p3, p5)))
+        self.assertIsNone(line.get_intersection_with_line(
+            LineByPointAndLine(p3, line)))
+
+    def test_segments(self):
+        p1 = Point(glm.vec3(0, 0, 0))
+        p2 = Point(glm.vec3(1, 0, 0))
+        p3 = Point(glm.vec3(2, -1, 0))
+        p4 = Point(glm.vec3(2, 1, 0))
+        p5 = Point(glm.vec3(1, 1, 0))
+        segment = Segment(p1, p2)
+        self.assertIsNone(segment.get_intersection_with_segment(
+            Segment(p3, p4)))
+        self.assertIsNone(segment.get_intersection_with_line(
+            LineBy2Points(p3, p4)))
+        self.assertTrue(almost_equal_vec(segment.get_intersection_with_line(
+            LineBy2Points(p3, Point(glm.vec3(0, 1, 0)))),
+            glm.vec3(1, 0, 0)))
+        # касание в конце отрезка
+        self.assertTrue(almost_equal_vec(
+            segment.get_intersection_with_segment(Segment(p2, p5)),
+            glm.vec3(1, 0, 0)))
+
+    def test_planes_and_triangles(self):
+        normal = glm.vec3(0, 0, 2)
+        self.assertTrue(almost_equal_vec(intersections.segment_plane(
+            glm.vec3(1, 1, -1), glm.vec3(1, 1, 3), normal, 2),
+            glm.vec3(1, 1, 1)))
+        self.assertIsNone(intersections.segment_plane(
+            glm.vec3(1, 1, 2), glm.vec3(1, 1, 3), normal, 2))
+        point, direction = intersections.plane_plane(
+            normal, 2, glm.vec3(1, 0, 0), 3)
+        self.assertTrue(almost_equal_vec(point, glm.vec3(3, 0, 1)))
+        self.assertTrue(almost_equal(abs(glm.normalize(direction).y), 1))
+        self.assertIsNone(intersections.plane_plane(
+            normal, 2, glm.vec3(0, 0, 1), 5))
+        triangle = glm.vec3(0, 0, 0), glm.vec3(2, 0, 0), glm.vec3(0, 2, 0)
+        self.assertTrue(almost_equal_vec(intersections.segment_triangle(
+            glm.vec3(0.5, 0.5, -1), glm.vec3(0.5, 0.5, 1), *triangle),
+            glm.vec3(0.5, 0.5, 0)))
+        self.assertIsNone(intersections.segment_triangle(
+            glm.vec3(0.5, 0.5, 1), glm.vec3(0.5, 0.5, 2), *triangle))
+
+    def test_broadphase_matches_brute_force(self):
+        rng = np.random.default_rng(3)
+        starts = rng.uniform(0, 20, (300, 3))
+        starts[:, 2] = 0
+        ends = starts + rng.uniform(-2, 2, (300, 3))
+        ends[:, 2] = 0
+        pairs, points = intersections.find_segment_intersections(starts, ends)
+
+        expected = {}
+        for i in range(len(starts)):
+            for j in range(i + 1, len(starts)):
+                point = intersections.segment_segment(
+                    *(glm.vec3(*v) for v in (starts[i], ends[i],
+                                             starts[j], ends[j])))
+                if point is not None:
+                    expected[i, j] = point
+        self.assertEqual(set(map(tuple, pairs.tolist())), set(expected))
+        for (i, j), point in zip(pairs.tolist(), points):
+            self.assertTrue(np.allclose(point, expected[i, j], atol=1e-4))
+
+    def test_broadphase_long_segments(self):
+        rng = np.random.default_rng(5)
+        starts = rng.uniform(0, 20, (400, 3))
+        ends = starts + rng.uniform(-1, 1, (400, 3))
+        long_starts = np.array([(0, 0, 0), (0, 0, 0), (20, 0, 0), (0, 20, 0)])
+        long_ends = np.array([(300, 300, 300), (300, 300, 300), (0, 20, 20),
+                              (20, 0, 20)])
+        starts = np.concatenate([starts, long_starts])
+        ends = np.concatenate([ends, long_ends])
+        lows, highs = np.minimum(starts, ends), np.maximum(starts, ends)
+
+        pairs = intersections.broadphase_pairs(lows, highs)
+        overlap = np.all((lows[:, None] <= highs[None]) &
+                         (lows[None] <= highs[:, None]), axis=2)
+        expected = {(i, j) for i, j in zip(*np.nonzero(np.triu(overlap, 1)))}
+        self.assertEqual(set(map(tuple, pairs.tolist())), expected)
+        self.assertIn((400, 401), expected)
+
+
 class TestMeshProvider(MeshProvider):
     def get_unique_mesh(self):
         return TestMesh()
@@ -193,6 +383,18 @@ class SceneObjectTests(unittest.TestCase):
         obj = ScenePoint(point)
         self.assertTrue(point.id == obj.id)
 
+    def test_handles(self):
+        point = ScenePoint(Point(glm.vec3(), id="point-id"))
+        other = ScenePoint(Point(glm.vec3(), id="point-id"))
+        self.assertNotEqual(point.handle, other.handle)
+        self.assertNotEqual(point, other)
+
+        scene = create_scene()
+        scene.add_object(point)
+        self.assertIs(scene.get_object("point-id"), point)
+        scene.remove_object(point)
+        self.assertIsNone(scene.get_object("point-id"))
+
     def test_same_name(self):
         point = Point(glm.vec3())
         obj = ScenePoint(point)
@@ -328,6 +530,779 @@ class SceneObjectTests(unittest.TestCase):
         self.assertTrue(point2 in list(point1.children))
 
 
+class SceneObjectSlotsTests(unittest.TestCase):
+    def setUp(self):
+        RawSceneObject.MESH_PROVIDER = TestMeshProvider()
+
+    def test_no_instance_dict(self):
+        p1 = ScenePoint.by_pos(glm.vec3(0, 0, 0))
+        p2 = ScenePoint.by_pos(glm.vec3(2, 0, 0))
+        edge = SceneEdge.by_two_points(p1, p2)
+        line = SceneLine.by_two_points(p1, p2)
+        for obj in (p1, edge, line, line.transform):
+            self.assertFalse(hasattr(obj, "__dict__"))
+        self.assertEqual(p1.selection_mask, SELECT_POINT)
+        self.assertEqual(edge.render_mode, GL.GL_LINES)
+
+    def test_derived_transform(self):
+        p1 = ScenePoint.by_pos(glm.vec3(0, 0, 0))
+        p2 = ScenePoint.by_pos(glm.vec3(2, 0, 0))
+        edge = SceneEdge.by_two_points(p1, p2)
+
+        MoveEngine.move_object(edge, glm.vec3(1, 1, 0))
+        self.assertEqual(p1.transform.translation, glm.vec3(0, 1, 0))
+        self.assertEqual(p2.point.pos, glm.vec3(2, 1, 0))
+        self.assertEqual(edge.transform.translation, glm.vec3(1, 1, 0))
+
+    def test_lazy_updated_event(self):
+        point = ScenePoint.by_pos(glm.vec3(0, 0, 0))
+        point.post_update()
+
+        updated = []
+        point.on_updated += updated.append
+        point.post_update()
+        self.assertEqual(updated, [point])
+
+
+class DerivedCacheTests(unittest.TestCase):
+    def test_plane_cache_follows_points(self):
+        p1 = Point(glm.vec3(0, 0, 0))
+        p2 = Point(glm.vec3(1, 0, 0))
+        p3 = Point(glm.vec3(0, 1, 0))
+        plane = PlaneBy3Points(p1, p2, p3)
+        child = PlaneByPointAndPlane(Point(glm.vec3(0, 0, 2)), plane)
+
+        normal = child.get_normal()
+        self.assertIs(child.get_normal(), normal)
+        self.assertAlmostEqual(child.get_offset(), 2 * normal.z)
+
+        p3.pos = glm.vec3(0, 0, 1)
+        self.assertEqual(abs(child.get_normal()), glm.vec3(0, 1, 0))
+        self.assertTrue(plane.is_collinear_to(child))
+
+    def test_line_cache_follows_points(self):
+        p1 = Point(glm.vec3(0, 0, 0))
+        p2 = Point(glm.vec3(1, 0, 0))
+        line = LineByPointAndLine(Point(glm.vec3(0, 1, 0)),
+                                  LineBy2Points(p1, p2))
+        self.assertEqual(line.get_directional_vector(), glm.vec3(1, 0, 0))
+
+        p2.pos = glm.vec3(0, 0, 2)
+        self.assertEqual(line.get_directional_vector(), glm.vec3(0, 0, 2))
+        self.assertEqual(line.get_pivot_points()[1], glm.vec3(0, 1, 2))
+
+
+class PlaneCutTests(unittest.TestCase):
+    def setUp(self):
+        RawSceneObject.MESH_PROVIDER = TestMeshProvider()
+
+    def create_cut_scene(self):
+        scene = create_scene()
+        plane_points = [ScenePoint.by_pos(glm.vec3(*pos)) for pos in
+                        ((0, 0, 0), (1, 0, 0), (0, 1, 0))]
+        low = ScenePoint.by_pos(glm.vec3(2, 2, -1))
+        high = ScenePoint.by_pos(glm.vec3(2, 2, 3))
+        side = ScenePoint.by_pos(glm.vec3(4, 2, 1))
+        plane = ScenePlane.by_three_points(*plane_points)
+        edge = SceneEdge.by_two_points(low, high)
+        above = SceneEdge.by_two_points(high, side)
+        face = SceneFace.by_three_points(low, high, side)
+        scene.add_objects(plane_points + [low, high, side, plane, edge, above,
+                                          face])
+        return scene, plane, edge, face, low, high
+
+    def get_cuts(self, plane):
+        return {cut.source: cut for cut in plane.primitive.cuts}
+
+    def test_cuts_are_computed(self):
+        scene, plane, edge, face, *_ = self.create_cut_scene()
+        scene.update_plane_cuts()
+        cuts = self.get_cuts(plane)
+
+        self.assertEqual(set(cuts), {edge.primitive, face.primitive})
+        self.assertTrue(cuts[edge.primitive].is_point())
+        self.assertTrue(almost_equal_vec(cuts[edge.primitive].start,
+                                         glm.vec3(2, 2, 0)))
+        face_cut = cuts[face.primitive]
+        self.assertEqual({tuple(face_cut.start), tuple(face_cut.end)},
+                         {(2, 2, 0), (3, 2, 0)})
+
+        data = json.loads(json.dumps(plane.primitive.get_serializing_dict()))
+        self.assertEqual(len(data[plane.id]["cuts"]), 2)
+
+    def test_cuts_follow_moves(self):
+        scene, plane, edge, face, low, high = self.create_cut_scene()
+        scene.update_plane_cuts()
+        scene.move_objects([low], glm.vec3(0, 0, 2))
+        scene.update_plane_cuts()
+        self.assertEqual(self.get_cuts(plane), {})
+
+        scene.move_objects([low, high], glm.vec3(0, 0, -2))
+        scene.update_plane_cuts()
+        self.assertTrue(almost_equal_vec(
+            self.get_cuts(plane)[edge.primitive].start, glm.vec3(2, 2, 0)))
+
+        scene.remove_object(face)
+        scene.update_plane_cuts()
+        self.assertEqual(set(self.get_cuts(plane)), {edge.primitive})
+
+    def test_cuts_follow_undo(self):
+        scene, plane, edge, face, low, high = self.create_cut_scene()
+        undo_stack = UndoStack(scene)
+        moves = []
+        scene.on_objects_moved += moves.append
+        scene.update_plane_cuts()
+        scene.move_objects([edge], glm.vec3(0, 0, 5))
+        scene.update_plane_cuts()
+        self.assertEqual(self.get_cuts(plane), {})
+
+        undo_stack.undo()
+        scene.update_plane_cuts()
+        self.assertEqual(set(self.get_cuts(plane)),
+                         {edge.primitive, face.primitive})
+        undo_stack.redo()
+        scene.update_plane_cuts()
+        self.assertEqual(self.get_cuts(plane), {})
+        self.assertEqual(len(moves), 3)
+        self.assertFalse(undo_stack.can_redo)
+
+
+class PlaneSliceTests(unittest.TestCase):
+    def setUp(self):
+        RawSceneObject.MESH_PROVIDER = TestMeshProvider()
+
+    def create_square(self, scene):
+        batch = MeshBatch()
+        batch.add_points([(0, 0, 0), (2, 0, 0), (2, 2, 0), (0, 2, 0)])
+        batch.add_triangles([(0, 1, 2), (0, 2, 3)])
+        return batch.add_to(scene)
+
+    def create_plane(self, scene, *points):
+        points = [ScenePoint.by_pos(glm.vec3(*pos)) for pos in points]
+        plane = ScenePlane.by_three_points(*points)
+        scene.add_objects(points + [plane])
+        return plane
+
+    def get_faces(self, scene):
+        return [obj for obj in scene.objects if isinstance(obj, SceneFace)]
+
+    def assert_sliced(self, scene, axis, value, area):
+        faces = self.get_faces(scene)
+        total = 0
+        for face in faces:
+            p1, p2, p3 = face.primitive.get_points()
+            coordinates = [p1[axis], p2[axis], p3[axis]]
+            self.assertTrue(max(coordinates) <= value + 1e-5 or
+                            min(coordinates) >= value - 1e-5)
+            normal = glm.cross(p2 - p1, p3 - p1)
+            self.assertGreater(normal.z, 0)
+            total += glm.length(normal) / 2
+        self.assertAlmostEqual(total, area, places=4)
+        return faces
+
+    def test_slice_square(self):
+        scene = create_scene()
+        square = self.create_square(scene)
+        plane = self.create_plane(scene, (1, 0, 0), (1, 1, 0), (1, 0, 1))
+        created = slice_by_plane(scene, plane, square[4:])
+
+        faces = self.assert_sliced(scene, 0, 1, 4)
+        self.assertEqual(len(faces), 6)
+        divisions = [obj for obj in created if isinstance(obj, ScenePoint)]
+        self.assertEqual(sorted((p.point.x, p.point.y) for p in divisions),
+                         [(1, 0), (1, 1), (1, 2)])
+        for face in faces:
+            self.assertEqual(len([p for p in face.parents
+                                  if isinstance(p, SceneEdge)]), 3)
+
+    def test_slice_spreads_to_neighbours(self):
+        scene = create_scene()
+        square = self.create_square(scene)
+        plane = self.create_plane(scene, (1, 0, 0), (1, 1, 0), (1, 0, 1))
+        first_face = [obj for obj in square if isinstance(obj, SceneFace)][0]
+        slice_by_plane(scene, plane, [first_face])
+        self.assertEqual(len(self.assert_sliced(scene, 0, 1, 4)), 6)
+
+    def test_slice_through_vertex(self):
+        scene = create_scene()
+        square = self.create_square(scene)
+        plane = self.create_plane(scene, (0, 0, 0), (2, 2, 0), (0, 0, 1))
+        slice_by_plane(scene, plane, square)
+        # диагональ лежит в плоскости, резать нечего
+        self.assertEqual(len(self.get_faces(scene)), 2)
+
+        plane = self.create_plane(scene, (0, 0, 0), (2, 1, 0), (0, 0, 1))
+        slice_by_plane(scene, plane, self.get_faces(scene))
+        self.assertEqual(len(self.get_faces(scene)), 3)
+
+
+class SubdivisionTests(unittest.TestCase):
+    def setUp(self):
+        RawSceneObject.MESH_PROVIDER = TestMeshProvider()
+
+    def create_square(self, scene):
+        batch = MeshBatch()
+        batch.add_points([(0, 0, 0), (2, 0, 0), (2, 2, 0), (0, 2, 0)])
+        batch.add_triangles([(0, 1, 2), (0, 2, 3)])
+        return batch.add_to(scene)
+
+    def assert_mesh(self, scene, points, edges, faces):
+        objects = list(scene.objects)
+        counts = [len([obj for obj in objects if isinstance(obj, cls)])
+                  for cls in (ScenePoint, SceneEdge, SceneFace)]
+        self.assertEqual(counts, [points, edges, faces])
+        area = 0
+        for face in filter(lambda obj: isinstance(obj, SceneFace), objects):
+            p1, p2, p3 = face.primitive.get_points()
+            normal = glm.cross(p2 - p1, p3 - p1)
+            self.assertGreater(normal.z, 0)
+            area += glm.length(normal) / 2
+            self.assertEqual(len([obj for obj in face.parents
+                                  if isinstance(obj, SceneEdge)]), 3)
+        self.assertAlmostEqual(area, 4, places=4)
+
+    def test_split_shared_edge(self):
+        scene = create_scene()
+        square = self.create_square(scene)
+        diagonal = SceneEdge.common_child(square[0], square[2])
+        created = split_edges(scene, [diagonal], [0.25])
+        self.assertTrue(almost_equal_vec(created[0].point.pos,
+                                         glm.vec3(0.5, 0.5, 0)))
+        self.assert_mesh(scene, 5, 8, 4)
+
+    def test_refine_all_edges(self):
+        scene = create_scene()
+        square = self.create_square(scene)
+        edges = [obj for obj in square if isinstance(obj, SceneEdge)]
+        split_edges(scene, edges)
+        self.assert_mesh(scene, 9, 16, 8)
+
+    def test_split_several_times(self):
+        scene = create_scene()
+        square = self.create_square(scene)
+        bottom = SceneEdge.common_child(square[0], square[1])
+        split_edges(scene, [bottom], times=2)
+        self.assert_mesh(scene, 7, 11, 5)
+
+
+class GeneratorTests(unittest.TestCase):
+    def assert_closed(self, mesh, volume):
+        positions, triangles = mesh
+        edges = triangles[:, [0, 1, 1, 2, 2, 0]].reshape(-1, 2)
+        directed, counts = np.unique(edges, axis=0, return_counts=True)
+        self.assertTrue(np.all(counts == 1))
+        reverse = np.unique(edges[:, ::-1], axis=0)
+        self.assertTrue(np.array_equal(directed, reverse))
+
+        p1, p2, p3 = (positions[triangles[:, k]].astype(np.float64)
+                      for k in range(3))
+        signed = np.einsum('nk,nk->n', p1, np.cross(p2, p3)).sum() / 6
+        self.assertAlmostEqual(signed, volume, delta=volume * 0.05)
+
+    def test_closed_primitives(self):
+        self.assert_closed(generators.sphere(2, 64, 32), 4 / 3 * np.pi * 8)
+        self.assert_closed(generators.cylinder(1, 3, 64, rows=3),
+                           np.pi * 3)
+        self.assert_closed(generators.torus(2, 0.5, 64, 32),
+                           2 * np.pi ** 2 * 2 * 0.25)
+        self.assert_closed(generators.box(glm.vec3(0), glm.vec3(1, 2, 3)), 6)
+
+    def test_counts(self):
+        positions, triangles = generators.sphere(1, 8, 4)
+        self.assertEqual(positions.shape, (8 * 3 + 2, 3))
+        self.assertEqual(len(triangles), 8 * 4 * 2 - 16)
+        positions, triangles = generators.grid(4, 2, 4, 2, glm.vec3(0, 1, 0))
+        self.assertEqual(positions.shape, (15, 3))
+        self.assertEqual(len(triangles), 16)
+        self.assertTrue(np.all(positions[:, 1] == 1))
+
+    def test_insert_into_scene(self):
+        RawSceneObject.MESH_PROVIDER = TestMeshProvider()
+        scene = create_scene()
+        batch = MeshBatch()
+        positions, triangles = generators.torus(2, 0.5, 8, 4)
+        batch.add_points(positions)
+        batch.add_triangles(triangles)
+        batch.add_to(scene)
+        objects = list(scene.objects)
+        counts = [len([obj for obj in objects if isinstance(obj, cls)])
+                  for cls in (ScenePoint, SceneEdge, SceneFace)]
+        self.assertEqual(counts, [32, 96, 64])
+        for face in filter(lambda obj: isinstance(obj, SceneFace), objects):
+            self.assertEqual(len(list(face.parents)), 6)
+
+
+class ParametricTests(unittest.TestCase):
+    def test_expression(self):
+        function = parametric.compile_expression('u', ' v', 'u * v + 1')
+        positions, triangles = parametric.sample_surface(
+            function, (0, 1), (0, 2), 3, 5)
+        self.assertEqual(positions.shape, (15, 3))
+        self.assertEqual(len(triangles), 16)
+        self.assertTrue(np.allclose(positions[-1], (1, 2, 3)))
+        p1, p2, p3 = (positions[triangles[:, k]] for k in range(3))
+        self.assertTrue(np.all(np.cross(p2 - p1, p3 - p1)[:, 2] > 0))
+        with self.assertRaises(NameError):
+            parametric.compile_expression('u', 'v', 'open')(
+                np.zeros(1), np.zeros(1))
+
+    def test_undefined_samples_dropped(self):
+        function = parametric.compile_expression('u', 'v',
+                                                 'sqrt(1 - u * u - v * v)')
+        positions, triangles = parametric.sample_surface(
+            function, (-1, 1), (-1, 1), 11, 11)
+        self.assertTrue(np.all(np.isfinite(positions)))
+        self.assertLess(len(positions), 121)
+        self.assertEqual(triangles.max(), len(positions) - 1)
+
+    def test_refinement_follows_curvature(self):
+        function = parametric.compile_expression('u', 'v',
+                                                 'exp(-100 * u * u)')
+        us, vs = parametric.refine_parameters(
+            function, np.linspace(-1, 1, 11), np.linspace(-1, 1, 11),
+            1e-3, 4)
+        self.assertEqual(len(vs), 11)
+        self.assertGreater(len(us), 11)
+        steps = np.diff(us)
+        self.assertLess(steps[np.argmin(np.abs(us[:-1]))], steps[0])
+
+    def test_constant_components(self):
+        for y, value in (('0', 0), ('pi', np.pi)):
+            function = parametric.compile_expression('u', y, 'v')
+            positions, triangles = parametric.sample_surface(
+                function, (-1, 1), (-1, 1), 4, 4, 1e-3)
+            self.assertEqual(positions.shape, (16, 3))
+            self.assertEqual(len(triangles), 18)
+            self.assertTrue(np.allclose(positions[:, 1], value))
+        positions = parametric.evaluate(lambda u, v: (u, 2, 1.5),
+                                        np.zeros((2, 3)), np.ones((2, 3)))
+        self.assertEqual(positions.shape, (2, 3, 3))
+        self.assertTrue(np.all(positions[..., 1:] == (2, 1.5)))
+
+
+class TriangulationTests(unittest.TestCase):
+    def setUp(self):
+        RawSceneObject.MESH_PROVIDER = TestMeshProvider()
+
+    def test_convex_hull(self):
+        points = np.random.default_rng(0).normal(size=(500, 3))
+        triangles = triangulation.convex_hull(points)
+        edges = triangles[:, [0, 1, 1, 2, 2, 0]].reshape(-1, 2)
+        self.assertTrue(np.array_equal(np.unique(edges, axis=0),
+                                       np.unique(edges[:, ::-1], axis=0)))
+        p1, p2, p3 = (points[triangles[:, k]] for k in range(3))
+        normals = np.cross(p2 - p1, p3 - p1)
+        offsets = np.einsum('nk,nk->n', normals, p1)
+        self.assertLess((points @ normals.T - offsets).max(), 1e-9)
+
+        cube = generators.box(glm.vec3(0), glm.vec3(1))[0]
+        inner = np.random.default_rng(1).uniform(0.1, 0.9, size=(50, 3))
+        triangles = triangulation.convex_hull(np.concatenate([cube, inner]))
+        self.assertEqual(len(triangles), 12)
+        self.assertTrue(np.all(triangles < 8))
+        self.assertEqual(len(triangulation.convex_hull(
+            np.random.default_rng(2).uniform(size=(20, 3)) * (1, 1, 0))), 0)
+
+    def test_delaunay(self):
+        points = np.random.default_rng(0).uniform(size=(200, 2))
+        triangles = triangulation.delaunay(points)
+        a, b, c = (points[triangles[:, k]] for k in range(3))
+        ab, ac = b - a, c - a
+        self.assertTrue(np.all(ab[:, 0] * ac[:, 1] - ab[:, 1] * ac[:, 0] > 0))
+        for triangle in triangles:
+            matrix = np.column_stack([points[triangle],
+                                      (points[triangle] ** 2).sum(axis=1),
+                                      np.ones(3)])
+            rest = np.column_stack([points, (points ** 2).sum(axis=1),
+                                    np.ones(len(points))])
+            inside = [np.linalg.det(np.vstack([matrix, row])) for row in
+                      np.delete(rest, triangle, axis=0)]
+            self.assertLessEqual(max(inside), 1e-12)
+
+        grid = np.stack(np.meshgrid(np.arange(6), np.arange(6)),
+                        axis=-1).reshape(-1, 2)
+        self.assertEqual(len(triangulation.delaunay(grid)), 50)
+
+    def test_scene_tools(self):
+        scene = create_scene()
+        positions, _ = generators.box(glm.vec3(0), glm.vec3(1))
+        points = [ScenePoint.by_pos(glm.vec3(*position))
+                  for position in positions.tolist()]
+        scene.add_objects(points)
+        created = hull_from_points(scene, points)
+        faces = [obj for obj in created if isinstance(obj, SceneFace)]
+        self.assertEqual(len(faces), 12)
+        self.assertEqual(len(created), 12 + 18)
+        self.assertEqual(hull_from_points(scene, points[:4] + points[:4]), [])
+
+        scene = create_scene()
+        positions, _ = generators.grid(2, 2, 3, 3)
+        points = [ScenePoint.by_pos(glm.vec3(*position))
+                  for position in positions.tolist()]
+        scene.add_objects(points)
+        created = triangulate_points(scene, points)
+        self.assertEqual(len([obj for obj in created
+                              if isinstance(obj, SceneFace)]), 18)
+
+
+class TopologyTests(unittest.TestCase):
+    def setUp(self):
+        RawSceneObject.MESH_PROVIDER = TestMeshProvider()
+
+    def test_queries(self):
+        scene = create_scene()
+        batch = MeshBatch()
+        batch.add_points([(0, 0, 0), (1, 0, 0), (1, 1, 0), (0, 1, 0)])
+        batch.add_triangles([(0, 1, 2), (0, 2, 3)])
+        created = batch.add_to(scene)
+        p0, p1, p2, p3 = created[:4]
+        topology = scene.topology
+
+        diagonal = topology.edge_between(p2, p0)
+        self.assertIs(diagonal, SceneEdge.common_child(p0, p2))
+        self.assertIsNone(topology.edge_between(p1, p3))
+        self.assertEqual(len(list(topology.edge_faces(diagonal))), 2)
+        self.assertEqual(len(list(topology.vertex_edges(p0))), 3)
+        self.assertEqual(len(list(topology.vertex_faces(p1))), 1)
+        face = topology.face_between(p3, p2, p0)
+        self.assertIs(face, SceneFace.common_child(p0, p2, p3))
+
+        scene.remove_object(diagonal)
+        self.assertIsNone(topology.edge_between(p0, p2))
+        self.assertEqual(list(topology.vertex_faces(p0)), [])
+        self.assertEqual(len(list(topology.vertex_edges(p0))), 2)
+
+    def test_undo_restores_index(self):
+        scene = create_scene()
+        undo_stack = UndoStack(scene)
+        p1, p2 = ScenePoint.by_pos(glm.vec3()), ScenePoint.by_pos(glm.vec3(1))
+        scene.add_objects([p1, p2])
+        edge = SceneEdge.by_two_points(p1, p2)
+        with undo_stack.group():
+            scene.add_object(edge)
+        undo_stack.undo()
+        self.assertIsNone(scene.topology.edge_between(p1, p2))
+        undo_stack.redo()
+        self.assertIs(scene.topology.edge_between(p1, p2), edge)
+
+
+class FindChildTests(unittest.TestCase):
+    def setUp(self):
+        RawSceneObject.MESH_PROVIDER = TestMeshProvider()
+
+    def test_find_child(self):
+        scene = create_scene()
+        hub = ScenePoint.by_pos(glm.vec3())
+        others = [ScenePoint.by_pos(glm.vec3(i, 1, 0)) for i in range(50)]
+        scene.add_objects([hub] + others)
+        scene.add_objects([SceneEdge.by_two_points(hub, other)
+                           for other in others])
+        line = SceneLine.by_two_points(others[1], hub)
+        plane = ScenePlane.by_three_points(hub, others[0], others[1])
+        scene.add_objects([line, plane])
+
+        self.assertIs(scene.find_child(SceneLine, hub, others[1]), line)
+        self.assertIsNone(scene.find_child(ScenePlane, hub, others[1]))
+        self.assertIs(scene.find_child(ScenePlane, others[1], hub,
+                                       others[0]), plane)
+        edge = scene.find_child(SceneEdge, others[7], hub)
+        self.assertIs(edge, SceneEdge.common_child(hub, others[7]))
+        self.assertIs(SceneLine.common_child(hub, others[1]), line)
+        self.assertIsNone(SceneLine.common_child(hub, others[2]))
+
+        scene.remove_object(line)
+        self.assertIsNone(scene.find_child(SceneLine, hub, others[1]))
+
+    def test_find_child_after_relink(self):
+        scene = create_scene()
+        points = [ScenePoint.by_pos(glm.vec3(i, i * i, 1)) for i in range(3)]
+        edge = SceneEdge.by_two_points(points[0], points[1])
+        other_edge = SceneEdge.by_two_points(points[1], points[2])
+        plane = ScenePlane.by_point_and_segment(points[2], edge)
+        scene.add_objects(points + [edge, other_edge, plane])
+        self.assertIs(scene.find_child(ScenePlane, points[2], edge), plane)
+
+        plane.remove_parents(edge)
+        plane.add_parents(other_edge)
+        self.assertIsNone(scene.find_child(ScenePlane, points[2], edge))
+        self.assertIs(scene.find_child(ScenePlane, points[2], other_edge),
+                      plane)
+
+
+class ValidationTests(unittest.TestCase):
+    def setUp(self):
+        RawSceneObject.MESH_PROVIDER = TestMeshProvider()
+
+    def create_mesh(self, scene):
+        batch = MeshBatch()
+        batch.add_points([(0, 0, 0), (1, 0, 0), (1, 1, 0), (0, 1, 0),
+                          (1, -1, 0)])
+        batch.add_triangles([(0, 1, 2), (0, 2, 3), (0, 1, 4)])
+        return batch.add_to(scene)
+
+    def test_clean_scene(self):
+        scene = create_scene()
+        self.create_mesh(scene)
+        self.assertTrue(validate_scene(scene).is_clean())
+
+    def test_geometry_problems(self):
+        scene = create_scene()
+        points = self.create_mesh(scene)[:5]
+        duplicate_edge = SceneEdge.by_two_points(points[2], points[0])
+        duplicate_face = SceneFace.by_three_points(points[2], points[3],
+                                                   points[0])
+        scene.add_objects([duplicate_edge, duplicate_face])
+        same = ScenePoint.by_pos(glm.vec3(0, 1, 0))
+        scene.add_object(same)
+        zero_edge = SceneEdge.by_two_points(same, points[3])
+        scene.add_object(zero_edge)
+        flat = ScenePoint.by_pos(glm.vec3(2, 0, 0))
+        scene.add_objects([flat, SceneFace.by_three_points(points[0],
+                                                           points[1], flat)])
+
+        report = validate_scene(scene)
+        self.assertEqual(len(report.degenerate_faces), 1)
+        self.assertEqual(report.zero_edges, [zero_edge])
+        self.assertEqual(len(report.duplicate_edges), 1)
+        self.assertEqual(report.duplicate_faces[0][0], duplicate_face)
+
+        kept_edge = report.duplicate_edges[0][1]
+        plane = ScenePlane.by_point_and_segment(points[4], duplicate_edge)
+        scene.add_object(plane)
+        repair_scene(scene, report)
+        self.assertTrue(plane.has_parent(kept_edge))
+        objects = list(scene.objects)
+        self.assertIn(plane, objects)
+        for obj in (duplicate_edge, duplicate_face, zero_edge):
+            self.assertNotIn(obj, objects)
+        self.assertEqual(len([obj for obj in objects
+                              if isinstance(obj, SceneFace)]), 3)
+        self.assertTrue(validate_scene(scene).is_clean())
+
+    def test_broken_links(self):
+        scene = create_scene()
+        points = self.create_mesh(scene)[:5]
+        edge = scene.find_child(SceneEdge, points[0], points[1])
+        points[0].remove_children(edge, silent=True)
+        outside = ScenePoint.by_pos(glm.vec3(5))
+        orphan = SceneEdge.by_two_points(outside, points[1])
+        scene.add_object(orphan)
+
+        report = validate_scene(scene)
+        self.assertEqual(report.missing_children, [(points[0], edge)])
+        self.assertEqual(report.dangling, [orphan])
+        self.assertEqual(report.stale_children, [])
+        self.assertEqual(report.missing_forming,
+                         [(orphan, outside.primitive)])
+        repair_scene(scene, report)
+        self.assertTrue(points[0].has_child(edge))
+        self.assertNotIn(orphan, list(scene.objects))
+        self.assertTrue(validate_scene(scene).is_clean())
+
+    def test_reload_after_repair(self):
+        scene = create_scene()
+        points = self.create_mesh(scene)[:5]
+        kept_edge = scene.find_child(SceneEdge, points[0], points[2])
+        duplicate_edge = SceneEdge.by_two_points(points[2], points[0])
+        scene.add_object(duplicate_edge)
+        plane = ScenePlane.by_point_and_segment(points[3], duplicate_edge)
+        scene.add_object(plane)
+
+        repair_scene(scene)
+        self.assertIs(plane.primitive.segment, kept_edge.primitive)
+        self.assertIs(scene.find_child(ScenePlane, points[3], kept_edge),
+                      plane)
+        self.assertTrue(validate_scene(scene).is_clean())
+
+        file_name = os.path.join(tempfile.mkdtemp(), "scene.json")
+        serialize_scene(scene, file_name)
+        try:
+            _, objects, _ = deserialize_scene(file_name)
+        finally:
+            os.remove(file_name)
+        plane_data = objects[plane.id]
+        self.assertEqual(plane_data.segment.id, kept_edge.id)
+
+
+class MeasurementTests(unittest.TestCase):
+    def setUp(self):
+        RawSceneObject.MESH_PROVIDER = TestMeshProvider()
+
+    def create_box(self, scene):
+        batch = MeshBatch()
+        positions, triangles = generators.box(glm.vec3(0), glm.vec3(1, 2, 3))
+        batch.add_points(positions)
+        batch.add_triangles(triangles)
+        return batch.add_to(scene)
+
+    def test_box(self):
+        scene = create_scene()
+        objects = self.create_box(scene)
+        result = MeasurementEngine(objects).measure()
+        self.assertEqual((result.point_count, result.edge_count,
+                          result.face_count), (8, 18, 12))
+        self.assertAlmostEqual(result.area, 2 * (2 + 3 + 6), places=5)
+        self.assertAlmostEqual(result.volume, 6, places=5)
+        self.assertTrue(np.allclose(result.centroid, (0.5, 1, 1.5)))
+
+        edges = [obj for obj in objects if isinstance(obj, SceneEdge)]
+        result = MeasurementEngine(edges[:1]).measure()
+        start, end = edges[0].primitive.point1, edges[0].primitive.point2
+        self.assertAlmostEqual(result.length,
+                               glm.distance(start.pos, end.pos), places=5)
+        self.assertEqual(result.area, 0)
+
+    def test_update_after_move(self):
+        scene = create_scene()
+        objects = self.create_box(scene)
+        engine = MeasurementEngine(objects)
+        engine.measure()
+        self.assertFalse(engine.update())
+
+        scene.move_objects(objects, glm.vec3(1, 0, 0))
+        result = engine.measure()
+        self.assertAlmostEqual(result.volume, 6, places=5)
+        self.assertTrue(np.allclose(result.centroid, (1.5, 1, 1.5)))
+
+        top = [obj for obj in objects if isinstance(obj, ScenePoint) and
+               obj.primitive.pos.z > 2]
+        scene.move_objects(top, glm.vec3(0, 0, 1))
+        self.assertAlmostEqual(engine.measure().volume, 8, places=5)
+
+    def test_update_after_undo(self):
+        scene = create_scene()
+        objects = self.create_box(scene)
+        undo_stack = UndoStack(scene)
+        engine = MeasurementEngine(objects)
+        engine.measure()
+        moved = []
+        scene.on_objects_moved += moved.append
+
+        top = [obj for obj in objects if isinstance(obj, ScenePoint) and
+               obj.primitive.pos.z > 2]
+        scene.move_objects(top, glm.vec3(0, 0, 1))
+        self.assertAlmostEqual(engine.measure().volume, 8, places=5)
+        undo_stack.undo()
+        self.assertEqual(len(moved), 2)
+        result = engine.measure()
+        self.assertAlmostEqual(result.volume, 6, places=5)
+        self.assertTrue(np.allclose(result.centroid, (0.5, 1, 1.5)))
+
+    def test_nearest_point(self):
+        positions = np.random.default_rng(1).uniform(-5, 5, (500, 3))
+        grid = measurements.PointGrid(positions)
+        for query in [(0, 0, 0), (4.9, -4.9, 1), (20, 3, -30)]:
+            distances = np.linalg.norm(positions - query, axis=1)
+            index, distance = grid.nearest(query)
+            self.assertEqual(index, int(np.argmin(distances)))
+            self.assertAlmostEqual(distance, distances.min())
+        self.assertIsNone(measurements.PointGrid([]).nearest((0, 0, 0)))
+
+        scene = create_scene()
+        objects = self.create_box(scene)
+        point, distance = MeasurementEngine(objects).nearest_point(
+            (1.1, 2.1, 3.1))
+        self.assertEqual(point.primitive.pos, glm.vec3(1, 2, 3))
+        self.assertAlmostEqual(distance, np.sqrt(0.03), places=5)
+
+
+class DependencyGraphTests(unittest.TestCase):
+    def setUp(self):
+        RawSceneObject.MESH_PROVIDER = TestMeshProvider()
+
+    def test_each_descendant_updated_once(self):
+        p1 = ScenePoint.by_pos(glm.vec3(0, 0, 0))
+        p2 = ScenePoint.by_pos(glm.vec3(1, 0, 0))
+        p3 = ScenePoint.by_pos(glm.vec3(0, 1, 0))
+        planes = [ScenePlane.by_three_points(p1, p2, p3)]
+        for i in range(20):
+            planes.append(ScenePlane.by_point_and_plane(p1, planes[-1]))
+
+        order = [obj for obj, _ in DependencyGraph.ordered_descendants([p1])]
+        self.assertEqual(len(order), len(set(order)))
+        self.assertEqual(order, planes)
+
+        calls = []
+        original = ScenePlane.on_parent_position_updated
+        ScenePlane.on_parent_position_updated = \
+            lambda plane, parent: calls.append(plane)
+        try:
+            MoveEngine.move_object(p1, glm.vec3(0, 0, 1))
+        finally:
+            ScenePlane.on_parent_position_updated = original
+        self.assertEqual(calls, planes)
+
+    def test_indirect_dependants_updated(self):
+        point = ScenePoint.by_pos(glm.vec3(0, 0, 3))
+        p1 = ScenePoint.by_pos(glm.vec3(0, 0, 0))
+        p2 = ScenePoint.by_pos(glm.vec3(3, 0, 0))
+        edge = SceneEdge.by_two_points(p1, p2)
+        plane = ScenePlane.by_point_and_segment(point, edge)
+
+        MoveEngine.move_object(p2, glm.vec3(0, 3, 0))
+        self.assertEqual(plane.transform.translation, glm.vec3(0, 1, 1))
+
+
+class MoveEngineTests(unittest.TestCase):
+    def setUp(self):
+        RawSceneObject.MESH_PROVIDER = TestMeshProvider()
+
+    def test_move_face_moves_shared_points_once(self):
+        scene = create_scene()
+        points = [ScenePoint.by_pos(glm.vec3(x, y, 0))
+                  for x, y in ((0, 0), (1, 0), (0, 1), (1, 1))]
+        face1 = SceneFace.by_three_points(*points[:3])
+        face2 = SceneFace.by_three_points(*points[1:])
+        edge = SceneEdge.by_two_points(points[1], points[2])
+        scene.add_objects(points + [face1, face2, edge])
+
+        moves = []
+        scene.on_objects_moved += moves.append
+        scene.move_objects([face1, edge], glm.vec3(0, 0, 2))
+
+        self.assertEqual(len(moves), 1)
+        self.assertEqual(set(moves[0]), set(points[:3]))
+        self.assertEqual(points[1].point.pos, glm.vec3(1, 0, 2))
+        self.assertEqual(points[3].point.pos, glm.vec3(1, 1, 0))
+        self.assertEqual(face2.transform.translation,
+                         glm.vec3(2 / 3, 2 / 3, 4 / 3))
+
+    def test_transform_selection_about_center(self):
+        scene = create_scene()
+        p1 = ScenePoint.by_pos(glm.vec3(0, 0, 0))
+        p2 = ScenePoint.by_pos(glm.vec3(2, 0, 0))
+        p3 = ScenePoint.by_pos(glm.vec3(5, 5, 5))
+        edge = SceneEdge.by_two_points(p1, p2)
+        scene.add_objects([p1, p2, p3, edge])
+        undo_stack = UndoStack(scene)
+
+        scene.transform_objects([edge, p1],
+                                glm.rotate(glm.radians(90), glm.vec3(0, 0, 1)))
+        self.assertLess(glm.distance(p1.point.pos, glm.vec3(1, -1, 0)), 1e-5)
+        self.assertLess(glm.distance(p2.point.pos, glm.vec3(1, 1, 0)), 1e-5)
+
+        scene.transform_objects([edge], glm.scale(glm.vec3(2)))
+        self.assertLess(glm.distance(p2.point.pos, glm.vec3(1, 2, 0)), 1e-5)
+        self.assertEqual(p3.point.pos, glm.vec3(5, 5, 5))
+
+        undo_stack.undo()
+        undo_stack.undo()
+        self.assertEqual(p1.point.pos, glm.vec3(0, 0, 0))
+        self.assertEqual(p2.point.pos, glm.vec3(2, 0, 0))
+
+    def test_move_line_updates_derived_line(self):
+        p1 = ScenePoint.by_pos(glm.vec3(0, 0, 0))
+        p2 = ScenePoint.by_pos(glm.vec3(2, 0, 0))
+        line = SceneLine.by_two_points(p1, p2)
+        parallel = SceneLine.by_point_and_line(
+            ScenePoint.by_pos(glm.vec3(0, 1, 0)), line)
+
+        MoveEngine.move_object(p2, glm.vec3(0, 2, 0))
+        self.assertEqual(parallel.line.get_directional_vector(),
+                         glm.vec3(0, 2, 0))
+        self.assertEqual(parallel.transform.translation, glm.vec3(0, 2, 0))
+
+
 class TransformTests(unittest.TestCase):
     def test_translate(self):
         transform = Transform()
@@ -355,10 +1330,495 @@ class TransformTests(unittest.TestCase):
         self.assert_vec_almost_equal(glm.vec3(0, 0, -1), transform.right)
         self.assert_vec_almost_equal(glm.vec3(1, 0, 0), transform.forward)
 
+    def test_model_matrix(self):
+        transform = Transform()
+        self.assertEqual(transform.model_matrix, glm.mat4())
+
+        transform.translation = glm.vec3(1, 2, 3)
+        transform.scale = glm.vec3(2)
+        self.assertEqual(transform.model_matrix * glm.vec4(1, 1, 1, 1),
+                         glm.vec4(3, 4, 5, 1))
+
+    def test_batched_set(self):
+        transform = Transform()
+        transform.set(translation=glm.vec3(1, 0, 0), scale=glm.vec3(3))
+        self.assertEqual(transform.model_matrix * glm.vec4(1, 1, 1, 1),
+                         glm.vec4(4, 3, 3, 1))
+        self.assertEqual(transform.rotation, glm.quat())
+
+    def test_camera_matrices_follow_changes(self):
+        camera = Camera(400, 400)
+        center = camera.translation + camera.forward * 10
+        self.assert_vec_almost_equal(glm.vec3(200, 200, 0),
+                                     glm.vec3(camera.world_to_screen(center),
+                                              0))
+
+        camera.set(translation=glm.vec3(0, 0, 0), rotation=glm.quat())
+        self.assert_vec_almost_equal(camera.forward,
+                                     camera.screen_to_world(glm.vec2(200, 200)))
+        camera.width = 800
+        self.assert_vec_almost_equal(
+            glm.vec3(400, 200, 0),
+            glm.vec3(camera.world_to_screen(glm.vec3(0, 0, 10)), 0))
+
     def assert_vec_almost_equal(self, v1, v2):
         self.assertTrue(glm.distance(v1, v2) < 1e-3)
 
 
+class CompressedSceneTests(unittest.TestCase):
+    def setUp(self):
+        RawSceneObject.MESH_PROVIDER = TestMeshProvider()
+        self.file_name = os.path.join(tempfile.mkdtemp(), "scene.scene")
+
+    def tearDown(self):
+        if os.path.exists(self.file_name):
+            os.remove(self.file_name)
+
+    def create_filled_scene(self):
+        scene = create_scene()
+        points = [ScenePoint.by_pos(glm.vec3(i, i % 3, 0)) for i in range(10)]
+        edges = [SceneEdge.by_two_points(points[i], points[i + 1])
+                 for i in range(9)]
+        face = SceneFace.by_three_points(*points[:3])
+        scene.add_objects(points + edges + [face])
+        return scene
+
+    def test_round_trip(self):
+        scene = self.create_filled_scene()
+        for method in ("zlib", "lzma"):
+            serialize_scene_compressed(scene, self.file_name, method,
+                                       chunk_size=3)
+            self.assertTrue(is_compressed_scene(self.file_name))
+            _, objects, children = deserialize_scene_compressed(
+                self.file_name, workers=2)
+
+            self.assertEqual(len(objects), 20)
+            self.assertEqual(len([obj for obj in objects.values()
+                                  if isinstance(obj, Triangle)]), 1)
+            point = next(obj for obj in objects.values()
+                         if isinstance(obj, Point) and obj.x == 4)
+            self.assertEqual(point.pos, glm.vec3(4, 1, 0))
+            self.assertEqual(len(children[point.id]), 2)
+
+    def test_partial_load_by_type(self):
+        scene = self.create_filled_scene()
+        serialize_scene_compressed(scene, self.file_name, chunk_size=4)
+        _, objects, children = deserialize_scene_compressed(
+            self.file_name, types=["triangle"])
+
+        self.assertEqual(len(objects), 4)
+        face = next(obj for obj in objects.values()
+                    if isinstance(obj, Triangle))
+        self.assertEqual(face.point2.pos, glm.vec3(1, 1, 0))
+        self.assertSequenceEqual(children[face.point1.id], [face.id])
+
+    def test_partial_load_by_region(self):
+        scene = self.create_filled_scene()
+        serialize_scene_compressed(scene, self.file_name, chunk_size=2)
+        region = (glm.vec3(-0.5, -0.5, -0.5), glm.vec3(1.5, 1.5, 0.5))
+        _, objects, _ = deserialize_scene_compressed(
+            self.file_name, types=["point"], region=region)
+
+        self.assertEqual(len(objects), 2)
+
+    def test_region_includes_dependencies(self):
+        scene = self.create_filled_scene()
+        serialize_scene_compressed(scene, self.file_name, chunk_size=2)
+        region = (glm.vec3(8.5, -1, -1), glm.vec3(9.5, 3, 1))
+        _, objects, children = deserialize_scene_compressed(
+            self.file_name, region=region)
+
+        self.assertEqual(len([obj for obj in objects.values()
+                              if isinstance(obj, Segment)]), 1)
+        self.assertEqual(len([obj for obj in objects.values()
+                              if isinstance(obj, Point)]), 2)
+
+    def test_streaming(self):
+        scene = self.create_filled_scene()
+        serialize_scene_compressed(scene, self.file_name, chunk_size=2)
+        streamer = SceneStreamer(self.file_name)
+
+        near = (glm.vec3(-0.5, -1, -1), glm.vec3(2.5, 3, 1))
+        objects, _ = streamer.load_region(near)
+        self.assertEqual(len(objects), 8)
+
+        objects, children = streamer.load_region(near)
+        self.assertEqual(len(objects), 0)
+        self.assertEqual(len(children), 0)
+
+        objects, children = streamer.load_all()
+        self.assertEqual(len(objects), 12)
+        self.assertTrue(streamer.is_complete)
+        point = next(obj for obj in objects.values()
+                     if isinstance(obj, Point) and obj.x == 5)
+        self.assertEqual(len(children[point.id]), 2)
+
+    def test_json_region(self):
+        scene = self.create_filled_scene()
+        file_name = self.file_name + ".json"
+        serialize_scene(scene, file_name)
+        try:
+            region = (glm.vec3(8.5, -1, -1), glm.vec3(9.5, 3, 1))
+            _, objects, children = deserialize_scene(file_name, region)
+        finally:
+            os.remove(file_name)
+
+        self.assertEqual(len(objects), 3)
+        self.assertEqual(sum(len(ids) for ids in children.values()), 2)
+
+
+class MeshIOTests(unittest.TestCase):
+    def setUp(self):
+        RawSceneObject.MESH_PROVIDER = TestMeshProvider()
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        for file_name in os.listdir(self.directory):
+            os.remove(os.path.join(self.directory, file_name))
+        os.rmdir(self.directory)
+
+    @staticmethod
+    def create_quad():
+        positions = np.array([[0, 0, 0], [1, 0, 0], [1, 1, 0], [0, 1, 0],
+                              [2, 0, 0]], dtype=np.float32)
+        edges = np.array([[1, 4]])
+        triangles = np.array([[0, 1, 2], [0, 2, 3]])
+        return positions, edges, triangles
+
+    def test_round_trip(self):
+        positions, edges, triangles = self.create_quad()
+        for extension in (".obj", ".ply", ".stl"):
+            file_name = os.path.join(self.directory, "mesh" + extension)
+            write_mesh(file_name, positions, edges, triangles)
+            read_positions, read_edges, read_triangles = read_mesh(file_name)
+
+            self.assertEqual(len(read_triangles), 2)
+            self.assertTrue(np.allclose(
+                np.sort(read_positions[read_triangles].reshape(-1, 3), 0),
+                np.sort(positions[triangles].reshape(-1, 3), 0)))
+            if extension != ".stl":
+                self.assertEqual(len(read_positions), 5)
+                self.assertEqual(read_edges.tolist(), [[1, 4]])
+
+    def test_obj_polygons(self):
+        file_name = os.path.join(self.directory, "mesh.obj")
+        with open(file_name, "w") as file:
+            file.write("# quad\nv 0 0 0\nv 1 0 0\nv 1 1 0\nv 0 1 0\n"
+                       "vn 0 0 1\nf 1//1 2//1 3//1 4//1\nl -4 -2\n")
+        positions, edges, triangles = read_mesh(file_name)
+
+        self.assertEqual(len(positions), 4)
+        self.assertEqual(triangles.tolist(), [[0, 1, 2], [0, 2, 3]])
+        self.assertEqual(edges.tolist(), [[0, 2]])
+
+    def test_obj_relative_indices(self):
+        file_name = os.path.join(self.directory, "mesh.obj")
+        with open(file_name, "w") as file:
+            file.write("v 0 0 0\nv 1 0 0\nv 1 1 0\nf -3 -2 -1\n"
+                       "v\t0 1 0\n  f  -4 -3 -1\nl\t-1 -2\n")
+        positions, edges, triangles = read_mesh(file_name)
+
+        self.assertEqual(len(positions), 4)
+        self.assertEqual(triangles.tolist(), [[0, 1, 2], [0, 1, 3]])
+        self.assertEqual(edges.tolist(), [[3, 2]])
+
+    def test_obj_index_out_of_range(self):
+        file_name = os.path.join(self.directory, "mesh.obj")
+        for faces in ("f 1 2 4\n", "f -1 -2 -4\n", "f 0 1 2\n"):
+            with open(file_name, "w") as file:
+                file.write("v 0 0 0\nv 1 0 0\nv 1 1 0\n" + faces)
+            with self.assertRaises(ValueError):
+                read_mesh(file_name)
+
+    def test_mesh_batch(self):
+        positions, edges, triangles = self.create_quad()
+        batch = MeshBatch()
+        indices = batch.add_points(positions)
+        batch.add_edges(indices[edges])
+        batch.add_triangles(indices[triangles])
+        objects = batch.build()
+
+        self.assertEqual(len([o for o in objects if isinstance(o, ScenePoint)]),
+                         5)
+        self.assertEqual(len([o for o in objects if isinstance(o, SceneEdge)]),
+                         6)
+        faces = [o for o in objects if isinstance(o, SceneFace)]
+        self.assertEqual(len(faces), 2)
+        self.assertEqual(len(list(faces[0].parents)), 6)
+
+    def test_mesh_batch_reuses_existing(self):
+        points = [ScenePoint.by_pos(glm.vec3(i, 0, i % 2)) for i in range(3)]
+        edge = SceneEdge.by_two_points(points[0], points[1])
+        batch = MeshBatch(points)
+        batch.add_triangles([[0, 1, 2]])
+        objects = batch.build()
+
+        self.assertEqual(len(objects), 3)
+        self.assertNotIn(edge, objects)
+        self.assertIn(edge, list(objects[-1].parents))
+
+    def test_mesh_batch_reuses_scene_topology(self):
+        scene = create_scene()
+        points = [ScenePoint.by_pos(glm.vec3(i, i % 2, 0)) for i in range(4)]
+        edge = SceneEdge.by_two_points(points[1], points[0])
+        face = SceneFace.by_three_points(points[0], points[1], points[2])
+        scene.add_objects(points + [edge, face])
+        batch = MeshBatch(points)
+        batch.add_triangles([[2, 1, 0], [0, 1, 3]])
+        objects = batch.add_to(scene)
+
+        faces = [obj for obj in objects if isinstance(obj, SceneFace)]
+        self.assertEqual(len(faces), 1)
+        self.assertIn(edge, list(faces[0].parents))
+        self.assertIs(scene.topology.face_between(points[2], points[1],
+                                                  points[0]), face)
+        self.assertEqual(validate_scene(scene).duplicate_edges, [])
+
+    def test_import_export(self):
+        positions, edges, triangles = self.create_quad()
+        file_name = os.path.join(self.directory, "mesh.ply")
+        write_mesh(file_name, positions, edges, triangles)
+
+        scene = create_scene()
+        import_mesh(scene, file_name)
+        self.assertEqual(len(list(scene.objects)), 13)
+
+        export_mesh(scene, file_name)
+        positions, edges, triangles = read_mesh(file_name)
+        self.assertEqual(len(positions), 5)
+        self.assertEqual(len(edges), 1)
+        self.assertEqual(len(triangles), 2)
+
+
+class WeldTests(unittest.TestCase):
+    def setUp(self):
+        RawSceneObject.MESH_PROVIDER = TestMeshProvider()
+
+    def test_weld_positions(self):
+        positions = [[0, 0, 0], [1, 1, 1], [5e-5, 0, 0], [1, 1, 1],
+                     [-5e-5, 5e-5, 0], [0, 0, 2e-4], [-1e-5, 0, 0]]
+        kept, remap = weld_positions(positions)
+
+        self.assertEqual(kept.tolist(), [0, 1, 5])
+        self.assertEqual(remap.tolist(), [0, 1, 0, 1, 0, 2, 0])
+
+    def test_weld_matches_almost_equal(self):
+        positions = np.random.default_rng(0).random((300, 3)) * 2e-3
+        kept, remap = weld_positions(positions)
+        vectors = [glm.vec3(*pos) for pos in positions.tolist()]
+        for i, j in zip(*np.triu_indices(len(positions), 1)):
+            if almost_equal_vec(vectors[i], vectors[j]):
+                self.assertEqual(remap[i], remap[j])
+
+    def test_weld_mesh(self):
+        positions = [[0, 0, 0], [1, 0, 0], [0, 1, 0],
+                     [1, 0, 0], [0, 1, 0], [1, 1, 0]]
+        triangles = [[0, 1, 2], [3, 5, 4]]
+        positions, edges, triangles = weld_mesh(positions, [[1, 3]],
+                                                triangles)
+        self.assertEqual(len(positions), 4)
+        self.assertEqual(triangles.tolist(), [[0, 1, 2], [1, 3, 2]])
+
+        batch = MeshBatch()
+        batch.add_points(positions)
+        batch.add_edges(edges)
+        batch.add_triangles(triangles)
+        self.assertEqual(len(batch.build()), 4 + 5 + 2)
+
+    def test_weld_on_load(self):
+        scene = create_scene()
+        points = [ScenePoint.by_pos(glm.vec3(0, 0, 0)),
+                  ScenePoint.by_pos(glm.vec3(1, 0, 0)),
+                  ScenePoint.by_pos(glm.vec3(1, 0, 0)),
+                  ScenePoint.by_pos(glm.vec3(0, 1, 0)),
+                  ScenePoint.by_pos(glm.vec3(0, 0, 5e-5))]
+        edges = [SceneEdge.by_two_points(points[0], points[1]),
+                 SceneEdge.by_two_points(points[2], points[4]),
+                 SceneEdge.by_two_points(points[0], points[4])]
+        face = SceneFace.by_three_points(points[0], points[2], points[3])
+        scene.add_objects(points + edges + [face])
+
+        file_name = os.path.join(tempfile.mkdtemp(), "scene.json")
+        serialize_scene(scene, file_name)
+        try:
+            _, objects, children = deserialize_scene(file_name, weld=True)
+            serialize_scene_compressed(scene, file_name)
+            _, compressed_objects, _ = deserialize_scene_compressed(
+                file_name, weld=True)
+        finally:
+            os.remove(file_name)
+
+        self.assertEqual(len(objects), 3 + 1 + 1)
+        self.assertEqual(len(compressed_objects), 5)
+        triangle = next(obj for obj in objects.values()
+                        if isinstance(obj, Triangle))
+        self.assertIs(triangle.point2, objects[points[1].id])
+        self.assertEqual(sorted(children[points[0].id]),
+                         sorted([edges[0].id, face.id]))
+
+
+class UndoTests(unittest.TestCase):
+    def setUp(self):
+        RawSceneObject.MESH_PROVIDER = TestMeshProvider()
+        self.scene = create_scene()
+        self.history = UndoStack(self.scene)
+
+    def create_edge(self):
+        point1 = ScenePoint.by_pos(glm.vec3(0, 0, 0))
+        point2 = ScenePoint.by_pos(glm.vec3(1, 0, 0))
+        edge = SceneEdge.by_two_points(point1, point2)
+        self.scene.add_objects([point1, point2, edge])
+        return point1, point2, edge
+
+    def test_undo_redo_add(self):
+        point1, point2, edge = self.create_edge()
+
+        self.assertTrue(self.history.undo())
+        self.assertEqual(len(list(self.scene.objects)), 0)
+        self.assertFalse(self.history.undo())
+
+        self.assertTrue(self.history.redo())
+        self.assertEqual(len(list(self.scene.objects)), 3)
+        self.assertIn(edge, list(point1.children))
+        self.assertIn(edge, list(point2.children))
+
+    def test_undo_cascade_remove(self):
+        point1, point2, edge = self.create_edge()
+        self.scene.remove_object(point1)
+        self.assertEqual(len(list(self.scene.objects)), 1)
+
+        self.history.undo()
+        self.assertEqual(len(list(self.scene.objects)), 3)
+        self.assertIn(edge, list(point2.children))
+        self.assertSequenceEqual(list(edge.parents), [point1, point2])
+
+    def test_undo_move(self):
+        point1, point2, edge = self.create_edge()
+        self.scene.move_object(edge, glm.vec3(0.5, 2, 0))
+        self.scene.move_object(point1, glm.vec3(0, 5, 0))
+        self.assertEqual(point2.point.pos, glm.vec3(1, 2, 0))
+
+        self.history.undo()
+        self.assertEqual(point1.point.pos, glm.vec3(0, 2, 0))
+        self.history.undo()
+        self.assertEqual(point1.point.pos, glm.vec3(0, 0, 0))
+        self.assertEqual(point2.point.pos, glm.vec3(1, 0, 0))
+        self.assertEqual(edge.transform.translation, glm.vec3(0.5, 0, 0))
+
+        self.history.redo()
+        self.assertEqual(point2.point.pos, glm.vec3(1, 2, 0))
+
+    def test_group_and_rename(self):
+        with self.history.group():
+            point1, point2, edge = self.create_edge()
+            self.scene.move_object(point1, glm.vec3(0, 1, 0))
+            self.scene.move_object(point1, glm.vec3(0, 2, 0))
+        self.scene.rename_object(edge, "Edge")
+
+        self.history.undo()
+        self.assertNotEqual(edge.name, "Edge")
+        self.history.undo()
+        self.assertEqual(len(list(self.scene.objects)), 0)
+        self.assertFalse(self.history.can_undo)
+
+        self.history.redo()
+        self.assertEqual(point1.point.pos, glm.vec3(0, 2, 0))
+        self.history.redo()
+        self.assertEqual(edge.name, "Edge")
+
+    def test_patch(self):
+        point1 = ScenePoint.by_pos(glm.vec3(0, 0, 0))
+        self.scene.add_object(point1)
+
+        diff = SceneDiff()
+        self.scene.on_objects_added += diff.record_added
+        self.scene.on_objects_moved += diff.record_moved
+        point2 = ScenePoint.by_pos(glm.vec3(1, 0, 0))
+        self.scene.add_objects([point2,
+                                SceneEdge.by_two_points(point1, point2)])
+        self.scene.move_object(point1, glm.vec3(0, 3, 0))
+        data = json.loads(json.dumps(diff_to_dict(diff)))
+
+        other = create_scene()
+        other_point = ScenePoint(Point(glm.vec3(0, 0, 0), id=point1.id))
+        other.add_object(other_point)
+
+        patch = diff_from_dict(data, other)
+        patch.apply(other)
+        self.assertEqual(len(list(other.objects)), 3)
+        self.assertEqual(other_point.point.pos, glm.vec3(0, 3, 0))
+        other_edge = next(obj for obj in other.objects
+                          if isinstance(obj, SceneEdge))
+        self.assertIs(other_edge.edge.point1, other_point.point)
+        self.assertIn(other_edge, list(other_point.children))
+
+        patch.revert(other)
+        self.assertEqual(len(list(other.objects)), 1)
+        self.assertEqual(other_point.point.pos, glm.vec3(0, 0, 0))
+
+
+class PointStoreTests(unittest.TestCase):
+    def test_point_keeps_only_handle(self):
+        slots = [name for cls in Point.__mro__
+                 for name in getattr(cls, '__slots__', ())]
+        self.assertEqual(sorted(slots), ['__handle', '__weakref__'])
+        point = Point(glm.vec3(1, 2, 3), "A")
+        self.assertEqual((point.name, point.pos), ("A", glm.vec3(1, 2, 3)))
+        segment = Segment(point, point, id="s")
+        self.assertEqual((segment.id, segment.name[:4]), ("s", "Edge"))
+
+    def test_allocate_and_release(self):
+        store = PointStore(capacity=2)
+        handles = [store.allocate(glm.vec3(i, 0, 0)) for i in range(5)]
+        self.assertEqual(handles, [0, 1, 2, 3, 4])
+        self.assertGreaterEqual(store.capacity, 5)
+        self.assertEqual(store.get_position(3), glm.vec3(3, 0, 0))
+
+        version = store.get_version(1)
+        store.release(1)
+        self.assertEqual(len(store), 4)
+        self.assertGreater(store.get_version(1), version)
+        self.assertEqual(store.allocate(glm.vec3(7, 7, 7)), 1)
+        self.assertEqual(store.alive_handles.tolist(), [0, 1, 2, 3, 4])
+
+    def test_names_and_ids(self):
+        store = PointStore()
+        first = store.allocate(glm.vec3(0), obj_id="point-id")
+        second = store.allocate(glm.vec3(0), name="A")
+        self.assertEqual(store.get_name(first), "Point1")
+        self.assertEqual(store.get_name(second), "A")
+        self.assertEqual(store.get_id(first), "point-id")
+        self.assertEqual(store.get_id(second), store.get_id(second))
+
+        store.set_name(first, "B")
+        self.assertEqual(store.get_name(first), "B")
+
+    def test_bulk(self):
+        store = PointStore()
+        store.release(store.allocate(glm.vec3(0)))
+        handles = store.allocate_many(np.arange(9).reshape(3, 3))
+        self.assertEqual(sorted(handles.tolist()), [0, 1, 2])
+        self.assertEqual(store.get_positions(handles[1:]).tolist(),
+                         [[3, 4, 5], [6, 7, 8]])
+
+        version = store.get_version(handles[0])
+        store.set_positions(handles[:1], [[1, 1, 1]])
+        self.assertEqual(store.get_position(handles[0]), glm.vec3(1))
+        self.assertGreater(store.get_version(handles[0]), version)
+
+    def test_point_view(self):
+        point = Point(glm.vec3(1, 2, 3), name="P", id="point-id")
+        self.assertFalse(hasattr(point, "__dict__"))
+        self.assertEqual(point.id, "point-id")
+        self.assertEqual((point.x, point.y, point.z), (1, 2, 3))
+
+        handle = point.handle
+        point.pos = glm.vec3(4, 5, 6)
+        self.assertEqual(Point.STORE.get_position(handle), glm.vec3(4, 5, 6))
+        del point
+        self.assertNotIn(handle, Point.STORE.alive_handles.tolist())
+
+
 class EventTests(unittest.TestCase):
     def test_event_local_func(self):
         event = Event()